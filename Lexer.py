@@ -1,5 +1,4 @@
-import ply.lex as lex
-import ply.yacc as yacc
+import sys
 
 ## @package Lexer
 #  This is the parser that is used to make custom backup conditions
@@ -10,6 +9,11 @@ import ply.yacc as yacc
 #  which will allow for the program to decide if a backup is necessary
 #  
 #  @note Tokens have the following attributes: type, value, lexpos
+#
+#  The lexer is only built when it is first used, from the pregenerated tables in
+#  lextab.py when they match the rules below. Regenerate them with
+#  python Parser.py --tables after changing a rule, until then the rules are
+#  compiled at runtime. Nothing is ever written at runtime.
 #  @author Barrett Hostetter-Lewis
 #  @date 7-29-2012
 
@@ -36,6 +40,9 @@ tokens = ['AND',         #&&
           'RPAREN',      #)
           'INT']         #Any integer
 
+## @note ply tries function rules in the order they are defined, so the two
+#        character operators have to come before '<' and '>'.
+
 ## @var t_ignore
 #  Regex for all ignored characters
 t_ignore = ' \t'
@@ -50,6 +57,24 @@ def t_AND(t):
   t.value = "AND"
   return t
 
+## Less than or equal to token
+#  @post A matching string will be tokenized
+#  @param t The current token
+#  @return The created token object
+def t_LESS_EQUAL(t):
+  r'<='
+  t.value = "LESS_EQUAL"
+  return t
+
+## Greater than or equal to token
+#  @post A matching string will be tokenized
+#  @param t The current token
+#  @return The created token object
+def t_GREAT_EQUAL(t):
+  r'>='
+  t.value = "GREAT_EQUAL"
+  return t
+
 ## Greater than token
 #  @pre none
 #  @post A matching string will tokenized
@@ -70,24 +95,6 @@ def t_LESS(t):
   t.value = "LESS"
   return t
 
-## Less than or equal to token
-#  @post A matching string will be tokenized
-#  @param t The current token
-#  @return The created token object
-def t_LESS_EQUAL(t):
-  r'<='
-  t.value = "LESS_EQUAL"
-  return t
-
-## Greater than or equal to token
-#  @post A matching string will be tokenized
-#  @param t The current token
-#  @return The created token object
-def t_GREAT_EQUAL(t):
-  r'>='
-  t.value = "GREAT_EQUAL"
-  return t
-
 ## Equal token
 #  @post A matching string will be tokenized
 #  @param t The current token
@@ -201,4 +208,55 @@ def t_INT(t):
   t.value = int(t.value)
   return t
 
-lex.lex()
+## Error rule
+#  @pre  None
+#  @post None
+#  @param t The token starting at the character that didn't match a rule
+#  @exception SyntaxError Always, the same error the parser raises
+def t_error(t):
+  raise SyntaxError("unexpected character %r at position %d" % (t.value[0], t.lexpos))
+
+## @var _lexer
+#  The lexer built from the rules above, see get_lexer()
+_lexer = None
+
+## Get the lexer
+#  @pre  None
+#  @post The lexer is built if it hasn't been yet
+#  @retval Lexer The shared lexer, clone it to lex on several threads at once
+def get_lexer():
+  global _lexer
+  if _lexer is None:
+    import ply.lex as lex
+    try:
+      import lextab
+    except ImportError:
+      lextab = None
+    if lextab is not None and _tables_current(lextab):
+      _lexer = lex.lex(module=sys.modules[__name__], optimize=1, lextab=lextab)
+    else:
+      _lexer = lex.lex(module=sys.modules[__name__])
+  return _lexer
+
+## Check the pregenerated tables
+#  @param lextab The tables module
+#  @retval bool True if the master regular expression of the tables holds every
+#          rule defined here
+def _tables_current(lextab):
+  if sorted(lextab._lextokens) != sorted(tokens):
+    return False
+  master = ''.join(pattern for pattern, names in lextab._lexstatere['INITIAL'])
+  for name, rule in list(globals().items()):
+    if name.startswith('t_') and name not in ('t_ignore', 't_error'):
+      pattern = rule.__doc__ if callable(rule) else rule
+      if '(?P<%s>%s)' % (name, pattern) not in master:
+        return False
+  return True
+
+## Lazy module attributes
+#  @param name The name of the attribute
+#  @retval Lexer The shared lexer for 'lexer'
+def __getattr__(name):
+  if name == 'lexer':
+    return get_lexer()
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -1,5 +1,9 @@
-import ply.yacc as yacc
+import functools
+import os
+import sys
+import operator
 import Lexer
+import instrument
 tokens = Lexer.tokens
 
 ## @package Parser
@@ -11,6 +15,21 @@ tokens = Lexer.tokens
 #  The basic language described is one of simple boolean statements, but this should
 #  be easy to expand as needed.
 #  It is a LALR parser
+#
+#  The productions build a small tree of tuples instead of computing values while
+#  they reduce. compile_condition() turns that tree into a Condition object that
+#  can be evaluated any number of times without touching the lexer or parser.
+#  Node shapes are ('const', value), ('key', name) and ('op', name, left, right).
+#
+#  Before it is compiled a tree goes through optimize(), which folds constants,
+#  drops terms that can't change the result and puts the cheap operands of && and
+#  || chains first, so expensive keywords like Modified are only looked up when
+#  the cheap terms don't already decide the condition. facts() tells statically
+#  which keywords a condition still needs.
+#
+#  The LALR tables are pregenerated in parsetab.py and only used when their
+#  signature matches the grammar below, otherwise the parser is built in memory.
+#  Regenerate them, and the lexer tables, with python Parser.py --tables.
 #  @author Barrett Hostetter-Lewis
 #  @date 5/28/2012
 
@@ -41,22 +60,7 @@ def p_expr_operator(p):
           | expr EQUAL expr
           | expr PLUS expr'''
 
-  if p[2] == "OR":
-    p[0] = p[1] or p[3]
-  elif p[2] == "AND":
-    p[0] = p[1] and p[3]
-  elif p[2] == "LESS_EQUAL":
-    p[0] = p[1] <= p[3]
-  elif p[2] == "LESS":
-    p[0] = p[1] < p[3]
-  elif p[2] == "GREAT_EQUAL":
-    p[0] = p[1] >= p[3]
-  elif p[2] == "GREATER":
-    p[0] = p[1] > p[3]
-  elif p[2] == "EQUAL":
-    p[0] = p[1] == p[3]
-  elif p[2] == "PLUS":
-    p[0] = p[1] + p[3]
+  p[0] = ('op', p[2], p[1], p[3])
 
 
 ## Expressions with Parens
@@ -112,7 +116,7 @@ def p_operand_key(p):
 #  @brief Multiplies a number of frames by the frame's value
 def p_time(p):
   '''time : INT frame'''
-  p[0] = p[1] * p[2]
+  p[0] = ('const', p[1] * p[2])
 
 ## Frame
 #  @pre None
@@ -138,12 +142,12 @@ def p_frame(p):
 
 ## Keyword LastBU
 #  @pre  None
-#  @post The time (in seconds of the last backup for a file is returned
+#  @post A LastBU node is returned. Its value is looked up in the evaluation
+#        context as the number of seconds since the last backup.
 #  @param p The current token
-#  @todo This function hasn't been implemented yet
 def p_key_last_backup(p):
   '''key :  LAST_BACKUP'''
-  raise NotImplementedError("I havn't implemented this yet")
+  p[0] = ('key', 'LastBU')
 
 ## Keywords with boolean values
 #  @pre  None
@@ -151,29 +155,266 @@ def p_key_last_backup(p):
 #  @param p The current token
 #  @brief This function allows for the conversion of the following tokens:
 #         True, False, Modified. Modified is a special case that will have to
-#         do a diff on the current version and the old version of the file.
-#  @todo  Implement the modified function
+#         do a diff on the current version and the old version of the file, so
+#         it is left as a key node and looked up in the evaluation context.
 def p_key_booleon(p):
   '''key :  MODIFIED
          |  TRUE
          |  FALSE'''
   if p[1] == "Modified":
-    raise NotImplementedError("I havn't implemented this yet")
+    p[0] = ('key', 'Modified')
   elif p[1] == "True":
-    p[0] = True
+    p[0] = ('const', True)
   elif p[1] == "False":
-    p[0] = False
+    p[0] = ('const', False)
+
+## Syntax errors
+#  @pre  None
+#  @post A SyntaxError is raised describing the offending token
+#  @param p The token that could not be parsed, None at the end of input
+#  @brief Without this ply only prints a warning and returns None, which made
+#         validate() accept broken expressions.
+def p_error(p):
+  if p is None:
+    raise SyntaxError("unexpected end of condition")
+  raise SyntaxError("unexpected %r at position %d" % (p.value, p.lexpos))
+
+## @var CACHE_SIZE
+#  The number of distinct compiled conditions kept by compile_condition()
+CACHE_SIZE = 1024
+
+## @var _parser
+#  The parser instance, built on first use and shared for the rest of the process
+_parser = None
+
+## @var _OPERATORS
+#  The functions used to evaluate the non short circuiting operators
+_OPERATORS = {'LESS_EQUAL' : operator.le,
+              'LESS'       : operator.lt,
+              'GREAT_EQUAL': operator.ge,
+              'GREATER'    : operator.gt,
+              'EQUAL'      : operator.eq,
+              'PLUS'       : operator.add}
+
+## Get the parser
+#  @pre  None
+#  @post The LALR parser is built if it hasn't been yet
+#  @retval LRParser The shared parser instance
+#  @brief The parser is only built once per process, from parsetab.py when it is
+#         current, and no file is ever written at runtime.
+def _get_parser():
+  global _parser
+  if _parser is None:
+    import ply.yacc as yacc
+    _parser = yacc.yacc(module=sys.modules[__name__], tabmodule='parsetab', debug=False,
+                        write_tables=False, errorlog=yacc.NullLogger())
+  return _parser
+
+## Write the lexer and parser tables
+#  @pre  None
+#  @post lextab.py and parsetab.py describe the current rules and grammar
+#  @param outputdir (Optional)Where the tables are written, by default next to this file
+def write_tables(outputdir=None):
+  import ply.lex as lex
+  import ply.yacc as yacc
+  outputdir = outputdir or os.path.dirname(os.path.abspath(__file__))
+  lex.lex(module=Lexer).writetab('lextab', outputdir)
+  yacc.yacc(module=sys.modules[__name__], tabmodule='parsetab', outputdir=outputdir, debug=False,
+            write_tables=True, errorlog=yacc.NullLogger())
+
+## A compiled condition
+#  This holds the parse tree of a condition string along with a closure that
+#  evaluates it.
+#
+#  Calling the object evaluates the condition. The context is a mapping that
+#  supplies the keyword values: 'LastBU' is the number of seconds since the last
+#  backup (None meaning never) and 'Modified' is either a bool or a callable
+#  returning one, so that expensive checks only run when they are reached.
+#  change_index.ChangeIndex.Modified() builds such a callable for a backup item.
+class Condition(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param expression The source text of the condition
+  #  @param tree The parse tree built by the productions above
+  def __init__(self, expression, tree):
+    self.expression = expression
+    ## @var tree
+    #  The optimized parse tree
+    self.tree = optimize(tree)
+    ## @var facts
+    #  The keywords the condition needs, see facts()
+    self.facts = facts(self.tree)
+    self._evaluate = _build(self.tree)
+
+  ## Evaluate the condition
+  #  @param self The current instance
+  #  @param context (Optional)The keyword values, see the class description
+  #  @retval bool The value of the condition
+  def __call__(self, context=None):
+    return bool(self._evaluate(context or {}))
+
+  def __repr__(self):
+    return 'Condition(%r)' % self.expression
+
+## Build an evaluation closure
+#  @pre  node is a valid parse tree node
+#  @post None
+#  @param node The root of the tree being compiled
+#  @retval function A function taking a context and returning the node's value
+def _build(node):
+  kind = node[0]
+  if kind == 'const':
+    value = node[1]
+    return lambda context: value
+  if kind == 'key':
+    return functools.partial(_lookup, node[1])
+
+  name, left, right = node[1], _build(node[2]), _build(node[3])
+  if name == 'OR':
+    return lambda context: left(context) or right(context)
+  if name == 'AND':
+    return lambda context: left(context) and right(context)
+  function = _OPERATORS[name]
+  return lambda context: function(left(context), right(context))
+
+## @var COSTS
+#  The estimated cost of looking up each keyword. Modified means a stat at least
+#  and possibly hashing a file, LastBU is a subtraction.
+COSTS = {'LastBU': 1, 'Modified': 1000}
+
+## Optimize a parse tree
+#  @pre  node is a valid parse tree node
+#  @post None
+#  @param node The root of the tree
+#  @param boolean (Optional)True if only the truth of the node's value matters,
+#         as for a whole condition and the operands of && and || in one
+#  @retval tuple An equivalent tree
+#  @brief Operators with constant operands are folded. In a boolean context the
+#         operands of a chain of && or || are also reordered by cost, constants
+#         that can't decide the chain are dropped and ones that do decide it
+#         replace the whole chain. Looking a keyword up has no effect besides its
+#         cost, so skipping or reordering lookups never changes a result.
+def optimize(node, boolean=True):
+  if node[0] != 'op':
+    return node
+  name = node[1]
+  if name not in ('AND', 'OR'):
+    left, right = optimize(node[2], False), optimize(node[3], False)
+    if left[0] == 'const' and right[0] == 'const':
+      try:
+        return ('const', _OPERATORS[name](left[1], right[1]))
+      except Exception: #left for the evaluation to raise
+        pass
+    return ('op', name, left, right)
+
+  operands = [optimize(operand, boolean) for operand in _chain(node, name)]
+  if not boolean: #the value of the chain is one of its operands, so keep them in order
+    if all(operand[0] == 'const' for operand in operands):
+      value = operands[0][1]
+      for operand in operands[1:]:
+        value = (value and operand[1]) if name == 'AND' else (value or operand[1])
+      return ('const', value)
+    return _unchain(name, operands)
+
+  deciding = name == 'OR' #the truth that ends the chain
+  kept = []
+  for operand in operands:
+    if operand[0] != 'const':
+      kept.append(operand)
+    elif bool(operand[1]) == deciding:
+      return ('const', deciding)
+  if not kept:
+    return ('const', not deciding)
+  kept.sort(key=cost)
+  return _unchain(name, kept)
+
+## Estimate the cost of evaluating a node
+#  @param node A parse tree node
+#  @retval int The sum of the costs of the keywords it looks up and its operators
+def cost(node):
+  if node[0] == 'const':
+    return 0
+  if node[0] == 'key':
+    return COSTS.get(node[1], 1)
+  return 1 + cost(node[2]) + cost(node[3])
+
+## Get the facts a condition needs
+#  @param node A parse tree node
+#  @retval frozenset The keywords the node looks up. A condition without
+#          'Modified' never needs the file system to be checked.
+def facts(node):
+  if node[0] == 'key':
+    return frozenset((node[1],))
+  if node[0] == 'op':
+    return facts(node[2]) | facts(node[3])
+  return frozenset()
+
+def _chain(node, name):
+  if node[0] == 'op' and node[1] == name:
+    return _chain(node[2], name) + _chain(node[3], name)
+  return [node]
+
+def _unchain(name, operands):
+  node = operands[0]
+  for operand in operands[1:]:
+    node = ('op', name, node, operand)
+  return node
+
+## Look up a keyword
+#  @pre  None
+#  @post None
+#  @param key Either 'LastBU' or 'Modified'
+#  @param context The evaluation context
+#  @retval The value of the keyword, LastBU is infinite when there was no backup
+def _lookup(key, context):
+  try:
+    value = context[key]
+  except KeyError:
+    raise ValueError("the condition needs a value for %s" % key)
+  if callable(value):
+    value = value()
+  if key == 'LastBU' and value is None:
+    return float('inf')
+  return value
+
+## Seconds since a backup
+#  @pre  None
+#  @post None
+#  @param last The 'last' value of a backup item, a timestamp or 'never'
+#  @param now The current time as a timestamp
+#  @retval float The seconds since the last backup or None if there wasn't one
+#  @brief Helper for building the LastBU value of an evaluation context from
+#         what bumodel stores.
+def elapsed_since(last, now):
+  if last is None or last == 'never':
+    return None
+  return now - float(last)
+
+## Compile
+#  @pre  The expression needs to be a string
+#  @post The expression is parsed once and cached by its text
+#  @param expression The expression as a string that is to be compiled
+#  @retval Condition The compiled condition
+#  @exception SyntaxError The expression is not valid
+#  @brief Conditions are shared by many backup items, so the most recently used
+#         ones are kept in a bounded cache and parsing happens once per distinct
+#         string.
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_condition(expression):
+  with instrument.Stage('condition.compile'):
+    return Condition(expression, _get_parser().parse(expression, lexer=Lexer.get_lexer().clone()))
 
 ## Parse
 #  @pre  The expression should be valid. The expression needs to be a string
 #  @post The expression is parsed and its bool value is evaluated
 #  @param expression The expression as a string that is to be parsed
+#  @param context (Optional)The keyword values, see Condition
 #  @retval bool Indicates the result of the evaluated string
 #  @brief An expression string is evaluated for its boolean value and
 #         then returned. The language is a simple scripting language.
-def parse(expression):
-  yacc.yacc()
-  return bool(yacc.parse(expression))
+def parse(expression, context=None):
+  return compile_condition(expression)(context)
 
 ## Validate
 #  @pre  None
@@ -184,15 +425,17 @@ def parse(expression):
 #          It will catch a bad parse and return it to the caller. This can be used
 #          however is necessary, but it allows for an extra level of safety
 def validate(expression):
-  yacc.yacc()
   try:
-    yacc.parse(expression)
+    compile_condition(expression)
     return True
-  except:
+  except Exception:
     return False
 
 # interface for testing the system
 if __name__ == "__main__":
+  if sys.argv[1:] == ['--tables']:
+    write_tables()
+    sys.exit(0)
   exp = "3 days"
   if validate(exp):
     print("result", parse(exp))
@@ -1,12 +1,36 @@
-import os.path
+import array
+import bisect
 import datetime
+import math
+import time
 
 ## @package BackupObject
 #  This contains the definition for a backup object
 #
+#  A single BackupObject keeps its fields in slots. Large collections are held
+#  in a BackupObjectTable instead, which stores every field as a column and hands
+#  out BackupObjectView objects that read and write a row of it. Both have the
+#  same properties, so code written against one works with the other.
+#
 #  @author Barrett Hostetter-Lewis
 #  @date  8/23/2012
 
+## @var PROPERTIES
+#  The fields that can be passed to the constructor of a BackupObject
+PROPERTIES = ('Name',
+              'Description',
+              'Location',
+              'Backup',
+              'LastBackup',
+              'Group',
+              'Id')
+
+## The default Backup function, the item always wants to be backed up
+#  @param obj The backup object
+#  @retval bool True
+def AlwaysBackUp(obj):
+  return True
+
 ## The BackupObject class
 #  This class holds all the information for a backup object
 #
@@ -14,15 +38,7 @@ import datetime
 #  to be backed up. Mostley a container class.
 class BackupObject(object):
 
-  ## @var __properties
-  #  legal properties
-  __properties = ['Name',
-                  'Description',
-                  'Location',
-                  'Backup',
-                  'LastBackup',
-                  'Group',
-                  'Id']
+  __slots__ = ('_Name', '_Description', '_Location', '_Backup', '_LastBackup', '_Group', '_Id')
 
   ## Constructor
   #  @pre  There should be a valid unique id.
@@ -31,21 +47,23 @@ class BackupObject(object):
   #  @param self The current object being constructed
   #  @param id The unquie identifier for the object
   #  @param **args arbitrary number of params with a key
-  #         Name, Description, Location, Backup, Group, Id are allowed
+  #         Name, Description, Location, Backup, LastBackup, Group, Id are allowed
   #  @brief Constructs the objects allowing for custom initialization
+  #  @exception TypeError A key isn't one of the allowed ones
   def __init__(self, id, **args):
     #Set values that must be there
     self._Name = ""
     self._Description = ""
     self._Location = ""
-    self._Backup = lambda obj: true
-    self._LastBackup =  datetime.datetime.now
+    self._Backup = AlwaysBackUp
+    self._LastBackup = datetime.datetime.now()
     self._Group = "default"
     self._Id = id
     #initialize all values passed to the obj
-    for key in args:
-      if key in __properties:#limit to properties that are valid
-        exec('self._' + key + '=' + args[key])
+    for key, value in args.items():
+      if key not in PROPERTIES: #limit to properties that are valid
+        raise TypeError("%s is not a property of a backup object" % key)
+      setattr(self, '_' + key, value)
 
   ## Name
   #  @brief Name property, allows you to get the Name variable
@@ -58,7 +76,7 @@ class BackupObject(object):
   #  @brief Name property, allows setting the Name variable
   @Name.setter
   def Name(self, newName):
-    self.Name = _newName
+    self._Name = newName
 
   ## Description
   #  @brief Description property, allows getting the Description variable
@@ -67,12 +85,11 @@ class BackupObject(object):
   def Description(self):
     return self._Description
 
-
   ## Description
   #  @brief Description property, allows setting the Description variable
   @Description.setter
   def Description(self, newDescription):
-    self.Description = _newDescription
+    self._Description = newDescription
 
   ## Location
   #  @brief Location property, allows getting the Location variable
@@ -94,19 +111,18 @@ class BackupObject(object):
   #  @retval bool True if the the item wants to be backed up, false otherwise
   @property
   def Backup(self):
-    return _Backup(self)
+    return self._Backup(self)
 
-  
   ## Backup
   #  @brief Backup property, allows setting the Backup property.
-  #  This should be a function
+  #  This should be a function taking the backup object
   @Backup.setter
   def Backup(self, newBackupFunc):
     self._Backup = newBackupFunc
 
   ## LastBackup
   #  @brief LastBackup property, allows for getting the LastBackup date
-  #  @retval datetime The datetime of the last backup
+  #  @retval datetime The datetime of the last backup, None if there wasn't one
   @property
   def LastBackup(self):
     return self._LastBackup
@@ -122,7 +138,6 @@ class BackupObject(object):
   def Group(self):
     return self._Group
 
-
   ## Group
   #  @brief Group property, allows for setting the group
   @Group.setter
@@ -135,3 +150,311 @@ class BackupObject(object):
   @property
   def ID(self):
     return self._Id
+
+## A column of strings
+#  The strings are kept utf-8 encoded and length prefixed in one bytearray, the
+#  column itself only holds their offsets. Replacing a string appends the new one.
+class _StringHeap(object):
+
+  __slots__ = ('_Heap', '_Offsets')
+
+  def __init__(self):
+    self._Heap = bytearray(b'\0') #offset 0 is the empty string, shared by every row without one
+    self._Offsets = array.array('I')
+
+  def __len__(self):
+    return len(self._Offsets)
+
+  def Append(self, value):
+    self._Offsets.append(self._Store(value))
+
+  def Get(self, row):
+    heap = self._Heap
+    offset = self._Offsets[row]
+    length = shift = 0
+    while True: #the length is a little endian base 128 varint
+      byte = heap[offset]
+      offset += 1
+      length |= (byte & 0x7f) << shift
+      if byte < 0x80:
+        break
+      shift += 7
+    return heap[offset:offset + length].decode('utf-8', 'surrogateescape')
+
+  def Set(self, row, value):
+    self._Offsets[row] = self._Store(value)
+
+  def Size(self):
+    return len(self._Heap) + self._Offsets.itemsize * len(self._Offsets)
+
+  def _Store(self, value):
+    if not value:
+      return 0
+    data = value.encode('utf-8', 'surrogateescape')
+    offset = len(self._Heap)
+    length = len(data)
+    while length >= 0x80:
+      self._Heap.append(0x80 | length & 0x7f)
+      length >>= 7
+    self._Heap.append(length)
+    self._Heap += data
+    return offset
+
+## A column of interned values
+#  Every distinct value is stored once and the column holds its number. Groups,
+#  the directories of locations and Backup functions repeat across many items.
+class _InternedColumn(object):
+
+  __slots__ = ('_Values', '_Numbers', '_Column')
+
+  def __init__(self):
+    self._Values = []
+    self._Numbers = {}
+    self._Column = array.array('I')
+
+  def Append(self, value):
+    self._Column.append(self._Intern(value))
+
+  def Get(self, row):
+    return self._Values[self._Column[row]]
+
+  def Set(self, row, value):
+    self._Column[row] = self._Intern(value)
+
+  def Size(self):
+    return self._Column.itemsize * len(self._Column)
+
+  def _Intern(self, value):
+    number = self._Numbers.get(value)
+    if number is None:
+      number = self._Numbers[value] = len(self._Values)
+      self._Values.append(value)
+    return number
+
+## A column-wise collection of backup objects
+#  This class stores many backup objects as columns: an array of ids, interned
+#  groups, location directories and Backup functions, string heaps for the
+#  names, descriptions and file names of locations, and an array of timestamps.
+#  A million items take tens of MB instead of the hundreds they take as objects.
+#  Rows are reached through BackupObjectView objects, which are created on demand.
+class BackupObjectTable(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The table is empty
+  #  @param self The current object being constructed
+  def __init__(self):
+    self._Ids = array.array('q')
+    self._Names = _StringHeap()
+    self._Descriptions = _StringHeap()
+    self._Directories = _InternedColumn()
+    self._FileNames = _StringHeap()
+    self._Backups = _InternedColumn()
+    self._Groups = _InternedColumn()
+    self._LastBackups = array.array('d') #timestamps, NaN for never
+    self._Order = None #rows by id, built when the ids aren't appended in order
+    self._Sorted = True
+
+  ## Add a backup object
+  #  @pre  The id isn't in the table yet
+  #  @post The object is the last row
+  #  @param self The current instance
+  #  @param id The unique identifier of the object
+  #  @param **args The fields, as for the BackupObject constructor
+  #  @retval BackupObjectView The new row
+  #  @exception TypeError A key isn't one of the allowed ones
+  def Append(self, id, **args):
+    for key in args:
+      if key not in PROPERTIES:
+        raise TypeError("%s is not a property of a backup object" % key)
+    id = args.get('Id', id)
+    if self._Ids and id < self._Ids[-1]:
+      self._Sorted = False
+    self._Order = None
+    self._Ids.append(id)
+    self._Names.Append(args.get('Name', ''))
+    self._Descriptions.Append(args.get('Description', ''))
+    directory, fileName = _SplitLocation(args.get('Location', ''))
+    self._Directories.Append(directory)
+    self._FileNames.Append(fileName)
+    self._Backups.Append(args.get('Backup', AlwaysBackUp))
+    self._Groups.Append(args.get('Group', 'default'))
+    self._LastBackups.append(_Timestamp(args['LastBackup'] if 'LastBackup' in args else time.time()))
+    return BackupObjectView(self, len(self._Ids) - 1)
+
+  ## Add a backup object
+  #  @param self The current instance
+  #  @param backupObject A BackupObject or view
+  #  @retval BackupObjectView The new row
+  def AppendObject(self, backupObject):
+    return self.Append(backupObject.ID, Name=backupObject.Name, Description=backupObject.Description,
+                       Location=backupObject.Location, Backup=backupObject._Backup,
+                       LastBackup=backupObject.LastBackup, Group=backupObject.Group)
+
+  def __len__(self):
+    return len(self._Ids)
+
+  ## Get a row
+  #  @param self The current instance
+  #  @param row The number of the row
+  #  @retval BackupObjectView The row
+  #  @exception IndexError There is no such row
+  def __getitem__(self, row):
+    if row < 0:
+      row += len(self._Ids)
+    if not 0 <= row < len(self._Ids):
+      raise IndexError("backup object table index out of range")
+    return BackupObjectView(self, row)
+
+  def __iter__(self):
+    for row in range(len(self._Ids)):
+      yield BackupObjectView(self, row)
+
+  ## Find an object by id
+  #  @param self The current instance
+  #  @param id The id of the object
+  #  @retval BackupObjectView The row with that id, None if there is none
+  #  @brief Ids appended in increasing order are searched directly, otherwise a
+  #         sorted array of rows is built once and kept until the next Append().
+  def Find(self, id):
+    if self._Sorted:
+      row = bisect.bisect_left(self._Ids, id)
+    else:
+      if self._Order is None:
+        self._Order = array.array('I', sorted(range(len(self._Ids)), key=self._Ids.__getitem__))
+      position = bisect.bisect_left(_Keyed(self._Order, self._Ids), id)
+      row = self._Order[position] if position < len(self._Order) else len(self._Ids)
+    if row < len(self._Ids) and self._Ids[row] == id:
+      return BackupObjectView(self, row)
+    return None
+
+  ## Get the last backup times
+  #  @param self The current instance
+  #  @retval array The timestamp of the last backup of every row, NaN for never.
+  #          It can be wrapped with numpy.frombuffer to evaluate whole columns.
+  def LastBackups(self):
+    return self._LastBackups
+
+  ## Get the rows of a group
+  #  @param self The current instance
+  #  @param group The name of a group
+  #  @retval list The numbers of the rows in the group
+  def GroupRows(self, group):
+    number = self._Groups._Numbers.get(group)
+    if number is None:
+      return []
+    return [row for row, value in enumerate(self._Groups._Column) if value == number]
+
+  ## Get the memory held by the columns
+  #  @param self The current instance
+  #  @retval int The bytes used by the arrays and string heaps, not counting the
+  #          interned values
+  def MemoryUsage(self):
+    return (self._Ids.itemsize * len(self._Ids) + self._Names.Size() + self._Descriptions.Size() +
+            self._Directories.Size() + self._FileNames.Size() + self._Backups.Size() +
+            self._Groups.Size() + self._LastBackups.itemsize * len(self._LastBackups))
+
+## A row of a BackupObjectTable
+#  This class has the properties of a BackupObject and reads and writes them in
+#  the columns of its table.
+class BackupObjectView(object):
+
+  __slots__ = ('_Table', '_Row')
+
+  def __init__(self, table, row):
+    self._Table = table
+    self._Row = row
+
+  @property
+  def Name(self):
+    return self._Table._Names.Get(self._Row)
+
+  @Name.setter
+  def Name(self, newName):
+    self._Table._Names.Set(self._Row, newName)
+
+  @property
+  def Description(self):
+    return self._Table._Descriptions.Get(self._Row)
+
+  @Description.setter
+  def Description(self, newDescription):
+    self._Table._Descriptions.Set(self._Row, newDescription)
+
+  @property
+  def Location(self):
+    directory = self._Table._Directories.Get(self._Row)
+    fileName = self._Table._FileNames.Get(self._Row)
+    return directory + fileName
+
+  @Location.setter
+  def Location(self, newLocation):
+    directory, fileName = _SplitLocation(newLocation)
+    self._Table._Directories.Set(self._Row, directory)
+    self._Table._FileNames.Set(self._Row, fileName)
+
+  @property
+  def Backup(self):
+    return self._Backup(self)
+
+  @Backup.setter
+  def Backup(self, newBackupFunc):
+    self._Table._Backups.Set(self._Row, newBackupFunc)
+
+  @property
+  def _Backup(self):
+    return self._Table._Backups.Get(self._Row)
+
+  @property
+  def LastBackup(self):
+    timestamp = self._Table._LastBackups[self._Row]
+    return None if math.isnan(timestamp) else datetime.datetime.fromtimestamp(timestamp)
+
+  @LastBackup.setter
+  def LastBackup(self, newBackupTime):
+    self._Table._LastBackups[self._Row] = _Timestamp(newBackupTime)
+
+  @property
+  def Group(self):
+    return self._Table._Groups.Get(self._Row)
+
+  @Group.setter
+  def Group(self, newGroup):
+    self._Table._Groups.Set(self._Row, newGroup)
+
+  @property
+  def ID(self):
+    return self._Table._Ids[self._Row]
+
+  ## Copy the row out of the table
+  #  @param self The current instance
+  #  @retval BackupObject A standalone object with the same fields
+  def Detach(self):
+    return BackupObject(self.ID, Name=self.Name, Description=self.Description, Location=self.Location,
+                        Backup=self._Backup, LastBackup=self.LastBackup, Group=self.Group)
+
+## Sorts a row order by the ids of the rows, for bisect
+class _Keyed(object):
+
+  __slots__ = ('_Order', '_Ids')
+
+  def __init__(self, order, ids):
+    self._Order = order
+    self._Ids = ids
+
+  def __len__(self):
+    return len(self._Order)
+
+  def __getitem__(self, position):
+    return self._Ids[self._Order[position]]
+
+def _SplitLocation(location):
+  cut = max(location.rfind('/'), location.rfind('\\')) + 1
+  return location[:cut], location[cut:]
+
+def _Timestamp(value):
+  if value is None:
+    return math.nan
+  if isinstance(value, datetime.datetime):
+    return value.timestamp()
+  return float(value)
@@ -0,0 +1,226 @@
+import sys
+import instrument
+import Parser
+
+## @package batch_eval
+#  This contains a column wise evaluator for compiled backup conditions
+#
+#  Deciding what is due by calling Parser.parse() once per item means a python
+#  level loop over the whole catalog. Here the parse tree of a Condition is
+#  walked once and every node is applied to a whole column of items at a time.
+#  When numpy is installed the columns are arrays and each node is a single
+#  vectorized operation, otherwise they are plain lists. numpy takes longer to
+#  import than a short command runs, so it is only imported for a batch of at
+#  least NUMPY_MINIMUM items.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var NUMPY_MINIMUM
+#  The smallest batch numpy is imported for, smaller ones are as fast as lists
+NUMPY_MINIMUM = 256
+
+## @var numpy
+#  The numpy module once it has been imported, None before or if it isn't installed
+numpy = None
+
+## @var _numpyTried
+#  True once the import of numpy has been attempted
+_numpyTried = False
+
+## Import numpy
+#  @retval module The numpy module, None if it isn't installed
+def _load_numpy():
+  global numpy, _numpyTried
+  if not _numpyTried:
+    _numpyTried = True
+    try:
+      import numpy
+    except ImportError: #numpy is optional, the pure python columns are used without it
+      numpy = None
+  return numpy
+
+## Column operations backed by numpy
+#  Every function takes and returns either a scalar or an array of length size.
+class _NumpyColumns(object):
+
+  def __init__(self, size):
+    self.size = size
+
+  def constant(self, value):
+    return value
+
+  def elapsed(self, last, now):
+    if not isinstance(last, numpy.ndarray):
+      last = [numpy.nan if item is None else item for item in last]
+    elapsed = now - numpy.asarray(last, dtype=float)
+    elapsed[numpy.isnan(elapsed)] = numpy.inf #never backed up
+    return elapsed
+
+  def flags(self, values):
+    return numpy.asarray(values, dtype=bool)
+
+  def logical(self, name, left, right):
+    #mirror python's "and"/"or", which return one of their operands
+    if name == 'AND':
+      return numpy.where(left, right, left)
+    return numpy.where(left, left, right)
+
+  def apply(self, function, left, right):
+    return function(left, right)
+
+  def mask(self, values):
+    return numpy.broadcast_to(numpy.asarray(values, dtype=bool), (self.size,)).copy()
+
+## Column operations backed by lists
+#  The fallback used when numpy isn't installed. Scalars are kept as scalars
+#  until they meet a column so that constant parts of a condition stay cheap.
+class _ListColumns(object):
+
+  def __init__(self, size):
+    self.size = size
+
+  def constant(self, value):
+    return value
+
+  def elapsed(self, last, now):
+    infinity = float('inf')
+    return [infinity if item is None or item != item else now - item for item in last]
+
+  def flags(self, values):
+    return [bool(value) for value in values]
+
+  def logical(self, name, left, right):
+    left, right = self._pair(left, right)
+    if name == 'AND':
+      return [l and r for l, r in zip(left, right)]
+    return [l or r for l, r in zip(left, right)]
+
+  def apply(self, function, left, right):
+    if not isinstance(left, list) and not isinstance(right, list):
+      return function(left, right)
+    left, right = self._pair(left, right)
+    return [function(l, r) for l, r in zip(left, right)]
+
+  def mask(self, values):
+    if isinstance(values, list):
+      return [bool(value) for value in values]
+    return [bool(values)] * self.size
+
+  def _pair(self, left, right):
+    if not isinstance(left, list):
+      left = [left] * self.size
+    if not isinstance(right, list):
+      right = [right] * self.size
+    return left, right
+
+## Evaluate a condition for many items
+#  @pre  last and modified (when given) have the same length
+#  @post None
+#  @param condition A Parser.Condition or a condition string
+#  @param last The last backup timestamp of every item, None (or nan) for never
+#  @param now The current time as a timestamp
+#  @param modified (Optional)The Modified flag of every item. Only needed when the
+#         condition uses the keyword.
+#  @param useNumpy (Optional)Set to False to force the pure python columns
+#  @retval sequence A boolean mask, a numpy array when numpy was used and a list
+#          otherwise, true for every item the condition holds for
+#  @exception ValueError The condition uses Modified and no flags were given
+def evaluate_batch(condition, last, now, modified=None, useNumpy=True):
+  if isinstance(condition, str):
+    condition = Parser.compile_condition(condition)
+  size = len(last)
+  vectorize = useNumpy and (size >= NUMPY_MINIMUM or 'numpy' in sys.modules) and _load_numpy() is not None
+  columns = _NumpyColumns(size) if vectorize else _ListColumns(size)
+
+  cache = {}
+  def keyword(name):
+    if name not in cache:
+      if name == 'LastBU':
+        cache[name] = columns.elapsed(last, now)
+      elif modified is None:
+        raise ValueError("the condition needs a value for Modified")
+      else:
+        cache[name] = columns.flags(modified)
+    return cache[name]
+
+  def walk(node):
+    kind = node[0]
+    if kind == 'const':
+      return columns.constant(node[1])
+    if kind == 'key':
+      return keyword(node[1])
+    name, left, right = node[1], walk(node[2]), walk(node[3])
+    if name == 'AND' or name == 'OR':
+      return columns.logical(name, left, right)
+    return columns.apply(Parser._OPERATORS[name], left, right)
+
+  return columns.mask(walk(condition.tree))
+
+## Get the items that are due
+#  @pre  data is in the format returned by bumodel.Model.GetBackUpData()
+#  @post None
+#  @param data The backup items indexed by title
+#  @param now The current time as a timestamp
+#  @param modified (Optional)A function taking an item's source and returning its
+#         Modified flag, only called for items whose condition uses the keyword
+#         and isn't already decided by its other terms
+#  @param default (Optional)The condition used for items whose condition is 'Default'
+#  @param errors (Optional)A dictionary that gets the title of every item whose
+#         condition can't be evaluated mapped to the reason. Those items are
+#         left out instead of stopping the rest of the catalog.
+#  @retval list The titles of the items that are due
+#  @brief Items are grouped by their condition string so that every distinct
+#         condition is compiled once and evaluated as a single batch. A condition
+#         using Modified is first evaluated as if no item and as if every item was
+#         modified; only the items where the two differ need the flag.
+def due_items(data, now, modified=None, default='True', errors=None):
+  with instrument.Stage('condition.evaluate') as measurement:
+    measurement.Files = len(data)
+    return _due_items(data, now, modified, default, {} if errors is None else errors)
+
+def _due_items(data, now, modified, default, errors):
+  groups = {}
+  for title, item in data.items():
+    condition = item['condition']
+    if condition == 'Default':
+      condition = default
+    groups.setdefault(condition, []).append(title)
+
+  due = []
+  for expression, titles in groups.items():
+    try:
+      condition = Parser.compile_condition(expression)
+    except SyntaxError as error: #one broken condition only leaves out its own items
+      for title in titles:
+        errors[title] = 'invalid condition %r: %s' % (expression, error)
+      continue
+    last = []
+    valid = []
+    for title in titles:
+      try:
+        last.append(None if data[title]['last'] == 'never' else float(data[title]['last']))
+        valid.append(title)
+      except ValueError:
+        errors[title] = 'invalid last backup time %r' % data[title]['last']
+    titles = valid
+    try:
+      if 'Modified' not in condition.facts:
+        mask = evaluate_batch(condition, last, now)
+      else:
+        unmodified = evaluate_batch(condition, last, now, [False] * len(titles))
+        allModified = evaluate_batch(condition, last, now, [True] * len(titles))
+        mask = []
+        for title, notModified, isModified in zip(titles, unmodified, allModified):
+          if notModified != isModified:
+            if modified is None: #only the items the flag would decide are left out
+              errors[title] = 'condition %r needs Modified but there is no change index' % expression
+              notModified = False
+            elif modified(data[title]['source']):
+              notModified = isModified
+          mask.append(notModified)
+    except (ValueError, TypeError, ArithmeticError) as error:
+      for title in titles:
+        errors[title] = 'condition %r failed: %s' % (expression, error)
+      continue
+    due.extend(title for title, isDue in zip(titles, mask) if isDue)
+  return due
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+
+## @package bench_model
+#  Benchmarks for the catalog operations of bumodel.Model
+#
+#  Run it directly: python bench/bench_model.py [sizes...]
+#  Every size gets a fresh database in a temporary directory. If the lookups are
+#  constant time the cost per item stays flat as the catalog grows.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var SIZES
+#  The catalog sizes measured when none are given on the command line
+SIZES = [1000, 10000, 100000]
+
+## Time a bulk import
+#  @param directory The directory the database is created in
+#  @param count The number of items to import
+#  @retval float The seconds taken by the AddBackUpItem calls
+def bench_bulk_import(directory, count):
+  model = bumodel.Model(os.path.join(directory, 'PyBakUP-%d.xml' % count))
+  start = time.perf_counter()
+  for number in range(count):
+    model.AddBackUpItem('/data/item%d' % number, 'file', 'item %d' % number)
+  return time.perf_counter() - start
+
+## Time modifications and removals
+#  @param directory The directory the database is created in
+#  @param count The number of items in the catalog
+#  @retval float The seconds taken by one ModifyItem and one RemoveBackUpItem per item
+def bench_modify_remove(directory, count):
+  model = bumodel.Model(os.path.join(directory, 'PyBakUP-mod-%d.xml' % count))
+  for number in range(count):
+    model.AddBackUpItem('/data/item%d' % number, 'file', 'item %d' % number)
+  start = time.perf_counter()
+  for number in range(count):
+    model.ModifyItem('/data/item%d' % number, 'last', '0')
+  for number in range(count):
+    model.RemoveBackUpItem('/data/item%d' % number)
+  return time.perf_counter() - start
+
+def main(sizes):
+  with tempfile.TemporaryDirectory() as directory:
+    print('%10s %12s %14s %12s %14s' % ('items', 'import s', 'import us/item', 'mod+rm s', 'mod+rm us/item'))
+    for count in sizes:
+      imported = bench_bulk_import(directory, count)
+      modified = bench_modify_remove(directory, count)
+      print('%10d %12.3f %14.2f %12.3f %14.2f' % (count, imported, imported / count * 1e6,
+                                                  modified, modified / count * 1e6))
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Time bulk imports, modifications and removals of the xml catalog')
+  parser.add_argument('sizes', type=int, nargs='*', default=SIZES, help='catalog sizes')
+  main(parser.parse_args().sizes)
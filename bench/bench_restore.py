@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bumodel
+import chunkstore
+import generate
+import restore
+import runner
+
+## @package bench_restore
+#  Benchmarks for the latency of restores
+#
+#  Run it directly: python bench/bench_restore.py [files] [size in KB]
+#  A generated tree is backed up once as plain copies and once into a chunk
+#  store. For each the latency of restoring a single file, including opening the
+#  backup, is measured as the median over SAMPLES random files, and a full
+#  restore of the tree is timed with one worker and with the default pool.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var FILES
+#  The number of files in the tree when none is given on the command line
+FILES = 10000
+
+## @var SAMPLES
+#  The number of single file restores measured
+SAMPLES = 200
+
+## Measure the restores of one backup
+#  @param directory The scratch directory
+#  @param openBackup A function opening the backup
+#  @param paths The paths of the backed up files
+#  @retval tuple (median single file seconds, full restore seconds with one
+#          worker, full restore seconds with the default pool, bytes restored)
+def bench_backup(directory, openBackup, paths):
+  generator = random.Random(0)
+  single = []
+  for number in range(SAMPLES):
+    path = generator.choice(paths)
+    start = time.perf_counter()
+    restore.Restorer().RestoreFile(openBackup(), path, os.path.join(directory, 'single', str(number)))
+    single.append(time.perf_counter() - start)
+  shutil.rmtree(os.path.join(directory, 'single'))
+
+  full = []
+  for workers in (1, None):
+    target = os.path.join(directory, 'full')
+    start = time.perf_counter()
+    result = restore.Restorer(workers).Restore(openBackup(), target)
+    full.append(time.perf_counter() - start)
+    shutil.rmtree(target)
+  return statistics.median(single), full[0], full[1], result['bytes']
+
+def main(files, size):
+  with tempfile.TemporaryDirectory() as directory:
+    source = os.path.join(directory, 'tree')
+    generate.generate_tree(source, files, size)
+    paths = [relative for _, relative in runner.WalkFiles(source)]
+    model = bumodel.Model(os.path.join(directory, 'PyBakUP.xml'))
+    model.AddBackUpItem(source, 'folder', 'tree')
+    model.Save()
+
+    copies = os.path.join(directory, 'copies')
+    runner.BackupRunner(model, copies).Run()
+    store = chunkstore.ChunkStore(os.path.join(directory, 'store'), bloomBits=1 << 20)
+    runner.BackupRunner(model, copies, store=store).Run()
+
+    print('%8s %14s %14s %14s %10s' % ('backup', 'single ms', 'full 1 s', 'full pool s', 'MB/s'))
+    for name, openBackup in (('copies', lambda: restore.OpenBackup(copies, 'tree')),
+                             ('store', lambda: restore.OpenBackup(copies, 'tree', store=store))):
+      single, serial, parallel, restored = bench_backup(directory, openBackup, paths)
+      print('%8s %14.2f %14.3f %14.3f %10.1f' % (name, single * 1e3, serial, parallel,
+                                                 restored / parallel / 1e6))
+    store.Close()
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Time single file and full restores of copies and of a chunk store')
+  parser.add_argument('files', type=int, nargs='?', default=FILES, help='files in the backed up tree')
+  parser.add_argument('size', type=int, nargs='?', default=4, help='average file size in KB')
+  arguments = parser.parse_args()
+  main(arguments.files, arguments.size * 1024)
@@ -0,0 +1,79 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+## @package bench_startup
+#  Benchmarks for the cold start of the short lived commands
+#
+#  Run it directly: python bench/bench_startup.py [runs]
+#  Every case runs in a fresh interpreter, so imports and the building of the
+#  lexer and parser are paid each time the way they are by a cron job calling the
+#  runner. Each case is also run with the pregenerated lextab and parsetab hidden,
+#  which shows what the tables save. The median of the runs is reported.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var RUNS
+#  How many times each case is run when no count is given on the command line
+RUNS = 20
+
+## @var PACKAGE
+#  The directory holding the modules being measured
+PACKAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+## @var CASES
+#  The code run by each case
+CASES = [('import Parser', 'import Parser'),
+         ('first parse', "import Parser; Parser.parse('LastBU > 1 day || Modified', {'LastBU': 0, 'Modified': False})"),
+         ('import runner', 'import runner'),
+         ('due items', "import bumodel, runner; runner.BackupRunner(bumodel.Model(%r), '.').DueItems()")]
+
+## @var _HIDE_TABLES
+#  Run before a case to make the pregenerated tables unimportable
+_HIDE_TABLES = "import sys; sys.modules['lextab'] = None; sys.modules['parsetab'] = None; "
+
+## Time a case
+#  @param code The python code of the case
+#  @param runs The number of fresh interpreters it is run in
+#  @param directory The working directory of the runs
+#  @retval float The median wall seconds of a run
+def bench_case(code, runs, directory):
+  script = 'import sys; sys.path.insert(0, %r); %s' % (os.path.abspath(PACKAGE), code)
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', script], cwd=directory, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    timings.append(time.perf_counter() - start)
+  return statistics.median(timings)
+
+def main(runs):
+  with tempfile.TemporaryDirectory() as directory:
+    catalog = os.path.join(directory, 'PyBakUP.xml')
+    with open(catalog, 'w') as file:
+      file.write("<?xml version='1.0' encoding='utf-8'?>\n<backdb><bl>")
+      for number in range(100):
+        file.write('<bi type="file" src="/data/%d"><frequency condition="LastBU &gt; 1 day" last="never" />'
+                   '<title>item %d</title></bi>' % (number, number))
+      file.write('</bl></backdb>')
+    baseline = bench_case('pass', runs, directory)
+    print('%16s %14s %14s' % ('case', 'tables ms', 'no tables ms'))
+    print('%16s %14.1f %14s' % ('interpreter', baseline * 1e3, ''))
+    for name, code in CASES:
+      if '%r' in code:
+        code = code % catalog
+      withTables = bench_case(code, runs, directory)
+      without = bench_case(_HIDE_TABLES + code, runs, directory)
+      print('%16s %14.1f %14.1f' % (name, withTables * 1e3, without * 1e3))
+    written = sorted(os.listdir(directory))
+    if written != ['PyBakUP.xml', 'PyBakUP.xml.journal']:
+      print('files written at runtime:', ', '.join(written))
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Time the startup of the catalog and the condition parser')
+  parser.add_argument('runs', type=int, nargs='?', default=RUNS, help='fresh interpreters per case')
+  main(parser.parse_args().runs)
@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+from xml.sax.saxutils import quoteattr, escape
+
+## @package generate
+#  Generators for the synthetic catalogs and file trees the benchmarks run on
+#
+#  Everything is derived from a seed, so the same arguments always build the same
+#  catalog and the same tree and results can be compared between commits.
+#
+#  Run it directly to keep the data around:
+#  python bench/generate.py catalog PyBakUP.xml count
+#  python bench/generate.py tree directory files [size in KB]
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var CONDITIONS
+#  The conditions given to the generated items
+CONDITIONS = ['Default', 'LastBU > 1 day', 'LastBU >= 12 hours', 'LastBU > 1 day || Modified',
+              'Modified && LastBU > 30 min', 'LastBU > 1 month', 'True', 'LastBU + 2 days > 1 month']
+
+## Write a synthetic catalog
+#  @pre  None
+#  @post fileName is a catalog in the format of bumodel.Model with count items
+#  @param fileName The path of the catalog
+#  @param count The number of bi entries
+#  @param seed (Optional)The seed of the generator
+#  @brief The file is written as a stream, so a million items don't need a
+#         million elements in memory.
+def generate_catalog(fileName, count, seed=0):
+  generator = random.Random(seed)
+  with open(fileName, 'w', encoding='utf-8') as file:
+    file.write("<?xml version='1.0' encoding='utf-8'?>\n<backdb><bl>")
+    for number in range(count):
+      itemType = 'folder' if generator.random() < 0.3 else 'file'
+      source = '/data/%03d/%s%d' % (number % 1000, itemType, number)
+      last = 'never' if generator.random() < 0.1 else repr(1.7e9 + generator.random() * 1e7)
+      file.write('<bi type=%s src=%s><frequency condition=%s last=%s /><title>%s</title>'
+                 % (quoteattr(itemType), quoteattr(source), quoteattr(generator.choice(CONDITIONS)),
+                    quoteattr(last), escape('item %d' % number)))
+      if generator.random() < 0.5:
+        file.write('<description>%s</description>' % escape('generated item %d' % number))
+      file.write('</bi>')
+    file.write('</bl></backdb>')
+
+## Build a synthetic file tree
+#  @pre  directory doesn't exist or is empty
+#  @post directory holds files files spread over nested directories
+#  @param directory The root of the tree
+#  @param files The number of files
+#  @param size (Optional)The average file size in bytes, sizes vary between none
+#         and twice this
+#  @param fanout (Optional)The most files or directories in one directory
+#  @param seed (Optional)The seed of the generator
+#  @retval int The total size of the files in bytes
+def generate_tree(directory, files, size=4096, fanout=64, seed=0):
+  generator = random.Random(seed)
+  block = generator.randbytes(2 * size + 1) if hasattr(generator, 'randbytes') else os.urandom(2 * size + 1)
+  total = 0
+  for number in range(files):
+    #the digits of the number in base fanout give a stable nested path
+    parts = []
+    rest = number // fanout
+    while rest:
+      parts.append('d%d' % (rest % fanout))
+      rest //= fanout
+    parent = os.path.join(directory, *reversed(parts))
+    os.makedirs(parent, exist_ok=True)
+    length = generator.randint(0, 2 * size)
+    start = generator.randint(0, len(block) - length)
+    with open(os.path.join(parent, 'f%d' % number), 'wb') as file:
+      file.write(block[start:start + length])
+    total += length
+  return total
+
+## Modify part of a generated tree
+#  @pre  directory was built by generate_tree()
+#  @post About fraction of the files are rewritten with new contents
+#  @param directory The root of the tree
+#  @param fraction The share of the files changed
+#  @param seed (Optional)The seed of the generator
+#  @retval int The number of files changed
+def touch_tree(directory, fraction, seed=1):
+  generator = random.Random(seed)
+  changed = 0
+  for parent, directories, names in os.walk(directory):
+    for name in names:
+      if generator.random() < fraction:
+        with open(os.path.join(parent, name), 'ab') as file:
+          file.write(b'changed')
+        changed += 1
+  return changed
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Generate benchmark data')
+  kinds = parser.add_subparsers(dest='kind', required=True)
+  catalog = kinds.add_parser('catalog', help='an xml catalog')
+  catalog.add_argument('file', help='the catalog written')
+  catalog.add_argument('count', type=int, help='items in the catalog')
+  tree = kinds.add_parser('tree', help='a tree of files')
+  tree.add_argument('directory', help='the directory the tree is written to')
+  tree.add_argument('files', type=int, help='files in the tree')
+  tree.add_argument('size', type=int, nargs='?', default=4, help='average file size in KB')
+  arguments = parser.parse_args()
+  if arguments.kind == 'catalog':
+    generate_catalog(arguments.file, arguments.count)
+  else:
+    generate_tree(arguments.directory, arguments.files, arguments.size * 1024)
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import bumodel
+import generate
+import Parser
+import runner
+import snapshot
+
+## @package suite
+#  The benchmark suite covering the catalog, condition and copy hot paths
+#
+#  Run it directly: python bench/suite.py [--sizes 1000 10000 ...] [--output results.json]
+#  Every benchmark runs on data built by generate from a fixed seed in a temporary
+#  directory, so it needs nothing but this tree and runs offline. The results are
+#  printed as a table and written as JSON together with the commit and platform
+#  they were taken on. Two result files are compared with
+#  python bench/suite.py --compare old.json new.json
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var SIZES
+#  The catalog sizes measured when none are given on the command line
+SIZES = [1000, 10000, 100000]
+
+## @var TREE_FILES
+#  The number of files in the tree of the end to end runs
+TREE_FILES = 10000
+
+## @var EXPRESSIONS
+#  The number of distinct conditions in the parser benchmarks
+EXPRESSIONS = 10000
+
+## Time a call
+#  @param function The function being timed
+#  @retval tuple (wall seconds, cpu seconds, result of the function)
+def measure(function):
+  wall, cpu = time.perf_counter(), time.process_time()
+  result = function()
+  return time.perf_counter() - wall, time.process_time() - cpu, result
+
+## Benchmark the catalog
+#  @param directory The directory the catalogs are generated in
+#  @param count The number of items in the catalog
+#  @retval list The results
+def bench_catalog(directory, count):
+  fileName = os.path.join(directory, 'catalog-%d.xml' % count)
+  generate.generate_catalog(fileName, count)
+  results = []
+  def record(name, timing, items=count):
+    results.append(_Result(name, count, timing, items))
+
+  timing = measure(lambda: bumodel.Model(fileName))
+  record('model_load', timing)
+  model = timing[2]
+  timing = measure(model.GetBackUpData)
+  record('get_backup_data', timing)
+  data = list(timing[2].values())
+  record('iter_backup_data', measure(lambda: sum(1 for _ in model.IterBackUpData())))
+  record('stream_backup_data', measure(lambda: sum(1 for _ in bumodel.StreamBackUpData(fileName))))
+  snapshotName = fileName + '.snapshot'
+  record('snapshot_write', measure(lambda: snapshot.WriteSnapshot(snapshotName, model.IterBackUpData())))
+  timing = measure(lambda: snapshot.Snapshot(snapshotName))
+  record('snapshot_open', timing)
+  mapped = timing[2]
+  record('snapshot_find', measure(lambda: [mapped.Find(itemData['source']) for itemData in data]))
+  mapped.Close()
+
+  sources = [model.GetSourceByTitle('item %d' % number) for number in range(0, count, 100)]
+  def modifyAndSave():
+    for source in sources:
+      model.ModifyItem(source, 'last', '1.7e9')
+    model.Save()
+  record('save_incremental', measure(modifyAndSave), len(sources))
+  record('save_compact', measure(model._Compact))
+
+  imported = bumodel.Model(os.path.join(directory, 'import-%d.xml' % count))
+  def bulkImport():
+    for number in range(count):
+      imported.AddBackUpItem('/data/%d' % number, 'file', 'item %d' % number)
+    imported.Save()
+  record('bulk_import', measure(bulkImport))
+  batched = bumodel.Model(os.path.join(directory, 'batch-%d.xml' % count))
+  record('bulk_import_batch', measure(lambda: batched.AddBackUpItems(
+    ('/data/%d' % number, 'file', 'item %d' % number) for number in range(count))))
+  return results
+
+## Benchmark the condition parser
+#  @param count The number of distinct conditions
+#  @retval list The results
+def bench_parser(count):
+  expressions = ['LastBU > %d min || Modified && LastBU + %d hours >= 1 day' % (number, number % 24)
+                 for number in range(count)]
+  context = {'LastBU': 3600.0, 'Modified': False}
+  results = []
+  Parser.compile_condition.cache_clear()
+  results.append(_Result('parse_cold', count, measure(
+    lambda: [Parser.parse(expression, context) for expression in expressions]), count))
+  #a catalog shares a few conditions between many items, so most parses hit the cache
+  results.append(_Result('parse_cached', count, measure(
+    lambda: [Parser.parse(expressions[number % 100], context) for number in range(count)]), count))
+  Parser.compile_condition.cache_clear()
+  results.append(_Result('validate', count, measure(
+    lambda: [Parser.validate(expression) for expression in expressions]), count))
+  return results
+
+## Benchmark end to end backup runs
+#  @param directory The directory the tree and the backups are written to
+#  @param files The number of files in the tree
+#  @retval list The results
+def bench_runs(directory, files):
+  source = os.path.join(directory, 'tree')
+  size = generate.generate_tree(source, files)
+  results = []
+  for incremental in (False, True):
+    name = 'incremental' if incremental else 'full'
+    model = bumodel.Model(os.path.join(directory, 'runs-%s.xml' % name))
+    model.AddBackUpItem(source, 'folder', 'tree')
+    model.Save()
+    destination = os.path.join(directory, 'backup-%s' % name)
+    backups = runner.BackupRunner(model, destination, incremental=incremental)
+    timing = measure(backups.Run)
+    results.append(_Result('run_%s' % name, files, timing, files, timing[2]['bytes']))
+    if incremental:
+      timing = measure(backups.Run)
+      results.append(_Result('run_incremental_unchanged', files, timing, files, timing[2]['bytes']))
+      changed = generate.touch_tree(source, 0.01)
+      timing = measure(backups.Run)
+      results.append(_Result('run_incremental_1pct', files, timing, changed, timing[2]['bytes']))
+    shutil.rmtree(destination)
+  return results
+
+def _Result(name, size, timing, items, bytes=None):
+  result = {'benchmark': name, 'size': size, 'wall': timing[0], 'cpu': timing[1],
+            'us_per_item': timing[0] / max(items, 1) * 1e6}
+  if bytes is not None:
+    result['bytes'] = bytes
+  return result
+
+## Describe where the results were taken
+#  @retval dictionary The commit, python version, platform and time
+def environment():
+  try:
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+  except OSError:
+    commit = None
+  return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+          'cpus': os.cpu_count(), 'time': time.time()}
+
+## Compare two result files
+#  @param old The path of the baseline results
+#  @param new The path of the results being checked
+def compare(old, new):
+  with open(old) as file:
+    before = dict(((result['benchmark'], result['size']), result) for result in json.load(file)['results'])
+  with open(new) as file:
+    after = json.load(file)['results']
+  print('%28s %10s %12s %12s %8s' % ('benchmark', 'size', 'old s', 'new s', 'ratio'))
+  for result in after:
+    baseline = before.get((result['benchmark'], result['size']))
+    if baseline is not None:
+      print('%28s %10d %12.4f %12.4f %8.2f' % (result['benchmark'], result['size'], baseline['wall'],
+                                               result['wall'], result['wall'] / max(baseline['wall'], 1e-9)))
+
+def main(arguments):
+  if arguments.compare:
+    compare(*arguments.compare)
+    return
+  results = []
+  with tempfile.TemporaryDirectory() as directory:
+    for count in arguments.sizes:
+      results.extend(bench_catalog(directory, count))
+    results.extend(bench_parser(arguments.expressions))
+    if arguments.files:
+      results.extend(bench_runs(directory, arguments.files))
+
+  print('%28s %10s %12s %12s %14s' % ('benchmark', 'size', 'wall s', 'cpu s', 'us/item'))
+  for result in results:
+    print('%28s %10d %12.4f %12.4f %14.2f' % (result['benchmark'], result['size'], result['wall'],
+                                              result['cpu'], result['us_per_item']))
+  with open(arguments.output, 'w') as file:
+    json.dump({'environment': environment(), 'results': results}, file, indent=1)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='PyBakUP benchmark suite')
+  parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='catalog sizes')
+  parser.add_argument('--expressions', type=int, default=EXPRESSIONS, help='distinct conditions parsed')
+  parser.add_argument('--files', type=int, default=TREE_FILES, help='files in the end to end tree, 0 skips the runs')
+  parser.add_argument('--output', default='bench-results.json', help='where the JSON results are written')
+  parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+  main(parser.parse_args())
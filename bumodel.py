@@ -1,6 +1,11 @@
 import xml.etree.ElementTree as xml  #holds our database object
 from os import path                  #for checking if the xml file exists
+import os                            #for moving a corrupt database out of the way
 import sys                           #allows us to abort if there is an issue
+import time
+import itertools
+import instrument                    #stage timings for run reports
+import journal                       #write ahead journal so saves only write the changes
 
 ## @package bumodel
 #  This contains the definitions for our model object.
@@ -27,45 +32,194 @@ class Model:
   #  The xml element tree
   _XmlTree = None
 
+  ## @var _FileName
+  #  The path of the xml database
+  _FileName = 'PyBakUP.xml'
+
+  ## @var _SrcIndex
+  #  Maps the source of every backup item to its element
+  _SrcIndex = None
+
+  ## @var _TitleIndex
+  #  Maps every title to the elements using it, each mapped to its position in the
+  #  backup list
+  _TitleIndex = None
+
+  ## @var _Removed
+  #  The removed elements still in the backup list. They are swept out in one pass
+  #  once they outnumber the items, so a removal doesn't search the list.
+  _Removed = None
+
+  ## @var _Positions
+  #  Counts the positions handed to the elements as they are indexed
+  _Positions = None
+
+  ## @var _Journal
+  #  The write ahead journal holding the changes saved since the last snapshot
+  _Journal = None
+
+  ## @var _Pending
+  #  The operations applied to the tree that haven't been saved yet
+  _Pending = None
+
+  ## @var _Depth
+  #  How many Batch() blocks are open
+  _Depth = 0
+
+  ## @var COMPACT_MINIMUM
+  #  The journal is folded into a new snapshot once it holds more operations than
+  #  this and than there are items in the catalog, keeping the amortized cost of
+  #  a save proportional to the change.
+  COMPACT_MINIMUM = 1024
 
   ## The constructor.
   #  @pre  None
   #  @post Ensures the the file PyBakUP.xml exists - and if it doesn't creates it
-  #        and saves it.
+  #        and saves it. Changes saved to the journal since the last snapshot are
+  #        replayed on top of it.
   #  @param self The current instance pointer
-  #  @todo Decide whether or not to save on a bad parse (my assumption is that we have a bad xml file and i'm not sure how to recover from that yet)
-  def __init__(self):
+  #  @param fileName (Optional)The path of the xml database. Defaults to PyBakUP.xml
+  #
+  #  @brief A database that can't be parsed is never thrown away. It is renamed
+  #  with a .corrupt suffix (along with its journal) so it can be recovered by hand
+  #  and an empty database takes its place.
+  def __init__(self, fileName='PyBakUP.xml'):
     print('running init')
-    if not path.exists('PyBakUP.xml'): #if the file doens't exist lets make it and set defaults
+    self._FileName = fileName
+    self._Journal = journal.Journal(fileName + '.journal')
+    self._Pending = []
+    if not path.exists(fileName): #if the file doens't exist lets make it and set defaults
       self._InitElementTree()  
-      self.Save()
-    else:
-      try: #we need to attempt a parse. If there is an issue with the parse we recreate the file
-        self._XmlTree = xml.parse('PyBakUP.xml')#parse our tree
-      except:
-        self._InitElementTree()
-        self.Save() #This is up in the air
+      self._BuildIndex()
+      self._Compact()
+      return
+
+    try: #we need to attempt a parse. If there is an issue with the parse we recreate the file
+      with instrument.Stage('catalog.load') as measurement:
+        measurement.Bytes = path.getsize(fileName)
+        self._XmlTree = xml.parse(fileName)#parse our tree
+    except xml.ParseError:
+      self._SetAside()
+      self._InitElementTree()
+      self._BuildIndex()
+      self._Compact()
+      return
+
+    with instrument.Stage('catalog.index'):
+      self._BuildIndex()
+      self._Replay()
 
   ## Save the document.
   #  @pre  We should have a valid xmltree to be saved
-  #  @post The current version of the db is saved.
-  #        This function will attempt to write the element tree to the file, however
-  #        if there is some form of corruption it will catch it and exit the program.
+  #  @post The current version of the db is durably saved.
   #  @param self The current instance pointer
   #
   #  @brief This function allows us to save the tree to an xml database.
-  #  It essentially overwrites the whole file because the tree in memory
-  #  is the most recent version. If an exception is raised, then the program will abort
-  #  after closing the file.
+  #  Only the changes made since the last save are written, by appending them to
+  #  the journal. Once the journal grows past COMPACT_MINIMUM operations and the
+  #  size of the catalog it is folded into a fresh snapshot, which is written to a
+  #  temporary file and renamed over the old one so a crash can't corrupt it.
   def Save(self):
-    file = open('PyBakUP.xml', 'wb')
+    with instrument.Stage('catalog.save'):
+      self._Save()
+
+  def _Save(self):
+    if self._Journal.Count + len(self._Pending) > max(self.COMPACT_MINIMUM, len(self._SrcIndex)):
+      self._Compact()
+    else:
+      self._Journal.Append(self._Pending)
+      self._Pending = []
+
+  ## Write a new snapshot
+  #  @pre  We should have a valid xmltree to be saved
+  #  @post The whole tree is saved atomically and the journal is emptied
+  #  @param self The current instance pointer
+  def _Compact(self):
+    self._Sweep()
+    root = self._XmlTree.getroot()
+    generation = int(root.get('generation', '0')) + 1
+    root.set('generation', str(generation))
+    writeTree = lambda file: self._XmlTree.write(file, xml_declaration=True, encoding='utf-8', method='xml')
+    journal.ReplaceFile(self._FileName, writeTree)
+    self._Journal.Reset(generation)
+    self._Pending = []
+
+  ## Replay the journal
+  #  @pre  The snapshot has been loaded and indexed
+  #  @post Every change saved since the snapshot was written is applied to the tree
+  #  @param self The current instance pointer
+  #  @brief A journal left over from an older generation was already folded into
+  #         the snapshot before a crash stopped it from being reset, so it is
+  #         skipped rather than applied twice.
+  def _Replay(self):
+    operations = self._Journal.Replay()
+    generation = int(self._XmlTree.getroot().get('generation', '0'))
+    if self._Journal.Generation != generation:
+      self._Journal.Reset(generation)
+      return
+    for operation in operations:
+      self._Apply(operation)
+    self._Pending = []
 
-    try:
-      self._XmlTree.write(file, xml_declaration=True, encoding='utf-8', method='xml')
-    except:
-      print("unable to save - xml tree is corrupt")
-    finally:
-      file.close()
+  ## Apply a journal operation
+  #  @param self The current instance pointer
+  #  @param operation An operation in the format of _Pending
+  def _Apply(self, operation):
+    if operation[0] == 'add':
+      self.AddBackUpItem(*operation[1:])
+    elif operation[0] == 'remove':
+      self.RemoveBackUpItem(*operation[1:])
+    elif operation[0] == 'modify':
+      self.ModifyItem(*operation[1:])
+
+  ## Group changes into one transaction
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval Transaction A context manager. The changes made in its body are
+  #          saved once when it ends, or undone if it raises. Nested blocks only
+  #          save when the outermost one ends.
+  #
+  #  @brief with model.Batch():
+  #           model.AddBackUpItem(...)
+  #           model.ModifyItem(...)
+  def Batch(self):
+    return Transaction(self)
+
+  def _BeginBatch(self):
+    self._Depth += 1
+    return len(self._Pending)
+
+  def _EndBatch(self, mark):
+    self._Depth -= 1
+    if not self._Depth:
+      self.Save()
+
+  ## Undo the changes of a failed batch
+  #  @param self The current instance pointer
+  #  @param mark The number of unsaved operations when the batch began
+  #  @brief The saved state is reloaded from the snapshot and the journal, then
+  #         the unsaved operations made before the batch are applied again.
+  def _AbortBatch(self, mark):
+    self._Depth -= 1
+    operations = self._Pending[:mark]
+    self._XmlTree = xml.parse(self._FileName)
+    self._BuildIndex()
+    self._Replay()
+    for operation in operations:
+      self._Apply(operation)
+    self._Pending = operations
+
+  ## Move a corrupt database out of the way
+  #  @pre  The database file couldn't be parsed
+  #  @post The database and its journal are renamed with a .corrupt suffix
+  #  @param self The current instance pointer
+  def _SetAside(self):
+    suffix = '.corrupt-%d' % time.time()
+    print("unable to read %s - moved it to %s" % (self._FileName, self._FileName + suffix), file=sys.stderr)
+    os.replace(self._FileName, self._FileName + suffix)
+    if path.exists(self._Journal.FileName):
+      os.replace(self._Journal.FileName, self._Journal.FileName + suffix)
 
   ## Add a new backup item to our database.
   #  @pre  We must give either a file or folder.
@@ -82,42 +236,53 @@ class Model:
   #  It doesn't actually perform the insert until it is confirmed that the new entry
   #  isn't a duplicate.
   def AddBackUpItem(self, source, itemType, title, description=''):
-    bl = self._GetBackupList()
-    backupItems = bl.findall('bi')
+    return self._AddItem(self._GetBackupList(), source, itemType, title, description)
 
+  ## Add a backup item to the backup list
+  #  @param self The current instance pointer
+  #  @param bl The backup list element, looked up once by AddBackUpItems()
+  #  @retval bool True if element was inserted false otherwise
+  #  @see AddBackUpItem() for the other parameters
+  def _AddItem(self, bl, source, itemType, title, description=''):
     #here we check to ensure the type was set
     #we also ensure that the source isn't already backed up
-    if (itemType != 'folder' and itemType != 'file') or any(item.get('src', '') == source for item in backupItems):
+    if (itemType != 'folder' and itemType != 'file') or source in self._SrcIndex:
       return False #we had a bad entry
 
     #if we reached here, the src wasn't already being backed up
     #so we add it to the list
 
     #create the item itself
-    newItem = xml.Element('bi')
-    newItem.set('type', itemType)
-    newItem.set('src', source)
+    newItem = xml.Element('bi', {'type': itemType, 'src': source})
     #create the frequency element
-    newItemFrequency = xml.Element('frequency')
-    newItemFrequency.set('condition','Default')
-    newItemFrequency.set('last', 'never')
-    newItem.append(newItemFrequency)
+    xml.SubElement(newItem, 'frequency', {'condition': 'Default', 'last': 'never'})
     #create the title
-    newTitle = xml.Element('title')
-    newTitle.text = title
-    newItem.append(newTitle)
+    xml.SubElement(newItem, 'title').text = title
 
     #create the description if set
     if description :
-      newItemDescription = xml.Element('description')
-      newItemDescription.text = description
-      newItem.append(newItemDescription)
+      xml.SubElement(newItem, 'description').text = description
 
     #finally, add the newly built backup item to our element tree
     bl.append(newItem)
+    self._IndexItem(newItem)
+    self._Pending.append(['add', source, itemType, title, description])
     return True
   
 
+  ## Add many backup items
+  #  @pre  None
+  #  @post The valid items are added and saved as one Batch()
+  #  @param self The current instance pointer
+  #  @param items An iterable of (source, itemType, title[, description]) tuples,
+  #         the arguments of AddBackUpItem()
+  #  @retval list Whether each item was inserted, False for a bad type or a source
+  #               that is already backed up, including earlier in items
+  def AddBackUpItems(self, items):
+    with self.Batch():
+      bl = self._GetBackupList()
+      return [self._AddItem(bl, *item) for item in items]
+
   ## Get a detailed list of elements in the database.
   #  @pre  The tree must not be corrupt
   #  @post None
@@ -131,34 +296,49 @@ class Model:
   #         by the items title.
   def GetBackUpData(self):
     bl = self._GetBackupList()
-    backupItems = bl.findall('bi')
+    backupItems = [backupItem for backupItem in bl.iterfind('bi') if backupItem not in self._Removed]
     #the list we of all file/folder names
     backupItemsValues = {}
 
-    for backupItem in backupItems:
-      itemData = {}
-      #get item details
-      itemData['source'] = backupItem.get('src')
-      itemData['type'] = backupItem.get('type')
-      #get item backup preferences
-      frequency = backupItem.find('frequency')
-      itemData['last'] = frequency.get('last')
-      itemData['condition'] = frequency.get('condition')
-      #get item description
-      description = backupItem.find('description')
-      descriptionText = ''
-      if description != None:
-        descriptionText = description.text
-      itemData['description'] = descriptionText
-      
-      #get item name
-      name = backupItem.find('title').text
-
-      #add our info to the list
-      backupItemsValues[name] = itemData
+    with instrument.Stage('catalog.read') as measurement:
+      measurement.Files = len(backupItems)
+      for backupItem in backupItems:
+        #get item name
+        name = backupItem.find('title').text
+
+        #add our info to the list
+        backupItemsValues[name] = self._ItemData(backupItem)
 
     return backupItemsValues
 
+  ## Iterate over the elements in the database.
+  #  @pre  The tree must not be corrupt
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval generator Yields a (title, item data) pair for every backup item, the
+  #                    item data is in the same format as GetBackUpData()
+  #
+  #  @brief The generator counterpart of GetBackUpData(). Callers that only need
+  #         some of the items don't have to build the whole dictionary first.
+  #         The tree must not be modified while the generator is in use.
+  def IterBackUpData(self):
+    for backupItem in self._GetBackupList().iterfind('bi'):
+      if backupItem not in self._Removed:
+        yield backupItem.find('title').text, self._ItemData(backupItem)
+
+  ## Iterate over the saved elements in the database.
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval generator Yields a (title, item data) pair for every backup item
+  #                    saved in the database file, see StreamBackUpData()
+  #
+  #  @brief A Model never rereads its file, so a long running reader such as
+  #         watcher.Watcher uses this to see the items other processes saved
+  #         since it was loaded. Its own unsaved changes aren't included.
+  def IterSavedBackUpData(self):
+    return StreamBackUpData(self._FileName)
+
   ## Remove a backup item from the database.
   #  @pre  The xml structure must be intact
   #  @post The internal xml tree is modified such that
@@ -167,15 +347,37 @@ class Model:
   #  @param source The source that is being removed from the database
   #
   #  @brief This function gives a way of deleting an item from out
-  #         xml database. It only deletes backup items.
+  #         xml database. It only deletes backup items. The element is only
+  #         marked as removed, see _Sweep().
   def RemoveBackUpItem(self, source):
-    bl = self._GetBackupList()
-    backupItems = bl.findall('bi')
-    
-    for backupItem in backupItems:
-      if backupItem.get('src') == source:
-        bl.remove(backupItem)
-        break
+    backupItem = self._SrcIndex.get(source)
+    if backupItem is not None:
+      self._UnindexItem(backupItem)
+      self._Removed.add(backupItem)
+      self._Pending.append(['remove', source])
+      if len(self._Removed) > len(self._SrcIndex):
+        self._Sweep()
+
+  ## Remove many backup items
+  #  @pre  The xml structure must be intact
+  #  @post None of the sources are in the tree and the change is saved as one Batch()
+  #  @param self The current instance pointer
+  #  @param sources An iterable of the sources being removed
+  def RemoveBackUpItems(self, sources):
+    with self.Batch():
+      for source in sources:
+        self.RemoveBackUpItem(source)
+
+  ## Modify many backup items
+  #  @pre  The new values should be valid values
+  #  @post Every change is applied in order and saved as one Batch()
+  #  @param self The current instance pointer
+  #  @param changes An iterable of (source, attribute, attributeValue) tuples,
+  #         the arguments of ModifyItem()
+  def ModifyItems(self, changes):
+    with self.Batch():
+      for source, attribute, attributeValue in changes:
+        self.ModifyItem(source, attribute, attributeValue)
 
   ## Modify an attribute of a backup item
   #  @pre  The xml structure must be intact, the new attributeValue
@@ -190,27 +392,139 @@ class Model:
   #         attributes for a backup item. It handles modifying at any
   #         level of nesting that is needed for the attribute.
   def ModifyItem(self, source, attribute, attributeValue):
-    bl = self._GetBackupList()
-    backupItems = bl.findall('bi')
-
-    itemForModification = None
-    for backupItem in backupItems:
-      if backupItem.get('src') == source:
-        itemForModification = backupItem
+    itemForModification = self._SrcIndex.get(source)
     
     if itemForModification == None: #ensure that we actually have an item to modify
       return
+    self._Pending.append(['modify', source, attribute, attributeValue])
 
     if attribute == 'last' or attribute == 'condition': #changing frequency condition or last
       frequency = itemForModification.find('frequency')
       frequency.set(attribute, attributeValue)
-    elif attribute == 'title':#changing title
+    elif attribute == 'title':#changing title, the item keeps its place in the list
+      position = self._UnindexTitle(itemForModification)
       title = itemForModification.find('title')
       title.text = attributeValue
+      self._IndexTitle(itemForModification, position)
+    elif attribute == 'compression':#changing the compression spec, see compress
+      itemForModification.set('compression', attributeValue)
+    elif attribute == 'group':#changing the group, which the runner's group limits apply to
+      itemForModification.set('group', attributeValue)
     elif attribute == 'description':#changing description
       description = itemForModification.find('description')
+      if description == None: #items added without a description don't have the element
+        description = xml.SubElement(itemForModification, 'description')
       description.text = attributeValue
 
+  ## Get a single backup item
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @param source The source of the item
+  #  @retval dictionary The item's data in the same format as GetBackUpData() plus
+  #                     its 'title', or None if the source isn't backed up
+  def GetBackUpItem(self, source):
+    backupItem = self._SrcIndex.get(source)
+    if backupItem == None:
+      return None
+    itemData = self._ItemData(backupItem)
+    itemData['title'] = backupItem.find('title').text
+    return itemData
+
+  ## Get the source of a backup item by its title
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @param title The title of the item
+  #  @retval string The source of the item or None if no item has the title.
+  #                 When titles are shared the last item in the backup list wins,
+  #                 like GetBackUpData()
+  def GetSourceByTitle(self, title):
+    items = self._TitleIndex.get(title)
+    if not items:
+      return None
+    return max(items, key=items.get).get('src')
+
+  ## Get the data of a backup item element
+  #  @pre  The element must be a complete backup item
+  #  @post None
+  #  @param backupItem The bi element
+  #  @retval dictionary The item's source, type, last, condition, description, compression and group
+  #  @note Static so that StreamBackUpData() can share it without a model
+  @staticmethod
+  def _ItemData(backupItem):
+    itemData = {}
+    #get item details
+    itemData['source'] = backupItem.get('src')
+    itemData['type'] = backupItem.get('type')
+    #get item backup preferences
+    frequency = backupItem.find('frequency')
+    itemData['last'] = frequency.get('last')
+    itemData['condition'] = frequency.get('condition')
+    #get item description
+    description = backupItem.find('description')
+    descriptionText = ''
+    if description != None:
+      descriptionText = description.text
+    itemData['description'] = descriptionText
+    itemData['compression'] = backupItem.get('compression', 'none')
+    itemData['group'] = backupItem.get('group', 'default')
+    return itemData
+
+  ## Build the lookup indexes
+  #  @pre  The element tree must be loaded
+  #  @post _SrcIndex and _TitleIndex describe every backup item in the tree
+  #  @param self The current instance pointer
+  #  @brief The indexes let adds, removes and modifications find an item without
+  #         scanning the whole backup list. They are built once here and kept up
+  #         to date by every mutation.
+  def _BuildIndex(self):
+    self._SrcIndex = {}
+    self._TitleIndex = {}
+    self._Removed = set()
+    self._Positions = itertools.count()
+    for backupItem in self._GetBackupList().findall('bi'):
+      self._IndexItem(backupItem)
+
+  ## Add an element to the lookup indexes
+  #  @pre  The element is the last one of the backup list
+  #  @param self The current instance pointer
+  #  @param backupItem The bi element being indexed
+  def _IndexItem(self, backupItem):
+    self._SrcIndex[backupItem.get('src')] = backupItem
+    self._IndexTitle(backupItem, next(self._Positions))
+
+  ## Remove an element from the lookup indexes
+  #  @param self The current instance pointer
+  #  @param backupItem The bi element being removed
+  def _UnindexItem(self, backupItem):
+    del self._SrcIndex[backupItem.get('src')]
+    self._UnindexTitle(backupItem)
+
+  def _IndexTitle(self, backupItem, position):
+    self._TitleIndex.setdefault(backupItem.find('title').text, {})[backupItem] = position
+
+  def _UnindexTitle(self, backupItem):
+    title = backupItem.find('title').text
+    items = self._TitleIndex[title]
+    position = items.pop(backupItem)
+    if not items:
+      del self._TitleIndex[title]
+    return position
+
+  ## Drop the removed elements from the backup list
+  #  @pre  None
+  #  @post The backup list only holds the items
+  #  @param self The current instance pointer
+  #  @brief The list is rebuilt in a single pass. It only happens once there are
+  #         more removed elements than items, so every removal pays for a
+  #         constant share of it.
+  def _Sweep(self):
+    if self._Removed:
+      bl = self._GetBackupList()
+      bl[:] = [backupItem for backupItem in bl if backupItem not in self._Removed]
+      self._Removed = set()
+
   ## Get the backup list from the element tree.
   #  @pre  The xml structure should be intact, and there should be
   #        a backup list tag(no more than one)
@@ -235,6 +549,130 @@ class Model:
     root.append(xml.Element('bl'))
     self._XmlTree = xml.ElementTree(root)
 
+## A group of changes
+#  This class is the context manager returned by Model.Batch() and
+#  sqlmodel.SqliteModel.Batch().
+class Transaction(object):
+
+  def __init__(self, model):
+    self._Model = model
+    self._Mark = None
+
+  def __enter__(self):
+    self._Mark = self._Model._BeginBatch()
+    return self._Model
+
+  def __exit__(self, exceptionType, exception, traceback):
+    if exceptionType is None:
+      self._Model._EndBatch(self._Mark)
+    else:
+      self._Model._AbortBatch(self._Mark)
+
+## @var SQLITE_EXTENSIONS
+#  Database files with these extensions are opened with sqlmodel.SqliteModel
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+## Open a data model
+#  @pre  None
+#  @post None
+#  @param fileName (Optional)The path of the database. Defaults to PyBakUP.xml
+#  @retval Model An xml Model, or an sqlmodel.SqliteModel when the file name has
+#                one of the SQLITE_EXTENSIONS. Both have the same api.
+def OpenModel(fileName='PyBakUP.xml'):
+  if path.splitext(fileName)[1].lower() in SQLITE_EXTENSIONS:
+    import sqlmodel #imported here since sqlmodel depends on this module
+    return sqlmodel.SqliteModel(fileName)
+  return Model(fileName)
+
+## Stream the items of a database file.
+#  @pre  None
+#  @post None
+#  @param fileName (Optional)The path of the xml database. Defaults to PyBakUP.xml
+#  @retval generator Yields a (title, item data) pair for every backup item, the
+#                    item data is in the same format as Model.GetBackUpData()
+#
+#  @brief A read only alternative to building a Model. The snapshot is read with
+#         iterparse and every item is discarded once it has been yielded, so a
+#         catalog of any size is scanned in constant memory. Changes saved to the
+#         journal since the snapshot are applied on the fly, which only needs
+#         memory for the journal (it is bounded by compaction).
+#         The items are yielded in the order a Model would hold them.
+def StreamBackUpData(fileName='PyBakUP.xml'):
+  if not path.exists(fileName):
+    return
+  changes = journal.Journal(fileName + '.journal')
+  operations = changes.Replay(repair=False) #a writer may be appending, so leave the file alone
+  generation = None
+  overlay = None
+  backupList = None
+
+  for event, element in xml.iterparse(fileName, events=('start', 'end')):
+    if event == 'start':
+      if element.tag == 'backdb':
+        generation = int(element.get('generation', '0'))
+      elif element.tag == 'bl':
+        backupList = element
+      continue
+    if element.tag != 'bi' or backupList is None:
+      continue
+
+    if overlay is None: #the generation is known once the first item is complete
+      overlay = _JournalOverlay(operations, changes.Generation == generation)
+    source = element.get('src')
+    change = overlay.get(source)
+    if change is None:
+      yield element.find('title').text, Model._ItemData(element)
+    elif change[0] == 'patch':
+      title, itemData = element.find('title').text, Model._ItemData(element)
+      title = change[1].pop('title', title)
+      itemData.update(change[1])
+      yield title, itemData
+    backupList.clear() #drop the items that have already been handed out
+
+  if overlay is None:
+    overlay = _JournalOverlay(operations, changes.Generation == generation)
+  for change in overlay.values():
+    if change[0] == 'item':
+      yield change[1], change[2]
+
+## Fold journal operations into per source changes
+#  @pre  operations were read from the journal of the snapshot being streamed
+#  @post None
+#  @param operations The journal operations
+#  @param current False if the journal belongs to another generation of the
+#         snapshot, in which case the operations are ignored
+#  @retval dictionary Maps each changed source to ('removed',), to ('patch', changes)
+#                     for items of the snapshot or to ('item', title, item data)
+#                     for items added after it.
+def _JournalOverlay(operations, current):
+  overlay = {}
+  if not current:
+    return overlay
+
+  for operation in operations:
+    kind, source = operation[0], operation[1]
+    if kind == 'add':
+      itemType, title, description = operation[2:5]
+      itemData = {'source': source, 'type': itemType, 'last': 'never',
+                  'condition': 'Default', 'description': description, 'compression': 'none',
+                  'group': 'default'}
+      overlay.pop(source, None) #a re-added item moves to the end like it does in a Model
+      overlay[source] = ('item', title, itemData)
+    elif kind == 'remove':
+      overlay[source] = ('removed',)
+    elif kind == 'modify':
+      attribute, value = operation[2], operation[3]
+      if attribute not in ('last', 'condition', 'title', 'description', 'compression', 'group'):
+        continue
+      change = overlay.setdefault(source, ('patch', {}))
+      if change[0] == 'patch':
+        change[1][attribute] = value
+      elif change[0] == 'item' and attribute == 'title':
+        overlay[source] = ('item', value, change[2])
+      elif change[0] == 'item':
+        change[2][attribute] = value
+  return overlay
+
 '''
 #This is a testing interface for the model
 #for the first tests of functionality
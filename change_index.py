@@ -0,0 +1,243 @@
+import hashlib
+import os
+import sqlite3
+import stat
+import time
+
+## @package change_index
+#  This contains the persistent change index used to answer the Modified keyword
+#
+#  When an item is backed up its state is recorded here, keyed by the item's
+#  source. Modified is then answered by comparing the file system against that
+#  record. For a file item the size, mtime, inode and ctime are compared first
+#  and the contents are only hashed when those are ambiguous: the mtime moved but
+#  the size didn't, the inode changed, the ctime changed under an unchanged
+#  mtime, or the file was written so close to the recording that an edit within
+#  the same timestamp tick can't be ruled out. Recording a file only reads its
+#  contents when its stat data is ambiguous already: it is racy, or the mtime
+#  was set back since the last record. Any other file is recorded by its stat
+#  data alone, and counts as modified if that becomes ambiguous.
+#  A folder item keeps one summary per directory, a digest of the names and stat
+#  data of its entries, so an unchanged tree is confirmed without reading any
+#  file data and the check stops at the first directory that differs. Where a
+#  watcher.ChangeJournal covers a folder item it is asked instead and the tree
+#  isn't walked at all.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var _SCHEMA
+#  The statements that create the index. They are safe to run on an existing one.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+  item     TEXT PRIMARY KEY,
+  size     INTEGER NOT NULL,
+  mtime    INTEGER NOT NULL,
+  inode    INTEGER NOT NULL,
+  recorded INTEGER NOT NULL,
+  hash     BLOB,
+  ctime    INTEGER
+);
+CREATE TABLE IF NOT EXISTS folders (
+  item     TEXT PRIMARY KEY,
+  recorded INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+  item   TEXT NOT NULL,
+  path   TEXT NOT NULL,
+  digest BLOB NOT NULL,
+  PRIMARY KEY (item, path)
+);
+'''
+
+## @var RACY_NS
+#  A file modified less than this long before it was recorded may have been
+#  written again within the same mtime tick, so its metadata is ambiguous
+RACY_NS = 2 * 10**9
+
+## @var BLOCK_SIZE
+#  The read size used when hashing file contents
+BLOCK_SIZE = 1 << 20
+
+## The change index
+#  This class records the state of backup items and tells whether they changed.
+class ChangeIndex(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The index database exists with the current schema
+  #  @param self The current object being constructed
+  #  @param fileName (Optional)The path of the index database
+  #  @param useHash (Optional)Record content hashes of file items whose stat data
+  #         is ambiguous when they are recorded, so it can be settled by reading
+  #         the file. Without them an ambiguous file counts as modified.
+  #  @param journal (Optional)A watcher.ChangeJournal to answer for folder items
+  def __init__(self, fileName='PyBakUP.changes.db', useHash=True, journal=None):
+    self.UseHash = useHash
+    self.Journal = journal
+    #the runner records items from its worker threads, one at a time
+    self._Connection = sqlite3.connect(fileName, timeout=30, check_same_thread=False)
+    self._Connection.execute('PRAGMA journal_mode=WAL')
+    self._Connection.executescript(_SCHEMA)
+    columns = [row[1] for row in self._Connection.execute('PRAGMA table_info(files)')]
+    if 'ctime' not in columns: #an index from before ctimes were recorded
+      with self._Connection:
+        self._Connection.execute('ALTER TABLE files ADD COLUMN ctime INTEGER')
+
+  ## Close the index
+  #  @param self The current instance
+  def Close(self):
+    self._Connection.close()
+
+  ## Check if an item changed
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance
+  #  @param source The source of the backup item
+  #  @retval bool True if the item changed since it was last recorded, or was never recorded
+  def IsModified(self, source):
+    if os.path.isdir(source):
+      return self._FolderModified(source)
+    return self._FileModified(source)
+
+  ## Get a Modified value for an evaluation context
+  #  @param self The current instance
+  #  @param source The source of the backup item
+  #  @retval function A callable for the 'Modified' key of a Parser context, so the
+  #                   file system is only checked if the condition gets that far
+  def Modified(self, source):
+    return lambda: self.IsModified(source)
+
+  ## Record an item
+  #  @pre  The item should have just been backed up
+  #  @post The current state of the item is what IsModified() compares against
+  #  @param self The current instance
+  #  @param source The source of the backup item
+  def Record(self, source):
+    with self._Connection:
+      previous = self._Connection.execute('SELECT size, mtime, ctime FROM files WHERE item = ?', (source,)).fetchone()
+      self._Forget(source)
+      if os.path.isdir(source):
+        recorded = time.time_ns()
+        self._Connection.execute('INSERT INTO folders (item, recorded) VALUES (?, ?)', (source, recorded))
+        if self.Journal is None or not self.Journal.IsTracked(source, recorded / 1e9):
+          #without digests the item counts as modified if the journal stops covering it
+          rows = ((source, directory, digest) for directory, digest in _WalkDigests(source))
+          self._Connection.executemany('INSERT INTO dirs (item, path, digest) VALUES (?, ?, ?)', rows)
+      elif os.path.lexists(source):
+        info = os.stat(source)
+        recorded = time.time_ns()
+        digest = None
+        if self.UseHash and (info.st_mtime_ns >= recorded - RACY_NS or _Reset(previous, info)):
+          digest = HashFile(source) #the next check can't trust the stat data, reading the file settles it
+        self._Connection.execute(
+          'INSERT INTO files (item, size, mtime, inode, recorded, hash, ctime) VALUES (?, ?, ?, ?, ?, ?, ?)',
+          (source, info.st_size, info.st_mtime_ns, info.st_ino, recorded, digest, info.st_ctime_ns))
+
+  ## Forget an item
+  #  @pre  None
+  #  @post The item is treated as never recorded
+  #  @param self The current instance
+  #  @param source The source of the backup item
+  def Forget(self, source):
+    with self._Connection:
+      self._Forget(source)
+
+  def _Forget(self, source):
+    self._Connection.execute('DELETE FROM files WHERE item = ?', (source,))
+    self._Connection.execute('DELETE FROM folders WHERE item = ?', (source,))
+    self._Connection.execute('DELETE FROM dirs WHERE item = ?', (source,))
+
+  ## Check a file item
+  #  @param self The current instance
+  #  @param source The path of the file
+  #  @retval bool True if the file changed
+  def _FileModified(self, source):
+    row = self._Connection.execute(
+      'SELECT size, mtime, inode, recorded, hash, ctime FROM files WHERE item = ?', (source,)).fetchone()
+    if row is None:
+      return True
+    size, mtime, inode, recorded, digest, ctime = row
+    try:
+      info = os.stat(source)
+    except OSError: #a vanished file is a change
+      return True
+
+    if info.st_size != size:
+      return True
+    ambiguous = info.st_mtime_ns != mtime or info.st_ino != inode or mtime >= recorded - RACY_NS or \
+                _Reset((size, mtime, ctime), info)
+    if not ambiguous:
+      return False
+    if digest is None:
+      return True
+    return HashFile(source) != digest
+
+  ## Check a folder item
+  #  @param self The current instance
+  #  @param source The path of the folder
+  #  @retval bool True if any directory in the tree changed
+  def _FolderModified(self, source):
+    if self.Journal is not None:
+      row = self._Connection.execute('SELECT recorded FROM folders WHERE item = ?', (source,)).fetchone()
+      if row is not None and self.Journal.IsTracked(source, row[0] / 1e9):
+        return self.Journal.IsDirty(source, row[0] / 1e9)
+    recorded = dict(self._Connection.execute(
+      'SELECT path, digest FROM dirs WHERE item = ?', (source,)))
+    if not recorded:
+      return True
+    seen = 0
+    for directory, digest in _WalkDigests(source):
+      if recorded.get(directory) != digest:
+        return True
+      seen += 1
+    return seen != len(recorded)
+
+## Check for an mtime set back
+#  @param record The (size, mtime_ns, ctime_ns) recorded for a file, or None
+#  @param info The stat result of the file now
+#  @retval bool True if the size and mtime match the record but the ctime
+#          doesn't, as when a tool restores the mtime after writing the file
+def _Reset(record, info):
+  return record is not None and record[2] is not None and record[0] == info.st_size and \
+         record[1] == info.st_mtime_ns and record[2] != info.st_ctime_ns
+
+## Digest the directories of a tree
+#  @pre  None
+#  @post None
+#  @param top The root of the tree
+#  @retval generator Yields (relative path, digest) for every directory, parents
+#                    before their children. A digest covers the name, type, size,
+#                    mtime and inode of every entry in the directory.
+def _WalkDigests(top):
+  pending = ['']
+  while pending:
+    relative = pending.pop()
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+      entries = sorted(os.scandir(os.path.join(top, relative)), key=lambda entry: entry.name)
+    except OSError:
+      entries = []
+    for entry in entries:
+      try:
+        info = entry.stat(follow_symlinks=False)
+      except OSError:
+        continue
+      isDirectory = stat.S_ISDIR(info.st_mode)
+      if isDirectory: #a directory's own stat changes with its entries, which are covered by its digest
+        record = '%s\0d\n' % entry.name
+        pending.append(os.path.join(relative, entry.name))
+      else:
+        record = '%s\0%o\0%d\0%d\0%d\n' % (entry.name, info.st_mode, info.st_size,
+                                            info.st_mtime_ns, info.st_ino)
+      digest.update(record.encode('utf-8', 'surrogateescape'))
+    yield relative, digest.digest()
+
+## Hash a file
+#  @param fileName The path of the file
+#  @retval bytes The digest of the file's contents, read in BLOCK_SIZE blocks
+def HashFile(fileName):
+  digest = hashlib.blake2b()
+  with open(fileName, 'rb') as file:
+    for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+      digest.update(block)
+  return digest.digest()
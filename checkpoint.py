@@ -0,0 +1,313 @@
+import os
+import sys
+import threading
+import time
+import journal
+
+## @package checkpoint
+#  This contains the checkpoints that let an interrupted backup run resume
+#
+#  The 'last' time of an item is only written once all of its files are backed
+#  up, so a run killed part way through a large folder item would otherwise
+#  start that item over. While an item is backed up the runner reports every file
+#  it finishes to the item's Checkpoint, and every INTERVAL seconds the
+#  checkpoint makes that work durable (the copies are synced and the chunk store
+#  flushed) and only then appends it to a journal.Journal in the destination. The
+#  next run of the item skips the files the checkpoint lists as long as their
+#  size and mtime haven't changed. Once the item succeeds its checkpoint is
+#  removed, after a failure it is kept so the next run resumes.
+#
+#  Files of at least RESUME_SIZE bytes are checkpointed while they are written
+#  too: a plain copy in SEGMENT_SIZE segments to a file ending in PARTIAL_SUFFIX
+#  that is renamed into place when complete, a file stored in the chunk store
+#  chunk by chunk. A resumed copy is only trusted once the last VERIFY_SIZE bytes
+#  before its checkpointed offset match the source, and a resumed list of chunks
+#  once the store holds every one of them and the last one still hashes the
+#  same, otherwise that file starts over. Compressed copies resume per file.
+#
+#  A checkpoint is a journal whose generation is the key of the item, its source
+#  and how it is backed up. Its operations are ["f", path, size, mtime_ns, extra]
+#  for a finished file, extra being what the runner needs to list the file again
+#  (its manifest digest or its chunks), and ["p", path, size, mtime_ns, offset,
+#  first, chunks] for the progress of a large file, chunks being the chunks
+#  stored from index first of its list on, null for a copy.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var DIRECTORY
+#  The directory inside the destination holding the checkpoints
+DIRECTORY = '.pybakup-checkpoints'
+
+## @var INTERVAL
+#  Seconds between checkpoints of an item
+INTERVAL = 30.0
+
+## @var RESUME_SIZE
+#  Files at least this big resume part way through instead of starting over
+RESUME_SIZE = 64 * 1024 * 1024
+
+## @var SEGMENT_SIZE
+#  The progress of a large copy is reported every this many bytes
+SEGMENT_SIZE = 8 * 1024 * 1024
+
+## @var VERIFY_SIZE
+#  The bytes before the offset of a partial copy compared with the source on resume
+VERIFY_SIZE = 1024 * 1024
+
+## @var PARTIAL_SUFFIX
+#  Added to the name of a large copy until it is complete
+PARTIAL_SUFFIX = '.pybakup-partial'
+
+## An item's checkpoint
+#  This class remembers the finished and partly written files of an item across
+#  runs. It can be used from several threads at once.
+class Checkpoint(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The checkpoint of an interrupted run with the same key is loaded and
+  #        compacted, one with another key is discarded
+  #  @param self The current object being constructed
+  #  @param fileName The path of the checkpoint
+  #  @param key The key of the item, a json serializable value that changes
+  #         whenever the files of an earlier run can't be reused
+  #  @param flush (Optional)A function making the stored data durable, called
+  #         before every checkpoint, for example chunkstore.ChunkStore.Flush
+  def __init__(self, fileName, key, flush=None):
+    self.FileName = fileName
+    self.Key = key
+    self.Flush = flush
+    ## @var Finished
+    #  The files finished by earlier runs, path to (size, mtime_ns, extra)
+    self.Finished = {}
+    self._Partials = {}
+    self._Pending = []
+    self._Paths = []
+    self._Lock = threading.Lock()
+    self._Saving = threading.Lock()
+    self._Saved = time.monotonic()
+    self._Journal = journal.Journal(fileName)
+    self._Load()
+
+  ## Check for a file finished by an earlier run
+  #  @param self The current instance
+  #  @param relative The path of the file relative to the item
+  #  @param size The size of the file now
+  #  @param mtime The mtime_ns of the file now
+  #  @retval tuple (True, extra) if the file is finished and unchanged, else (False, None)
+  def Done(self, relative, size, mtime):
+    record = self.Finished.get(relative)
+    if record is None or record[0] != size or record[1] != mtime:
+      return False, None
+    return True, record[2]
+
+  ## Get the progress of a large file from an earlier run
+  #  @param self The current instance
+  #  @param relative The path of the file relative to the item
+  #  @param size The size of the file now
+  #  @param mtime The mtime_ns of the file now
+  #  @retval tuple (offset, chunks) the file was checkpointed at, chunks being
+  #          None for copies, or None if there is no progress for the file as it is now
+  def Partial(self, relative, size, mtime):
+    with self._Lock:
+      partial = self._Partials.get(relative)
+      if partial is None or partial[0] != size or partial[1] != mtime:
+        return None
+      chunks = partial[3]
+      return partial[2], list(chunks[:partial[4]]) if chunks is not None else None
+
+  ## Report a finished file
+  #  @pre  The file is written
+  #  @post The file is in the next checkpoint
+  #  @param self The current instance
+  #  @param relative The path of the file relative to the item
+  #  @param size The size the file had when it was read
+  #  @param mtime The mtime_ns the file had when it was read
+  #  @param extra (Optional)A json serializable value handed back by Done()
+  #  @param path (Optional)The path written, synced before the checkpoint
+  def Complete(self, relative, size, mtime, extra=None, path=None):
+    with self._Lock:
+      self._Pending.append(['f', relative, size, mtime, extra])
+      self._Partials.pop(relative, None)
+      if path is not None:
+        self._Paths.append(path)
+    self._MaybeSave()
+
+  ## Report the progress of a large file
+  #  @pre  Everything before offset is written
+  #  @post The progress is in the next checkpoint
+  #  @param self The current instance
+  #  @param relative The path of the file relative to the item
+  #  @param size The size the file had when it was opened
+  #  @param mtime The mtime_ns the file had when it was opened
+  #  @param offset The bytes written so far
+  #  @param chunks (Optional)The list of chunks stored so far. It is only read up
+  #         to the length it has now, so it can keep growing.
+  #  @param path (Optional)The path being written, synced before the checkpoint
+  def Progress(self, relative, size, mtime, offset, chunks=None, path=None):
+    with self._Lock:
+      partial = self._Partials.get(relative)
+      if partial is None or partial[3] is not chunks: #a new list is written out whole once
+        partial = self._Partials[relative] = [size, mtime, 0, chunks, 0, 0, path, True]
+      partial[2] = offset
+      partial[4] = len(chunks) if chunks is not None else 0
+      partial[7] = True
+    self._MaybeSave()
+
+  ## Write a checkpoint
+  #  @pre  None
+  #  @post The work reported so far is durable and listed in the checkpoint
+  #  @param self The current instance
+  def Save(self):
+    with self._Saving:
+      self._Save()
+
+  def _Save(self):
+    with self._Lock:
+      records, self._Pending = self._Pending, []
+      paths, self._Paths = self._Paths, []
+      saved = []
+      for relative, partial in self._Partials.items():
+        if not partial[7] or partial[2] == 0:
+          continue
+        chunks = partial[3][partial[5]:partial[4]] if partial[3] is not None else None
+        records.append(['p', relative, partial[0], partial[1], partial[2], partial[5], chunks])
+        saved.append((partial, partial[2], partial[4]))
+        if partial[6] is not None:
+          paths.append(partial[6])
+      self._Saved = time.monotonic()
+    if not records:
+      return
+    try:
+      _SyncFiles(paths)
+      if self.Flush is not None:
+        self.Flush()
+      os.makedirs(os.path.dirname(self.FileName) or '.', exist_ok=True)
+      if self._Journal.Generation is None:
+        self._Journal.Reset(self.Key)
+      self._Journal.Append(records)
+    except BaseException:
+      with self._Lock: #the next checkpoint tries again
+        self._Pending[:0] = [record for record in records if record[0] == 'f']
+        self._Paths[:0] = paths
+      raise
+    with self._Lock:
+      for partial, offset, count in saved:
+        partial[5] = count
+        if partial[2] == offset and partial[4] == count: #nothing was reported since
+          partial[7] = False
+
+  ## Remove the checkpoint
+  #  @pre  The item is backed up
+  #  @post The next run of the item starts from scratch
+  #  @param self The current instance
+  def Remove(self):
+    with self._Saving:
+      try:
+        os.remove(self.FileName)
+      except FileNotFoundError:
+        pass
+      self._Journal.Generation = None
+
+  #a failed checkpoint only costs the resume, the file being reported is fine
+  def _MaybeSave(self):
+    if time.monotonic() - self._Saved >= INTERVAL and self._Saving.acquire(False):
+      try: #only one thread saves, the others carry on with their files
+        if time.monotonic() - self._Saved >= INTERVAL:
+          self._Save()
+      except OSError as error:
+        print('unable to checkpoint %s: %s' % (self.FileName, error), file=sys.stderr)
+      finally:
+        self._Saving.release()
+
+  ## Load the checkpoint of an earlier run
+  #  @param self The current instance
+  #  @brief A checkpoint that can't be read is discarded and the item's files
+  #         are backed up from scratch, as if there was none.
+  def _Load(self):
+    try:
+      operations = self._Journal.Replay()
+      if self._Journal.Generation is None:
+        return
+      if self._Journal.Generation != self.Key:
+        self.Remove()
+        return
+      self._Apply(operations)
+    except OSError:
+      self._Discard()
+      return
+    except (ValueError, LookupError, TypeError, AttributeError) as error:
+      print('discarding the unreadable checkpoint %s: %s' % (self.FileName, error), file=sys.stderr)
+      self._Discard()
+      try:
+        self.Remove()
+      except OSError:
+        pass
+      return
+    #compacted so a checkpoint that survives several runs doesn't keep growing
+    records = [['f', relative, size, mtime, extra] for relative, (size, mtime, extra) in self.Finished.items()]
+    records += [['p', relative, partial[0], partial[1], partial[2], 0, partial[3]]
+                for relative, partial in self._Partials.items()]
+    try:
+      self._Journal.Reset(self.Key)
+      self._Journal.Append(records)
+    except OSError as error: #the next Save() writes the checkpoint again
+      print('unable to checkpoint %s: %s' % (self.FileName, error), file=sys.stderr)
+      self._Journal.Generation = None
+      with self._Lock:
+        self._Pending = records[:]
+
+  def _Apply(self, operations):
+    for operation in operations:
+      if operation[0] == 'f':
+        self.Finished[operation[1]] = (operation[2], operation[3], operation[4])
+        self._Partials.pop(operation[1], None)
+        continue
+      relative, size, mtime, offset, first, chunks = operation[1:]
+      partial = self._Partials.get(relative)
+      if partial is None or partial[0] != size or partial[1] != mtime or first == 0:
+        partial = self._Partials[relative] = [size, mtime, 0, [] if chunks is not None else None, 0, 0, None, False]
+      partial[2] = offset
+      if chunks is not None:
+        partial[3][first:] = [tuple(chunk) for chunk in chunks]
+        partial[4] = partial[5] = len(partial[3])
+
+  def _Discard(self):
+    self.Finished = {}
+    self._Partials = {}
+    self._Journal.Generation = None
+
+## Find where a partial copy can resume
+#  @pre  source hasn't changed since the copy was checkpointed
+#  @post partial is cut back to the returned offset
+#  @param source The path of the file being copied
+#  @param partial The path of the partial copy
+#  @param offset The offset the copy was checkpointed at
+#  @retval int offset if the partial copy holds it and its tail matches the
+#          source, else 0 and the copy starts over
+def VerifiedOffset(source, partial, offset):
+  try:
+    with open(partial, 'r+b') as writer, open(source, 'rb') as reader:
+      length = min(VERIFY_SIZE, offset)
+      if os.fstat(writer.fileno()).st_size < offset or \
+         os.pread(writer.fileno(), length, offset - length) != os.pread(reader.fileno(), length, offset - length):
+        offset = 0
+      writer.truncate(offset) #anything after the checkpoint may be torn
+      return offset
+  except OSError:
+    return 0
+
+## Sync written files
+#  @param paths The paths of the files
+#  @brief Only the listed files are synced, os.sync() would flush every
+#         filesystem of the host along with them.
+def _SyncFiles(paths):
+  for path in dict.fromkeys(paths):
+    try:
+      descriptor = os.open(path, os.O_RDWR if os.name == 'nt' else os.O_RDONLY) #windows only syncs writable files
+    except OSError: #a file renamed since is synced through its new name
+      continue
+    try:
+      os.fsync(descriptor)
+    finally:
+      os.close(descriptor)
@@ -0,0 +1,696 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+import urllib.parse
+import journal
+
+try:
+  import numpy
+except ImportError: #numpy is optional, the chunker has a pure python version
+  numpy = None
+
+## @package chunkstore
+#  This contains the content addressed chunk store used to deduplicate backups
+#
+#  Files are cut into variable size chunks where a rolling hash of the last bytes
+#  hits a fixed pattern, so an insertion or deletion only moves the boundaries
+#  next to it and the rest of the file still produces the same chunks. Every
+#  chunk is stored once, named by its sha256, and a backup is a recipe listing
+#  the chunks of each of its files.
+#
+#  The rolling hash is a gear hash, h = (h << 1) + GEAR[byte]. A boundary is
+#  wherever the low MASK_BITS bits of h are zero, and those bits only depend on
+#  the last MASK_BITS bytes. That lets the numpy version compute the hash of
+#  every position of a buffer in a few vectorized passes and still cut exactly
+#  where the byte by byte version does.
+#
+#  Chunks are appended to pack files and an SQLite index maps each digest to its
+#  pack, offset and length. A bloom filter in front of the index answers most
+#  lookups of new chunks without touching the database. It has BLOOM_BITS bits
+#  per chunk and is rebuilt twice as big from the index whenever the store
+#  outgrows it.
+#
+#  The recipes of a backup are kept in a directory of their own below 'backups',
+#  named by the percent encoded name of the backup, so names that only differ in
+#  characters unsafe in file names or that start with another name never share
+#  recipes. Each recipe is named by the millisecond it was started.
+#
+#  Every committed recipe can be indexed into a RecipeIndex, which maps each path
+#  of the backup to its size, mtime and the pack locations of its chunks, so a
+#  single file is found and read back with a few seeks instead of a scan of the
+#  recipe and a chunk index lookup per chunk.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var MIN_SIZE
+#  The smallest chunk, apart from the end of a file
+MIN_SIZE = 16 * 1024
+
+## @var MASK_BITS
+#  A boundary needs this many low bits of the hash to be zero, giving an average
+#  chunk of about 2**MASK_BITS bytes past MIN_SIZE
+MASK_BITS = 16
+
+## @var MAX_SIZE
+#  Chunks are cut here if the hash hasn't found a boundary
+MAX_SIZE = 256 * 1024
+
+## @var READ_SIZE
+#  The buffer size files are read with while chunking
+READ_SIZE = 4 * 1024 * 1024
+
+## @var PACK_SIZE
+#  A new pack file is started once the current one is this big
+PACK_SIZE = 512 * 1024 * 1024
+
+## @var BLOOM_BITS
+#  The bits of bloom filter per chunk, with its seven hashes about ten keep false
+#  positives near one percent
+BLOOM_BITS = 10
+
+## @var _BLOOM_MAGIC
+#  The header of a saved bloom filter, followed by its number of chunks
+_BLOOM_MAGIC = b'PYBLOOM1'
+
+## @var _MASK
+#  The bits of the hash tested for a boundary
+_MASK = (1 << MASK_BITS) - 1
+
+## @var GEAR
+#  The random value added to the hash for every byte value. It is fixed so that
+#  the same data is always cut the same way.
+_gearSource = random.Random(0x5eed)
+GEAR = [_gearSource.getrandbits(32) for _ in range(256)]
+del _gearSource
+
+## @var _SCHEMA
+#  The statements that create the chunk index
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS chunks (
+  digest BLOB PRIMARY KEY,
+  pack   INTEGER NOT NULL,
+  offset INTEGER NOT NULL,
+  length INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+
+## @var _RECIPE_INDEX_SCHEMA
+#  The statements that create a recipe index. Paths are stored as utf-8 bytes
+#  with surrogateescape, like the recipe, so undecodable names survive.
+_RECIPE_INDEX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+  path   BLOB PRIMARY KEY,
+  size   INTEGER NOT NULL,
+  mtime  INTEGER NOT NULL,
+  chunks BLOB NOT NULL
+) WITHOUT ROWID;
+'''
+
+## @var _LOCATION
+#  The packed (pack, offset, length, digest) of one chunk in a recipe index
+_LOCATION = struct.Struct('<IQI32s')
+
+## Find the chunk boundaries of a buffer
+#  @pre  None
+#  @post None
+#  @param data A bytes like object
+#  @param final True if data ends the file, otherwise the bytes after the last
+#         boundary are left for the next buffer
+#  @param useNumpy (Optional)Set to False to force the pure python version
+#  @retval list The end offset of every chunk found in data
+def Boundaries(data, final, useNumpy=True):
+  if numpy is not None and useNumpy and len(data) > MIN_SIZE:
+    candidates = _NumpyCandidates(data)
+  else:
+    candidates = None
+
+  cuts = []
+  start = 0
+  size = len(data)
+  while size - start >= MAX_SIZE or (final and start < size):
+    if candidates is not None:
+      cut = _NextCandidate(candidates, start, size)
+    else:
+      cut = _ScanCandidate(data, start, size)
+    if cut is None:
+      if size - start < MAX_SIZE: #only a final buffer gets here, the rest is one chunk
+        cut = size
+      else:
+        cut = start + MAX_SIZE
+    cuts.append(cut)
+    start = cut
+  return cuts
+
+## Hash every position of a buffer with numpy
+#  @param data A bytes like object
+#  @retval array The sorted offsets just past every byte where the hash hits the mask
+def _NumpyCandidates(data):
+  hashes = _NumpyGear()[numpy.frombuffer(data, dtype=numpy.uint8)]
+  #h_i = sum of GEAR[b_(i-k)] << k for k < MASK_BITS, built by doubling the window.
+  #The unsigned arithmetic wraps, which only drops bits above the mask.
+  width = 1
+  while width < MASK_BITS:
+    hashes[width:] += hashes[:-width] << width #numpy buffers the overlapping operands
+    width *= 2
+  return numpy.flatnonzero((hashes & _MASK) == 0) + 1
+
+## @var _numpyGear
+#  GEAR as a numpy array, built on first use
+_numpyGear = None
+
+def _NumpyGear():
+  global _numpyGear
+  if _numpyGear is None:
+    dtype = numpy.uint16 if MASK_BITS <= 16 else numpy.uint32
+    _numpyGear = (numpy.asarray(GEAR, dtype=numpy.uint32) & _MASK).astype(dtype)
+  return _numpyGear
+
+## Pick the next boundary from the numpy candidates
+#  @param candidates The output of _NumpyCandidates
+#  @param start The start of the current chunk
+#  @param size The length of the buffer
+#  @retval int The end of the chunk or None if no candidate fits
+def _NextCandidate(candidates, start, size):
+  index = numpy.searchsorted(candidates, start + MIN_SIZE)
+  if index < len(candidates) and candidates[index] <= min(size, start + MAX_SIZE):
+    return int(candidates[index])
+  return None
+
+## Find the next boundary byte by byte
+#  @param data A bytes like object
+#  @param start The start of the current chunk
+#  @param size The length of the buffer
+#  @retval int The end of the chunk or None if no boundary fits
+def _ScanCandidate(data, start, size):
+  gear = GEAR
+  mask = _MASK
+  position = start + MIN_SIZE - MASK_BITS #enough bytes to fill the hash window
+  end = min(size, start + MAX_SIZE)
+  if position < start:
+    position = start
+  h = 0
+  for offset in range(position, end):
+    h = ((h << 1) + gear[data[offset]]) & 0xffffffff
+    if offset + 1 >= start + MIN_SIZE and h & mask == 0:
+      return offset + 1
+  return None
+
+## Cut a file into chunks
+#  @pre  None
+#  @post None
+#  @param fileName The path of the file
+#  @param offset (Optional)Where to start, which must be a chunk boundary for the
+#         chunks to match those of the whole file
+#  @retval generator Yields every chunk of the file in order, as bytes
+def ChunkFile(fileName, offset=0):
+  with open(fileName, 'rb') as file:
+    file.seek(offset)
+    pending = b''
+    while True:
+      block = file.read(READ_SIZE)
+      data = pending + block if pending else block
+      final = not block
+      cuts = Boundaries(data, final)
+      start = 0
+      view = memoryview(data)
+      for cut in cuts:
+        yield bytes(view[start:cut])
+        start = cut
+      pending = bytes(view[start:])
+      if final:
+        return
+
+## A bloom filter over chunk digests
+#  The digests are already uniformly random, so the bit positions are simply
+#  taken from slices of them.
+class _Bloom(object):
+
+  ## @var HASHES
+  #  The number of bits set per digest
+  HASHES = 7
+
+  def __init__(self, bits):
+    self.Bits = bits
+    self.Data = bytearray(bits // 8)
+    ## @var Count
+    #  The number of digests added
+    self.Count = 0
+
+  ## Check whether the filter has room for more digests
+  #  @param self The current instance
+  #  @retval bool False once it holds more than one digest per BLOOM_BITS bits
+  def Fits(self):
+    return self.Count * BLOOM_BITS <= self.Bits
+
+  def Add(self, digest):
+    self.Count += 1
+    for position in self._Positions(digest):
+      self.Data[position >> 3] |= 1 << (position & 7)
+
+  def __contains__(self, digest):
+    return all(self.Data[position >> 3] & (1 << (position & 7)) for position in self._Positions(digest))
+
+  def _Positions(self, digest):
+    return (int.from_bytes(digest[4 * index:4 * index + 4], 'little') % self.Bits
+            for index in range(self.HASHES))
+
+## The chunk store
+#  This class stores chunks once each and keeps backup recipes.
+#
+#  It is safe to use from several threads. Chunking and hashing happen outside
+#  the store's lock, only the index lookups and pack writes are serialized.
+class ChunkStore(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The store directory exists and is ready for use
+  #  @param self The current object being constructed
+  #  @param directory The directory holding the packs, index and recipes
+  #  @param bloomBits (Optional)The smallest size of the bloom filter in bits, it
+  #         grows with the number of chunks
+  def __init__(self, directory, bloomBits=1 << 20):
+    self.Directory = directory
+    os.makedirs(os.path.join(directory, 'packs'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'backups'), exist_ok=True)
+    self._Lock = threading.RLock()
+    self._Index = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+    self._Index.execute('PRAGMA journal_mode=WAL')
+    self._Index.executescript(_SCHEMA)
+    self._Readers = {}
+    self._LoadBloom(bloomBits)
+    self._OpenPack()
+
+  ## Close the store
+  #  @pre  None
+  #  @post Everything written is durable and the files are closed
+  #  @param self The current instance
+  def Close(self):
+    with self._Lock:
+      self.Flush()
+      self._Pack.close()
+      for reader in self._Readers.values():
+        reader.close()
+      self._Readers = {}
+      journal.ReplaceFile(self._BloomFileName(), self._WriteBloom)
+      self._Index.close()
+
+  ## Make stored chunks durable
+  #  @pre  None
+  #  @post The pack data is synced before the index rows pointing at it are committed
+  #  @param self The current instance
+  def Flush(self):
+    with self._Lock:
+      self._Pack.flush()
+      os.fsync(self._Pack.fileno())
+      self._Index.commit()
+
+  ## Check for a chunk
+  #  @param self The current instance
+  #  @param digest The sha256 digest of the chunk
+  #  @retval bool True if the store holds the chunk
+  def Has(self, digest):
+    with self._Lock:
+      return self._Locate(digest) is not None
+
+  ## Store a chunk
+  #  @pre  None
+  #  @post The chunk is in the store, written only if it wasn't already
+  #  @param self The current instance
+  #  @param data The contents of the chunk
+  #  @retval tuple (digest, True if the chunk was new)
+  def Put(self, data):
+    digest = hashlib.sha256(data).digest()
+    with self._Lock:
+      if self._Locate(digest) is not None:
+        return digest, False
+      if self._PackOffset >= PACK_SIZE:
+        self.Flush()
+        self._Pack.close()
+        self._OpenPack(self._PackNumber + 1)
+      self._Pack.write(data)
+      self._Index.execute('INSERT INTO chunks (digest, pack, offset, length) VALUES (?, ?, ?, ?)',
+                          (digest, self._PackNumber, self._PackOffset, len(data)))
+      self._PackOffset += len(data)
+      self._Bloom.Add(digest)
+      if not self._Bloom.Fits(): #the index already has the new row, so the rebuild includes it
+        self._BuildBloom(self._Bloom.Bits)
+      return digest, True
+
+  ## Read a chunk
+  #  @pre  The store holds the chunk
+  #  @param self The current instance
+  #  @param digest The digest of the chunk
+  #  @retval bytes The contents of the chunk
+  #  @exception KeyError The store doesn't hold the chunk
+  def Get(self, digest):
+    with self._Lock:
+      location = self._Locate(digest)
+    if location is None:
+      raise KeyError(digest.hex())
+    return self.ReadAt(*location)
+
+  ## Read stored bytes by their location
+  #  @pre  The location was found by the index, it may span adjacent chunks
+  #  @param self The current instance
+  #  @param pack The pack number
+  #  @param offset The offset in the pack
+  #  @param length The number of bytes
+  #  @retval bytes The bytes at the location
+  def ReadAt(self, pack, offset, length):
+    with self._Lock:
+      if pack == self._PackNumber:
+        self._Pack.flush()
+      reader = self._Readers.get(pack)
+      if reader is None:
+        reader = self._Readers[pack] = open(self._PackFileName(pack), 'rb')
+    return os.pread(reader.fileno(), length, offset)
+
+  ## Store a file
+  #  @pre  None
+  #  @post Every chunk of the file is in the store
+  #  @param self The current instance
+  #  @param fileName The path of the file
+  #  @param resume (Optional)An (offset, chunks) pair to carry on from, the chunk
+  #         references of the file before offset, which must be a chunk boundary
+  #  @param progress (Optional)A function called with the offset reached and the
+  #         list of chunk references so far after every chunk
+  #  @param charge (Optional)A function called with the size of every chunk before
+  #         it is stored
+  #  @retval tuple (list of (hex digest, length) chunk references, bytes written to the store)
+  def StoreFile(self, fileName, resume=None, progress=None, charge=None):
+    offset, chunks = resume if resume is not None else (0, [])
+    written = 0
+    for data in ChunkFile(fileName, offset):
+      if charge is not None:
+        charge(len(data))
+      digest, new = self.Put(data)
+      chunks.append((digest.hex(), len(data)))
+      if new:
+        written += len(data)
+      if progress is not None:
+        offset += len(data)
+        progress(offset, chunks)
+    return chunks, written
+
+  ## Rebuild a file
+  #  @pre  The store holds every chunk of the reference list
+  #  @post target holds the file's contents
+  #  @param self The current instance
+  #  @param chunks The chunk references from StoreFile() or a recipe
+  #  @param target The path the file is written to
+  def ReadFile(self, chunks, target):
+    with open(target, 'wb') as file:
+      for digest, length in chunks:
+        file.write(self.Get(bytes.fromhex(digest)))
+
+  ## Start a backup recipe
+  #  @param self The current instance
+  #  @param name The name of the backup, usually the title of the item
+  #  @retval Recipe A recipe that is written to the store when committed
+  def NewBackup(self, name):
+    return Recipe(os.path.join(self.Directory, 'backups'), name)
+
+  ## List the recipes of a backup
+  #  @param self The current instance
+  #  @param name The name of the backup
+  #  @retval list The recipe file names of the backup, oldest first
+  def Backups(self, name):
+    directory = os.path.join(self.Directory, 'backups')
+    recipes = []
+    try:
+      fileNames = os.listdir(os.path.join(directory, Recipe.Key(name)))
+    except FileNotFoundError:
+      fileNames = []
+    for fileName in fileNames:
+      stamp = fileName[:-len('.recipe')]
+      if fileName.endswith('.recipe') and stamp.isdigit():
+        recipes.append((int(stamp), os.path.join(directory, Recipe.Key(name), fileName)))
+    #recipes of older stores sit in 'backups' itself under a lossy prefix, so their owner is read from the header
+    prefix = Recipe._LegacyPrefix(name)
+    for fileName in os.listdir(directory):
+      stamp = fileName[len(prefix):-len('.recipe')]
+      if fileName.startswith(prefix) and fileName.endswith('.recipe') and stamp.isdigit() and \
+         _RecipeHeader(os.path.join(directory, fileName)).get('name') == name:
+        recipes.append((int(stamp), os.path.join(directory, fileName)))
+    return [fileName for stamp, fileName in sorted(recipes)]
+
+  ## Get the name a recipe was started with
+  #  @param self The current instance
+  #  @param recipeFileName The path of a committed recipe
+  #  @retval string The name passed to NewBackup(), None if the recipe can't be read
+  def BackupName(self, recipeFileName):
+    return _RecipeHeader(recipeFileName).get('name')
+
+  ## Index a backup recipe
+  #  @pre  The recipe is committed and its chunks have been flushed
+  #  @post The recipe's index is written next to it, atomically
+  #  @param self The current instance
+  #  @param recipeFileName The path of the recipe
+  #  @retval RecipeIndex The new index
+  #  @exception KeyError The store is missing a chunk of the recipe
+  def IndexBackup(self, recipeFileName):
+    fileName = RecipeIndex.FileNameOf(recipeFileName)
+    temporary = fileName + '.partial'
+    if os.path.exists(temporary):
+      os.remove(temporary)
+    rows = []
+    for record in ReadRecipe(recipeFileName):
+      locations = []
+      for digest, length in record['chunks']:
+        digest = bytes.fromhex(digest)
+        with self._Lock:
+          location = self._Locate(digest)
+        if location is None:
+          raise KeyError(digest.hex())
+        locations.append(_LOCATION.pack(location[0], location[1], location[2], digest))
+      rows.append((record['path'].encode('utf-8', 'surrogateescape'), record['size'], record['mtime'],
+                   b''.join(locations)))
+    connection = sqlite3.connect(temporary)
+    try:
+      connection.executescript(_RECIPE_INDEX_SCHEMA)
+      connection.executemany('INSERT OR REPLACE INTO files (path, size, mtime, chunks) VALUES (?, ?, ?, ?)', rows)
+      connection.commit()
+    finally:
+      connection.close()
+    os.replace(temporary, fileName)
+    return RecipeIndex(fileName)
+
+  ## Open the index of a backup recipe
+  #  @param self The current instance
+  #  @param recipeFileName The path of the recipe
+  #  @retval RecipeIndex The index, built first if the recipe has none
+  def OpenIndex(self, recipeFileName):
+    fileName = RecipeIndex.FileNameOf(recipeFileName)
+    if not os.path.exists(fileName):
+      return self.IndexBackup(recipeFileName)
+    return RecipeIndex(fileName)
+
+  def _Locate(self, digest):
+    if digest not in self._Bloom:
+      return None
+    return self._Index.execute('SELECT pack, offset, length FROM chunks WHERE digest = ?',
+                               (digest,)).fetchone()
+
+  def _PackFileName(self, number):
+    return os.path.join(self.Directory, 'packs', '%08d.pack' % number)
+
+  def _BloomFileName(self):
+    return os.path.join(self.Directory, 'bloom')
+
+  ## Open the pack new chunks are appended to
+  #  @param self The current instance
+  #  @param number (Optional)The pack number, by default the newest pack
+  def _OpenPack(self, number=None):
+    if number is None:
+      row = self._Index.execute('SELECT MAX(pack) FROM chunks').fetchone()
+      number = row[0] or 0
+    self._PackNumber = number
+    self._Pack = open(self._PackFileName(number), 'ab')
+    #bytes after the last indexed chunk were never committed, appending after them is harmless
+    self._PackOffset = self._Pack.tell()
+
+  ## Load or rebuild the bloom filter
+  #  @param self The current instance
+  #  @param bits The smallest size of the filter
+  def _LoadBloom(self, bits):
+    try:
+      with open(self._BloomFileName(), 'rb') as file:
+        data = file.read()
+      os.remove(self._BloomFileName()) #stale once chunks are added, it is rewritten by Close()
+    except FileNotFoundError:
+      data = None
+    header = len(_BLOOM_MAGIC) + 8
+    if data is not None and data[:len(_BLOOM_MAGIC)] == _BLOOM_MAGIC and len(data) > header:
+      self._Bloom = _Bloom((len(data) - header) * 8)
+      self._Bloom.Data[:] = memoryview(data)[header:]
+      self._Bloom.Count = struct.unpack_from('<Q', data, len(_BLOOM_MAGIC))[0]
+      if self._Bloom.Fits() and self._Bloom.Bits >= bits:
+        return
+    self._BuildBloom(bits)
+
+  ## Build the bloom filter from the index
+  #  @param self The current instance
+  #  @param bits The smallest size of the filter
+  #  @brief The filter gets twice the bits its chunks need, rounded up to a power
+  #         of two, so a growing store only rebuilds it every doubling.
+  def _BuildBloom(self, bits):
+    count = self._Index.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+    size = 8
+    while size < max(bits, 2 * BLOOM_BITS * count):
+      size *= 2
+    self._Bloom = _Bloom(size)
+    for (digest,) in self._Index.execute('SELECT digest FROM chunks'):
+      self._Bloom.Add(digest)
+
+  def _WriteBloom(self, file):
+    file.write(_BLOOM_MAGIC + struct.pack('<Q', self._Bloom.Count))
+    file.write(self._Bloom.Data)
+
+## A backup recipe
+#  This class lists the files of one backup and the chunks they are made of.
+#
+#  The recipe is json lines, a header followed by one
+#  {"path", "size", "mtime", "chunks"} record per file, and only appears in the
+#  store once Commit() renames it into place.
+class Recipe(object):
+
+  def __init__(self, directory, name):
+    directory = os.path.join(directory, self.Key(name))
+    os.makedirs(directory, exist_ok=True)
+    stamp = int(time.time() * 1000)
+    while True: #two backups started in the same millisecond take the next free one
+      self.FileName = os.path.join(directory, '%d.recipe' % stamp)
+      try:
+        self._File = open(self.FileName + '.partial', 'xb')
+      except FileExistsError:
+        stamp += 1
+        continue
+      if not os.path.exists(self.FileName):
+        break
+      self._File.close() #taken by a committed backup
+      os.remove(self.FileName + '.partial')
+      stamp += 1
+    self._Write({'name': name, 'created': time.time()})
+
+  ## The directory name of a backup's recipes
+  #  @param name The name of the backup
+  #  @retval string The name percent encoded, including the dots so it can't be
+  #          '.' or '..'. Every name has a key of its own.
+  @staticmethod
+  def Key(name):
+    return urllib.parse.quote(name, safe='', errors='surrogateescape').replace('.', '%2E')
+
+  @staticmethod
+  def _LegacyPrefix(name):
+    return ''.join(character if character.isalnum() or character in '-_.' else '_'
+                   for character in name) + '-'
+
+  ## Add a file
+  #  @param self The current instance
+  #  @param path The path of the file relative to the backup
+  #  @param size The size of the file
+  #  @param mtime The mtime_ns of the file
+  #  @param chunks The chunk references from ChunkStore.StoreFile()
+  def Add(self, path, size, mtime, chunks):
+    self._Write({'path': path, 'size': size, 'mtime': mtime, 'chunks': chunks})
+
+  ## Commit the recipe
+  #  @pre  The chunks of every file have been flushed to the store
+  #  @post The recipe is durable and listed by ChunkStore.Backups()
+  #  @param self The current instance
+  def Commit(self):
+    self._File.flush()
+    os.fsync(self._File.fileno())
+    self._File.close()
+    os.replace(self.FileName + '.partial', self.FileName)
+
+  ## Abandon the recipe
+  #  @param self The current instance
+  def Discard(self):
+    self._File.close()
+    os.remove(self.FileName + '.partial')
+
+  def _Write(self, record):
+    self._File.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8', 'surrogateescape'))
+
+## The index of a backup recipe
+#  This class finds the files of a backup without reading its recipe. An entry
+#  is a (path, size, mtime_ns, locations) tuple, the locations being the
+#  (pack, offset, length, digest) of every chunk of the file in order.
+#
+#  It can be used from several threads at once.
+class RecipeIndex(object):
+
+  def __init__(self, fileName):
+    self.FileName = fileName
+    self._Connection = sqlite3.connect(fileName, check_same_thread=False)
+    self._Lock = threading.Lock()
+
+  ## The path of a recipe's index
+  #  @param recipeFileName The path of the recipe
+  #  @retval string The path of its index
+  @staticmethod
+  def FileNameOf(recipeFileName):
+    return recipeFileName + '.index'
+
+  ## Close the index
+  #  @param self The current instance
+  def Close(self):
+    self._Connection.close()
+
+  ## Find a file
+  #  @param self The current instance
+  #  @param path The path of the file relative to the backup
+  #  @retval tuple The file's entry, None if the backup doesn't have it
+  def Find(self, path):
+    with self._Lock:
+      row = self._Connection.execute('SELECT path, size, mtime, chunks FROM files WHERE path = ?',
+                                     (path.encode('utf-8', 'surrogateescape'),)).fetchone()
+    return None if row is None else self._Entry(row)
+
+  ## Select files
+  #  @param self The current instance
+  #  @param path (Optional)A file or directory relative to the backup, by default
+  #         the whole backup
+  #  @retval list The entries of the file or of every file below the directory
+  def Select(self, path=''):
+    query = 'SELECT path, size, mtime, chunks FROM files'
+    arguments = ()
+    if path:
+      prefix = path.rstrip(os.sep).encode('utf-8', 'surrogateescape')
+      separator = os.sep.encode()
+      query += ' WHERE path = ? OR (path >= ? AND path < ?)'
+      #every path below the directory sorts between "prefix/" and the byte after the separator
+      arguments = (prefix, prefix + separator, prefix + bytes((separator[0] + 1,)))
+    with self._Lock:
+      rows = self._Connection.execute(query, arguments).fetchall()
+    return [self._Entry(row) for row in rows]
+
+  def _Entry(self, row):
+    chunks = row[3]
+    return (row[0].decode('utf-8', 'surrogateescape'), row[1], row[2],
+            [_LOCATION.unpack_from(chunks, offset) for offset in range(0, len(chunks), _LOCATION.size)])
+
+## Read the header of a recipe
+#  @param fileName The path of a committed recipe
+#  @retval dictionary The header, empty if the recipe can't be read
+def _RecipeHeader(fileName):
+  try:
+    with open(fileName, 'rb') as file:
+      return json.loads(file.readline().decode('utf-8', 'surrogateescape'))
+  except (OSError, ValueError):
+    return {}
+
+## Read a recipe
+#  @param fileName The path of a committed recipe
+#  @retval generator Yields the record of every file in the recipe
+def ReadRecipe(fileName):
+  with open(fileName, 'rb') as file:
+    file.readline() #header
+    for line in file:
+      yield json.loads(line.decode('utf-8', 'surrogateescape'))
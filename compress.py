@@ -0,0 +1,183 @@
+import bz2
+import collections
+import gzip
+import lzma
+import os
+import threading
+
+## @package compress
+#  This contains the parallel compression stage used by the backup runner
+#
+#  zlib, bz2 and lzma hold the GIL for long enough that one thread compressing
+#  a stream becomes the bottleneck of a backup. Here a stream is split into
+#  blocks that are compressed in a process pool and written back in order. Each
+#  block becomes a complete gzip member, bzip2 stream or xz stream, and the
+#  formats allow those to be concatenated, so the output reads back with gzip -d,
+#  bunzip2, unxz or the matching python modules.
+#
+#  At most a fixed number of blocks are in flight at once, which bounds the
+#  memory a stream takes no matter how long it is.
+#
+#  A compression spec names a format and optionally a level, "gzip", "xz:9" or
+#  "none", and is stored per catalog item as its 'compression' attribute.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var FORMATS
+#  The supported formats, mapped to their file extension and default level
+FORMATS = {'gzip': ('.gz', 6),
+           'bz2': ('.bz2', 9),
+           'xz': ('.xz', 6)}
+
+## @var BLOCK_SIZE
+#  The size of the blocks a stream is split into
+BLOCK_SIZE = 4 * 1024 * 1024
+
+## Parse a compression spec
+#  @pre  None
+#  @post None
+#  @param spec A spec such as "gzip", "xz:9" or "none"
+#  @retval tuple (format, level), or None when the spec turns compression off
+#  @exception ValueError The spec names an unknown format or a bad level
+def ParseSpec(spec):
+  if not spec or spec == 'none':
+    return None
+  name, _, level = spec.partition(':')
+  if name not in FORMATS:
+    raise ValueError("unknown compression format %r" % name)
+  if not level:
+    return name, FORMATS[name][1]
+  level = int(level)
+  if not 0 <= level <= 9:
+    raise ValueError("compression level %d is out of range" % level)
+  return name, level
+
+## Get the file extension of a spec
+#  @param spec A compression spec
+#  @retval string The extension compressed files get, empty for "none"
+def Extension(spec):
+  parsed = ParseSpec(spec)
+  return FORMATS[parsed[0]][0] if parsed else ''
+
+## Open a compressed file for reading
+#  @param fileName The path of the file
+#  @param spec The compression spec it was written with
+#  @retval file A binary file object reading the decompressed stream, the blocks
+#          written by ParallelCompressor are read back as one stream
+def Open(fileName, spec):
+  parsed = ParseSpec(spec)
+  if parsed is None:
+    return open(fileName, 'rb')
+  if parsed[0] == 'gzip':
+    return gzip.open(fileName, 'rb')
+  if parsed[0] == 'bz2':
+    return bz2.open(fileName, 'rb')
+  return lzma.open(fileName, 'rb')
+
+## Compress one block
+#  @param name The format
+#  @param level The compression level
+#  @param data The block
+#  @retval bytes A self contained member of the format
+#  @note Runs in the worker processes, so it has to stay a module level function
+def CompressBlock(name, level, data):
+  if name == 'gzip':
+    return gzip.compress(data, compresslevel=level, mtime=0)
+  if name == 'bz2':
+    return bz2.compress(data, max(level, 1))
+  return lzma.compress(data, preset=level)
+
+## The parallel compressor
+#  This class owns the process pool shared by every stream it compresses. It can
+#  be used from several threads at once.
+class ParallelCompressor(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The process pool is started on first use
+  #  @param self The current object being constructed
+  #  @param workers (Optional)The number of processes, by default one per cpu.
+  #         0 compresses in the calling thread instead.
+  #  @param blockSize (Optional)The size of the blocks streams are split into
+  #  @param inFlight (Optional)The most blocks of one stream being compressed at
+  #         once, by default twice the number of workers
+  def __init__(self, workers=None, blockSize=BLOCK_SIZE, inFlight=None):
+    self.Workers = (os.cpu_count() or 1) if workers is None else workers
+    self.BlockSize = blockSize
+    self.InFlight = inFlight or max(2, 2 * self.Workers)
+    self._Pool = None
+    self._Lock = threading.Lock()
+
+  ## Shut the process pool down
+  #  @param self The current instance
+  def Close(self):
+    if self._Pool is not None:
+      self._Pool.shutdown()
+      self._Pool = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exception):
+    self.Close()
+
+  ## Compress a stream
+  #  @pre  reader and writer are binary file objects
+  #  @post Everything left in reader is compressed into writer
+  #  @param self The current instance
+  #  @param reader The stream being compressed
+  #  @param writer The stream the compressed data is written to
+  #  @param spec A compression spec, "none" copies the stream as it is
+  #  @param charge (Optional)A function called with the size of every block read,
+  #         before it is compressed
+  #  @retval tuple (bytes read, bytes written)
+  def CompressStream(self, reader, writer, spec, charge=None):
+    parsed = ParseSpec(spec)
+    read = written = 0
+    pending = collections.deque()
+    while True:
+      block = reader.read(self.BlockSize)
+      if block:
+        read += len(block)
+        if charge is not None:
+          charge(len(block))
+        pending.append(self._Submit(parsed, block))
+      #write finished blocks in order, waiting for the oldest once the window is full
+      while pending and (len(pending) >= self.InFlight or not block or pending[0].done()):
+        data = pending.popleft().result()
+        writer.write(data)
+        written += len(data)
+      if not block:
+        if not read and parsed is not None: #an empty input still needs a valid member
+          data = CompressBlock(parsed[0], parsed[1], b'')
+          writer.write(data)
+          written += len(data)
+        return read, written
+
+  ## Compress a file
+  #  @pre  The directory of target exists
+  #  @post target holds the compressed contents of source
+  #  @param self The current instance
+  #  @param source The path of the file being compressed
+  #  @param target The path of the compressed file
+  #  @param spec A compression spec
+  #  @param charge (Optional)A function called with the size of every block read
+  #  @retval tuple (bytes read, bytes written)
+  def CompressFile(self, source, target, spec, charge=None):
+    with open(source, 'rb') as reader, open(target, 'wb') as writer:
+      return self.CompressStream(reader, writer, spec, charge)
+
+  def _Submit(self, parsed, block):
+    import concurrent.futures #imported on first use, it pulls in logging
+    if parsed is None:
+      future = concurrent.futures.Future()
+      future.set_result(block)
+      return future
+    if self.Workers == 0:
+      future = concurrent.futures.Future()
+      future.set_result(CompressBlock(parsed[0], parsed[1], block))
+      return future
+    with self._Lock:
+      if self._Pool is None:
+        self._Pool = concurrent.futures.ProcessPoolExecutor(self.Workers)
+    return self._Pool.submit(CompressBlock, parsed[0], parsed[1], block)
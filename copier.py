@@ -0,0 +1,221 @@
+import errno
+import os
+import shutil
+
+try:
+  import fcntl
+except ImportError: #not available on windows, which never reflinks
+  fcntl = None
+
+## @package copier
+#  This contains the file copy strategies used by the backup runner
+#
+#  Copying through python level read and write calls moves every byte through
+#  user space. Where the platform allows it the copy is left to the kernel
+#  instead, trying in order:
+#  - reflink, a copy on write clone that shares the blocks (btrfs, xfs, ...)
+#  - os.copy_file_range, an in kernel copy that may be offloaded by the file system
+#  - os.sendfile, an in kernel copy between file descriptors
+#  - a buffered read/write loop, which always works
+#
+#  A strategy the file system or kernel refuses is skipped for that file, and one
+#  the kernel doesn't implement at all is never tried again in this process.
+#
+#  A rate limited copy passes a charge function, which is called with the size of
+#  every block before it is copied. The in kernel copies then move CHARGE_SIZE
+#  bytes per call instead of KERNEL_CHUNK so the limit is paid as the copy goes.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var STRATEGIES
+#  The copy strategies, in the order they are tried
+STRATEGIES = ('reflink', 'copy_file_range', 'sendfile', 'buffered')
+
+## @var BUFFER_SIZE
+#  The block size of the buffered copy
+BUFFER_SIZE = 1 << 20
+
+## @var KERNEL_CHUNK
+#  The most bytes asked of the kernel by one copy_file_range or sendfile call
+KERNEL_CHUNK = 1 << 30
+
+## @var CHARGE_SIZE
+#  The most bytes copied between calls of a charge function
+CHARGE_SIZE = BUFFER_SIZE
+
+## @var _FICLONE
+#  The linux ioctl that reflinks one file to another
+_FICLONE = 0x40049409
+
+## @var _FALLBACK_ERRORS
+#  Errors meaning a strategy can't be used for this pair of files
+_FALLBACK_ERRORS = {errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                    errno.ENOTTY, errno.EBADF, errno.EPERM, errno.ENOSYS}
+
+## @var _unsupported
+#  The strategies this kernel doesn't implement
+_unsupported = set()
+
+## Copy a file
+#  @pre  The directory of target exists
+#  @post target is a copy of source with the same times and permissions
+#  @param source The path of the file being copied
+#  @param target The path of the copy, replaced if it exists
+#  @param strategy (Optional)Force one of STRATEGIES instead of picking the fastest
+#         one that works
+#  @param charge (Optional)A function called with the size of every block before
+#         it is copied. A reflink moves no data and isn't charged.
+#  @retval int The number of bytes copied
+#  @exception OSError The copy failed
+def CopyFile(source, target, strategy=None, charge=None):
+  strategies = (strategy,) if strategy else STRATEGIES
+  with open(source, 'rb') as reader, open(target, 'wb') as writer:
+    size = os.fstat(reader.fileno()).st_size
+    for name in strategies:
+      if name in _unsupported and not strategy:
+        continue
+      try:
+        _COPIES[name](reader.fileno(), writer.fileno(), size, charge)
+        break
+      except (OSError, AttributeError) as error: #AttributeError when os lacks the call
+        if strategy or name == 'buffered':
+          raise
+        if isinstance(error, AttributeError) or error.errno == errno.ENOSYS:
+          _unsupported.add(name)
+        elif error.errno not in _FALLBACK_ERRORS:
+          raise
+        #start the next strategy from a clean file
+        reader.seek(0)
+        writer.seek(0)
+        writer.truncate()
+  shutil.copystat(source, target)
+  return size
+
+## Copy a file from an offset on
+#  @pre  target holds the first offset bytes of source, or doesn't exist if offset is 0
+#  @post target is a copy of source with the same times and permissions
+#  @param source The path of the file being copied
+#  @param target The path of the copy, cut back to offset before the copy goes on
+#  @param offset (Optional)The bytes target already holds
+#  @param progress (Optional)A function called with the offset reached after every segment
+#  @param segment (Optional)The bytes copied between calls of progress
+#  @param charge (Optional)A function called with the size of every block before
+#         it is copied
+#  @retval int The number of bytes copied, including the ones target held
+#  @exception OSError The copy failed
+#  @brief Used for large files that resume part way, so only the in kernel copy
+#         and the buffered copy are tried, the others can't start in the middle.
+def CopyFileFrom(source, target, offset=0, progress=None, segment=BUFFER_SIZE * 8, charge=None):
+  with open(source, 'rb') as reader, open(target, 'r+b' if offset else 'wb') as writer:
+    size = os.fstat(reader.fileno()).st_size
+    writer.truncate(offset)
+    while offset < size:
+      length = min(segment, size - offset)
+      copied = _CopyRange(reader.fileno(), writer.fileno(), offset, length, charge)
+      offset += copied
+      if copied < length: #the file shrank while it was being copied
+        break
+      if progress is not None:
+        progress(offset)
+  shutil.copystat(source, target)
+  return offset
+
+## Copy a range between two files
+#  @param reader The descriptor of the source
+#  @param writer The descriptor of the copy
+#  @param offset Where the range starts in both files
+#  @param length The length of the range
+#  @param charge (Optional)A function called with the size of every block before
+#         it is copied
+#  @retval int The bytes copied, less than length only at the end of the source
+def _CopyRange(reader, writer, offset, length, charge=None):
+  if 'copy_file_range' not in _unsupported:
+    try:
+      copied = 0
+      while copied < length:
+        count = length - copied
+        if charge is not None:
+          count = min(CHARGE_SIZE, count)
+          charge(count)
+        count = os.copy_file_range(reader, writer, count, offset + copied, offset + copied)
+        if count == 0:
+          break
+        copied += count
+      return copied
+    except (OSError, AttributeError) as error:
+      if isinstance(error, AttributeError) or error.errno == errno.ENOSYS:
+        _unsupported.add('copy_file_range')
+      elif error.errno not in _FALLBACK_ERRORS:
+        raise
+  copied = 0
+  while copied < length:
+    data = os.pread(reader, min(BUFFER_SIZE, length - copied), offset + copied)
+    if not data:
+      break
+    if charge is not None:
+      charge(len(data))
+    view = memoryview(data)
+    written = 0
+    while written < len(data):
+      written += os.pwrite(writer, view[written:], offset + copied + written)
+    copied += len(data)
+  return copied
+
+def _Reflink(reader, writer, size, charge):
+  if fcntl is None:
+    raise OSError(errno.ENOSYS, 'reflinks are not supported')
+  fcntl.ioctl(writer, _FICLONE, reader)
+
+def _CopyFileRange(reader, writer, size, charge):
+  copied = 0
+  while copied < size:
+    count = _Block(size - copied, charge)
+    count = os.copy_file_range(reader, writer, count)
+    if count == 0: #the file shrank while it was being copied
+      break
+    copied += count
+
+def _SendFile(reader, writer, size, charge):
+  copied = 0
+  while copied < size:
+    count = os.sendfile(writer, reader, copied, _Block(size - copied, charge))
+    if count == 0:
+      break
+    copied += count
+
+def _Buffered(reader, writer, size, charge):
+  buffer = bytearray(BUFFER_SIZE)
+  view = memoryview(buffer)
+  while True:
+    count = os.readv(reader, [buffer]) if hasattr(os, 'readv') else _ReadInto(reader, buffer)
+    if not count:
+      break
+    if charge is not None:
+      charge(count)
+    written = 0
+    while written < count:
+      written += os.write(writer, view[written:count])
+
+## Size the next call of an in kernel copy
+#  @param left The bytes left to copy
+#  @param charge The charge function of the copy, or None
+#  @retval int The bytes to ask the kernel for, already charged
+def _Block(left, charge):
+  if charge is None:
+    return min(KERNEL_CHUNK, left)
+  count = min(CHARGE_SIZE, left)
+  charge(count)
+  return count
+
+def _ReadInto(reader, buffer):
+  data = os.read(reader, len(buffer))
+  buffer[:len(data)] = data
+  return len(data)
+
+## @var _COPIES
+#  The function implementing each strategy, called with the two descriptors, the
+#  size of the source and the charge function or None
+_COPIES = {'reflink': _Reflink,
+           'copy_file_range': _CopyFileRange,
+           'sendfile': _SendFile,
+           'buffered': _Buffered}
@@ -0,0 +1,310 @@
+import asyncio
+import concurrent.futures
+import os
+import sys
+import time
+import runner
+
+## @package fanout
+#  This contains the pipeline that backs items up to several destinations at once
+#
+#  Copying an item to every destination in turn reads its source once per
+#  destination. Here every file is read once, block by block, and each block is
+#  handed to one writer per destination through a bounded queue. A destination
+#  that falls behind fills its queue and only then holds the reader up, so it
+#  can lag the others by at most BUFFER_BLOCKS blocks per file and the memory of
+#  a file in flight is bounded whatever its size. A destination that fails is
+#  dropped from that file without stopping the others.
+#
+#  The files of an item are walked onto a queue of FILES entries that a fixed
+#  pool of FILES tasks copy from, so however many files an item has the walk
+#  runs at most that far ahead and the tasks alive stay the same.
+#
+#  The pipeline runs on asyncio. Reads and writes are blocking calls run on a
+#  thread pool, so a Destination is plain blocking code: DirectoryDestination
+#  writes to a local or mounted directory and others only need Open().
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var BLOCK_SIZE
+#  The size of the blocks sources are read in
+BLOCK_SIZE = 1 << 20
+
+## @var BUFFER_BLOCKS
+#  The most blocks of a file waiting for one destination
+BUFFER_BLOCKS = 8
+
+## @var FILES
+#  The most files being copied at once
+FILES = 8
+
+## @var _END
+#  Put on a destination's queue after the last block of a file
+_END = None
+
+## A backup destination
+#  Subclasses store the files of a backup somewhere. Their methods are called
+#  from the pipeline's thread pool, one file per writer.
+class Destination(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param name The name the destination is reported under
+  def __init__(self, name):
+    self.Name = name
+
+  ## Start writing a file
+  #  @param self The current instance
+  #  @param relative The path of the file inside the destination
+  #  @retval An object with Write(data), Commit(mtime_ns) and Abort() methods.
+  #          Commit() makes the complete file visible, Abort() discards it.
+  def Open(self, relative):
+    raise NotImplementedError
+
+## A destination in a directory
+#  Files are written next to their final name and renamed into place once
+#  complete, so an interrupted copy never looks like a backup.
+class DirectoryDestination(Destination):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param directory The directory the backups are written to
+  #  @param name (Optional)The name the destination is reported under, by default the directory
+  def __init__(self, directory, name=None):
+    Destination.__init__(self, name or directory)
+    self.Directory = directory
+
+  def Open(self, relative):
+    return _DirectoryWriter(os.path.join(self.Directory, relative))
+
+class _DirectoryWriter(object):
+
+  def __init__(self, target):
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    self._Target = target
+    self._File = open(target + '.partial', 'wb')
+
+  def Write(self, data):
+    self._File.write(data)
+
+  def Commit(self, mtime):
+    self._File.close()
+    os.utime(self._File.name, ns=(mtime, mtime))
+    os.replace(self._File.name, self._Target)
+
+  def Abort(self):
+    self._File.close()
+    try:
+      os.remove(self._File.name)
+    except OSError:
+      pass
+
+## The fan-out pipeline
+#  This class copies the files of backup items to every destination, reading
+#  each of them once.
+class FanOut(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param destinations The Destination objects
+  #  @param files (Optional)The most files being copied at once
+  #  @param blockSize (Optional)The size of the blocks sources are read in
+  #  @param bufferBlocks (Optional)The most blocks of a file waiting for one destination
+  def __init__(self, destinations, files=FILES, blockSize=BLOCK_SIZE, bufferBlocks=BUFFER_BLOCKS):
+    self.Destinations = list(destinations)
+    self.Files = files
+    self.BlockSize = blockSize
+    self.BufferBlocks = bufferBlocks
+
+  ## Back up items
+  #  @pre  None
+  #  @post The files of every item are in every destination that didn't fail,
+  #        item T being written to T in the destination like the runner does
+  #  @param self The current instance
+  #  @param items (title, item data) pairs, for example from
+  #         runner.BackupRunner.DueItems()
+  #  @retval dictionary A summary of the run: 'files' and 'bytes' read,
+  #          'seconds', 'succeeded' (the titles written to every destination)
+  #          and per destination in 'destinations' its 'files', 'bytes', the
+  #          seconds it 'stalled' the reader and 'failed' (path to error)
+  def Run(self, items):
+    return asyncio.run(self.RunAsync(items))
+
+  ## Back up items from a running event loop
+  #  @see Run()
+  async def RunAsync(self, items):
+    start = time.time()
+    self._Result = {'files': 0, 'bytes': 0, 'succeeded': [],
+                    'destinations': dict((destination.Name, {'files': 0, 'bytes': 0, 'stalled': 0.0, 'failed': {}})
+                                         for destination in self.Destinations)}
+    self._Pool = concurrent.futures.ThreadPoolExecutor(self.Files * (len(self.Destinations) + 1))
+    try:
+      for title, itemData in items:
+        if await self._Item(title, itemData):
+          self._Result['succeeded'].append(title)
+    finally:
+      self._Pool.shutdown()
+    self._Result['seconds'] = time.time() - start
+    return self._Result
+
+  ## Copy the files of one item
+  #  @param self The current instance
+  #  @param title The title of the item
+  #  @param itemData The item's data
+  #  @retval bool True if every file reached every destination
+  async def _Item(self, title, itemData):
+    loop = asyncio.get_running_loop()
+    source = itemData['source']
+    base = runner.SafeName(title)
+    unreadable = {}
+    if itemData['type'] == 'folder':
+      walk = runner.WalkFiles(source, lambda relative, error: unreadable.__setitem__(
+        os.path.join(source, relative), str(error)))
+    else:
+      walk = iter([(source, os.path.basename(source))])
+    files = asyncio.Queue(self.Files)
+    copiers = [asyncio.ensure_future(self._Copy(files, base)) for _ in range(self.Files)]
+    try:
+      while True:
+        unit = await loop.run_in_executor(self._Pool, next, walk, None) #the walk blocks on the disk too
+        if unit is None:
+          break
+        await files.put(unit) #waits while every copier is busy and the queue is full
+    except OSError as error:
+      for result in self._Result['destinations'].values():
+        result['failed'][source] = str(error)
+      ok = False
+    else:
+      ok = True
+    finally:
+      for _ in copiers:
+        await files.put(_END)
+    if unreadable: #files below them were missed, so the item isn't backed up
+      for result in self._Result['destinations'].values():
+        result['failed'].update(unreadable)
+      ok = False
+    results = await asyncio.gather(*copiers)
+    return ok and all(results)
+
+  ## Copy the files of an item until the walk is over
+  #  @param self The current instance
+  #  @param files The queue of (path, path relative to the item) pairs, ending
+  #         with _END
+  #  @param base The directory of the item inside each destination
+  #  @retval bool True if every file this task took reached every destination
+  async def _Copy(self, files, base):
+    ok = True
+    while True:
+      unit = await files.get()
+      if unit is _END:
+        return ok
+      if not await self._File(unit[0], os.path.join(base, unit[1])):
+        ok = False
+
+  ## Copy one file to every destination
+  #  @param self The current instance
+  #  @param source The path of the file
+  #  @param relative The path of the copy inside each destination
+  #  @retval bool True if every destination has the file
+  async def _File(self, source, relative):
+    loop = asyncio.get_running_loop()
+    queues = [asyncio.Queue(self.BufferBlocks) for _ in self.Destinations]
+    writers = [asyncio.ensure_future(self._Write(destination, queue, relative))
+               for destination, queue in zip(self.Destinations, queues)]
+    size = 0
+    try:
+      reader = await loop.run_in_executor(self._Pool, open, source, 'rb')
+      try:
+        end = (_END, (await loop.run_in_executor(self._Pool, os.fstat, reader.fileno())).st_mtime_ns)
+        while True:
+          block = await loop.run_in_executor(self._Pool, reader.read, self.BlockSize)
+          if not block:
+            break
+          size += len(block)
+          for destination, queue in zip(self.Destinations, queues):
+            if queue.full(): #this destination is behind and now holds the others up
+              stalled = time.perf_counter()
+              await queue.put(block)
+              self._Result['destinations'][destination.Name]['stalled'] += time.perf_counter() - stalled
+            else:
+              queue.put_nowait(block)
+      finally:
+        await loop.run_in_executor(self._Pool, reader.close)
+    except OSError as error:
+      end = '%s: %s' % (source, error)
+    for queue in queues:
+      await queue.put(end)
+    errors = await asyncio.gather(*writers)
+    if isinstance(end, tuple):
+      self._Result['files'] += 1
+      self._Result['bytes'] += size
+    for destination, error in zip(self.Destinations, errors):
+      result = self._Result['destinations'][destination.Name]
+      if error is None:
+        result['files'] += 1
+        result['bytes'] += size
+      else:
+        result['failed'][relative] = error
+    return not any(errors)
+
+  ## Write the blocks of a file to one destination
+  #  @param self The current instance
+  #  @param destination The Destination
+  #  @param queue The queue the blocks arrive on. The last item is (_END, mtime_ns)
+  #         once the whole file was read, or an error string if reading failed.
+  #  @param relative The path of the file inside the destination
+  #  @retval string An error, None once the file is committed
+  async def _Write(self, destination, queue, relative):
+    loop = asyncio.get_running_loop()
+    writer = None
+    error = None
+    while True:
+      block = await queue.get()
+      if not isinstance(block, bytes):
+        break
+      if error is not None:
+        continue #keep draining so the reader never waits on a failed destination
+      try:
+        if writer is None:
+          writer = await loop.run_in_executor(self._Pool, destination.Open, relative)
+        await loop.run_in_executor(self._Pool, writer.Write, block)
+      except Exception as exception: #any failure only drops this destination
+        error = str(exception)
+    if error is None and isinstance(block, str):
+      error = block
+    if error is None:
+      try:
+        if writer is None: #an empty file
+          writer = await loop.run_in_executor(self._Pool, destination.Open, relative)
+        await loop.run_in_executor(self._Pool, writer.Commit, block[1])
+        return None
+      except Exception as exception:
+        error = str(exception)
+    if writer is not None:
+      try:
+        await loop.run_in_executor(self._Pool, writer.Abort)
+      except Exception: #the error that got here is the one worth reporting
+        pass
+    return error
+
+# python fanout.py database destination destination ...
+if __name__ == "__main__":
+  import bumodel
+  if len(sys.argv) < 3:
+    print("usage: fanout.py database destination [destination ...]")
+    sys.exit(2)
+  model = bumodel.OpenModel(sys.argv[1])
+  started = time.time()
+  result = FanOut([DirectoryDestination(directory) for directory in sys.argv[2:]]).Run(
+    runner.BackupRunner(model, sys.argv[2]).DueItems(started))
+  for title in result['succeeded']: #only items every destination has count as backed up
+    model.ModifyItem(model.GetSourceByTitle(title), 'last', repr(started))
+  model.Save()
+  print("read %d files, %d bytes once in %.1fs" % (result['files'], result['bytes'], result['seconds']))
+  for name, destination in result['destinations'].items():
+    print("%s: %d files, %d bytes, stalled the reader %.1fs" %
+          (name, destination['files'], destination['bytes'], destination['stalled']))
+    for path, error in destination['failed'].items():
+      print("  failed", path, error)
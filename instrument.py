@@ -0,0 +1,287 @@
+import collections
+import os
+import threading
+import time
+
+## @package instrument
+#  This contains the instrumentation hooks of the model, the parser and the runner
+#
+#  The hooks record the wall and cpu time, bytes and files of named stages such as
+#  "catalog.load", "walk" or "copy", and sample gauges such as the depth of the
+#  runner's work queue. They do nothing until a Stats object is activated, which
+#  Session does for the length of a run, so an uninstrumented run only pays a
+#  global lookup per hook.
+#
+#  Cpu time is measured per thread, so the cpu of a stage run by several worker
+#  threads adds up while its wall time counts each call's own duration.
+#
+#  The profilers are only imported by a Session that uses them, so importing this
+#  module stays cheap for the short lived commands that never do.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var LIVE_INTERVAL
+#  Seconds between rewrites of the live stats file
+LIVE_INTERVAL = 1.0
+
+## @var PROFILERS
+#  The profilers a Session can wrap a run in
+PROFILERS = ('cprofile', 'tracemalloc')
+
+## @var _active
+#  The Stats the hooks record into, None when instrumentation is off
+_active = None
+
+## @var _profiles
+#  The cProfile profiles of the threads of an active cprofile Session, None otherwise
+_profiles = None
+
+## Per stage measurements
+#  This class accumulates the stages and gauges of one run. It can be used from
+#  several threads at once.
+class Stats(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  def __init__(self):
+    self.Started = time.time()
+    self._Stages = collections.OrderedDict()
+    self._Gauges = collections.OrderedDict()
+    self._Lock = threading.Lock()
+
+  ## Add a measurement
+  #  @param self The current instance
+  #  @param stage The name of the stage
+  #  @param wall The wall seconds
+  #  @param cpu The cpu seconds
+  #  @param bytes (Optional)The bytes handled
+  #  @param files (Optional)The files handled
+  def Add(self, stage, wall, cpu, bytes=0, files=0):
+    with self._Lock:
+      totals = self._Stages.get(stage)
+      if totals is None:
+        totals = self._Stages[stage] = [0, 0.0, 0.0, 0, 0]
+      totals[0] += 1
+      totals[1] += wall
+      totals[2] += cpu
+      totals[3] += bytes
+      totals[4] += files
+
+  ## Sample a gauge
+  #  @param self The current instance
+  #  @param name The name of the gauge
+  #  @param value The current value
+  def Gauge(self, name, value):
+    with self._Lock:
+      gauge = self._Gauges.get(name)
+      if gauge is None:
+        gauge = self._Gauges[name] = [value, value, 0, 0]
+      gauge[0] = value
+      gauge[1] = max(gauge[1], value)
+      gauge[2] += value
+      gauge[3] += 1
+
+  ## Time a stage
+  #  @param self The current instance
+  #  @param stage The name of the stage
+  #  @retval Measurement A context manager timing its body. Bytes and files can be
+  #          set on it before the body ends.
+  def Stage(self, stage):
+    return Measurement(self, stage)
+
+  ## Get the report
+  #  @param self The current instance
+  #  @retval dictionary The stages, each with its calls, wall, cpu, bytes and
+  #          files, and the gauges with their last, max and mean values
+  def Report(self):
+    with self._Lock:
+      stages = collections.OrderedDict(
+        (stage, {'calls': calls, 'wall': wall, 'cpu': cpu, 'bytes': bytes, 'files': files})
+        for stage, (calls, wall, cpu, bytes, files) in self._Stages.items())
+      gauges = collections.OrderedDict(
+        (name, {'last': last, 'max': peak, 'mean': total / count})
+        for name, (last, peak, total, count) in self._Gauges.items())
+    return {'started': self.Started, 'elapsed': time.time() - self.Started,
+            'stages': stages, 'gauges': gauges}
+
+## One timed stage
+#  This class is the context manager returned by Stats.Stage().
+class Measurement(object):
+
+  __slots__ = ('Bytes', 'Files', '_Stats', '_Stage', '_Wall', '_Cpu')
+
+  def __init__(self, stats, stage):
+    self.Bytes = 0
+    self.Files = 0
+    self._Stats = stats
+    self._Stage = stage
+
+  def __enter__(self):
+    self._Wall = time.perf_counter()
+    self._Cpu = time.thread_time()
+    return self
+
+  def __exit__(self, *exception):
+    self._Stats.Add(self._Stage, time.perf_counter() - self._Wall, time.thread_time() - self._Cpu,
+                    self.Bytes, self.Files)
+
+## The measurement used while instrumentation is off
+class _NullMeasurement(object):
+
+  Bytes = 0
+  Files = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exception):
+    pass
+
+  def __setattr__(self, name, value): #shared by every caller, so it keeps nothing
+    pass
+
+_NULL = _NullMeasurement()
+
+## Time a stage of the active Stats
+#  @param stage The name of the stage
+#  @retval A context manager timing its body, doing nothing when instrumentation is off
+def Stage(stage):
+  stats = _active
+  return _NULL if stats is None else Measurement(stats, stage)
+
+## Sample a gauge of the active Stats
+#  @param name The name of the gauge
+#  @param value The current value
+def Gauge(name, value):
+  stats = _active
+  if stats is not None:
+    stats.Gauge(name, value)
+
+## Get the active Stats
+#  @retval Stats The Stats the hooks record into, None when instrumentation is off
+def Active():
+  return _active
+
+## Profile a thread
+#  @retval A context manager profiling its body into the active cprofile Session,
+#          doing nothing when no such Session is active
+#  @brief cProfile only sees the thread that enabled it, so threads that do the
+#         work of a run wrap their loop in this. Python 3.12 and later allow a
+#         single profiler at a time, which sees every thread, so there the body
+#         runs unprofiled when another profile is already enabled.
+def ThreadProfile():
+  profiles = _profiles
+  if profiles is None:
+    return _NULL
+  return _ThreadProfile(profiles)
+
+## The context manager returned by ThreadProfile() during a cprofile Session
+class _ThreadProfile(object):
+
+  def __init__(self, profiles):
+    self._Profiles = profiles
+    self._Profile = None
+
+  def __enter__(self):
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+      profile.enable()
+    except ValueError: #"Another profiling tool is already active"
+      return self
+    self._Profile = profile
+    self._Profiles.append(profile)
+    return self
+
+  def __exit__(self, *exception):
+    if self._Profile is not None:
+      self._Profile.disable()
+
+## An instrumented run
+#  This class activates a Stats for its body and writes what it collected.
+class Session(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None, the session starts when its body is entered
+  #  @param self The current object being constructed
+  #  @param report (Optional)The path the JSON report is written to when the body ends
+  #  @param live (Optional)The path of a JSON file rewritten every LIVE_INTERVAL
+  #         with the stats so far, for watching a run in progress
+  #  @param profile (Optional)One of PROFILERS to wrap the body in
+  #  @param profileFile (Optional)Where the profile is dumped, by default next to
+  #         the report as .prof for cprofile and .tracemalloc for tracemalloc
+  #  @exception ValueError The profiler is unknown
+  def __init__(self, report=None, live=None, profile=None, profileFile=None):
+    if profile is not None and profile not in PROFILERS:
+      raise ValueError("unknown profiler %r" % profile)
+    self.Report = report
+    self.Live = live
+    self.Profile = profile
+    self.ProfileFile = profileFile or '%s.%s' % (os.path.splitext(report or 'PyBakUP-run')[0],
+                                                 'prof' if profile == 'cprofile' else 'tracemalloc')
+    self.Stats = Stats()
+    self._Stopping = threading.Event()
+    self._LiveThread = None
+    self._Previous = None
+    self._Profiler = None
+    ## @var Result
+    #  The final report, set when the body ends
+    self.Result = None
+
+  def __enter__(self):
+    global _active, _profiles
+    self._Previous = _active
+    _active = self.Stats
+    if self.Profile == 'cprofile':
+      _profiles = []
+      self._Profiler = ThreadProfile()
+      self._Profiler.__enter__()
+    elif self.Profile == 'tracemalloc':
+      import tracemalloc
+      tracemalloc.start(25)
+    if self.Live:
+      self._LiveThread = threading.Thread(target=self._WriteLive, daemon=True)
+      self._LiveThread.start()
+    return self
+
+  def __exit__(self, *exception):
+    global _active, _profiles
+    _active = self._Previous
+    report = self.Stats.Report()
+    if self.Profile == 'cprofile':
+      profiles, _profiles = _profiles, None
+      self._Profiler.__exit__(*exception) #the threads disabled their own when they finished
+      if profiles: #none when a profiler outside the session was already running
+        import pstats
+        pstats.Stats(*profiles).dump_stats(self.ProfileFile)
+        report['profile'] = self.ProfileFile
+    elif self.Profile == 'tracemalloc':
+      import tracemalloc
+      snapshot = tracemalloc.take_snapshot()
+      report['peak_memory'] = tracemalloc.get_traced_memory()[1]
+      tracemalloc.stop()
+      snapshot.dump(self.ProfileFile)
+      report['profile'] = self.ProfileFile
+      report['top_allocations'] = [str(statistic) for statistic in snapshot.statistics('lineno')[:25]]
+    if self._LiveThread is not None:
+      self._Stopping.set()
+      self._LiveThread.join()
+      _WriteJson(self.Live, report)
+    if self.Report:
+      _WriteJson(self.Report, report)
+    self.Result = report
+
+  def _WriteLive(self):
+    while not self._Stopping.wait(LIVE_INTERVAL):
+      _WriteJson(self.Live, self.Stats.Report())
+
+## Write a JSON file so readers never see it half written
+#  @param fileName The path of the file
+#  @param data The data being written
+def _WriteJson(fileName, data):
+  import json
+  temporary = '%s.%d.tmp' % (fileName, os.getpid())
+  with open(temporary, 'w') as file:
+    json.dump(data, file, indent=1)
+  os.replace(temporary, fileName)
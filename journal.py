@@ -0,0 +1,159 @@
+import json
+import os
+import zlib
+
+## @package journal
+#  This contains the write ahead journal used by bumodel.Model
+#
+#  Instead of rewriting the whole xml database on every save, the changes made
+#  since the last save are appended to a journal file next to it. Every line is
+#  one operation prefixed with its crc32 so that a line torn by a crash can be
+#  told apart from a good one. The first line records the generation of the
+#  snapshot the operations apply to, which keeps a journal from being replayed
+#  over a snapshot that already contains it.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var _ENCODER
+#  Shared by every journal, json.dumps() would build a new encoder per record
+_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+## The journal file
+#  This class appends operations to the journal and reads them back.
+class Journal(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The journal is ready to be replayed or appended to. Nothing is read
+  #        or written until one of the methods is called.
+  #  @param self The current object being constructed
+  #  @param fileName The path of the journal file
+  def __init__(self, fileName):
+    self.FileName = fileName
+    self.Generation = None
+    self.Count = 0
+
+  ## Read the journal
+  #  @pre  None
+  #  @post Count and Generation describe the journal on disk. A torn last line
+  #        is cut off so that the next append starts on a clean line.
+  #  @param self The current instance
+  #  @param repair (Optional)Set to False to leave a torn line in place, for
+  #         readers that don't own the journal
+  #  @retval list The operations in the order they were written, an empty list
+  #               if there is no journal
+  def Replay(self, repair=True):
+    operations = []
+    self.Generation = None
+    self.Count = 0
+    if not os.path.exists(self.FileName):
+      return operations
+
+    goodLength = 0
+    with open(self.FileName, 'rb') as file:
+      for line in file:
+        record = self._Decode(line)
+        if record is None: #everything after a bad line is unusable
+          break
+        if self.Generation is None:
+          self.Generation = record.get('generation')
+        else:
+          operations.append(record)
+        goodLength += len(line)
+
+    if repair and goodLength != os.path.getsize(self.FileName):
+      with open(self.FileName, 'r+b') as file:
+        file.truncate(goodLength)
+        _Sync(file)
+
+    self.Count = len(operations)
+    return operations
+
+  ## Append operations
+  #  @pre  Reset() or Replay() must have set the generation
+  #  @post The operations are durably on disk when this returns
+  #  @param self The current instance
+  #  @param operations A list of operations, each a json serializable list
+  def Append(self, operations):
+    if not operations:
+      return
+    data = b''.join(self._Encode(operation) for operation in operations)
+    with open(self.FileName, 'ab') as file:
+      file.write(data)
+      _Sync(file)
+    self.Count += len(operations)
+
+  ## Start a new journal
+  #  @pre  The snapshot of the given generation is already durably on disk
+  #  @post The journal is empty and belongs to the given generation
+  #  @param self The current instance
+  #  @param generation The generation of the snapshot just written
+  def Reset(self, generation):
+    ReplaceFile(self.FileName, self._Encode({'generation': generation}))
+    self.Generation = generation
+    self.Count = 0
+
+  ## Encode a record
+  #  @param self The current instance
+  #  @param record The operation or header being written
+  #  @retval bytes The journal line for the record
+  def _Encode(self, record):
+    payload = _ENCODER.encode(record).encode('utf-8')
+    return b'%08x ' % zlib.crc32(payload) + payload + b'\n'
+
+  ## Decode a record
+  #  @param self The current instance
+  #  @param line A line read from the journal
+  #  @retval The record on the line or None if the line is torn or corrupt
+  def _Decode(self, line):
+    if not line.endswith(b'\n') or len(line) < 10:
+      return None
+    payload = line[9:-1]
+    try:
+      if int(line[:8], 16) != zlib.crc32(payload):
+        return None
+      return json.loads(payload.decode('utf-8'))
+    except ValueError:
+      return None
+
+## Flush a file to disk
+#  @param file An open file object
+def _Sync(file):
+  file.flush()
+  os.fsync(file.fileno())
+
+## Atomically replace a file
+#  @pre  None
+#  @post fileName holds data, or is untouched if this fails part way
+#  @param fileName The path of the file being replaced
+#  @param data The new contents, either bytes or a function that writes them
+#         to the open file it is passed
+#  @brief The data is written to a temporary file that is synced and then
+#         renamed over the original, so a reader (or a crash) never sees a half
+#         written file.
+def ReplaceFile(fileName, data):
+  temporary = fileName + '.tmp'
+  try:
+    with open(temporary, 'wb') as file:
+      if callable(data):
+        data(file)
+      else:
+        file.write(data)
+      _Sync(file)
+  except BaseException: #a function that fails part way leaves nothing behind
+    try:
+      os.remove(temporary)
+    except OSError:
+      pass
+    raise
+  os.replace(temporary, fileName)
+  try: #make the rename itself durable, directories can't be opened on windows
+    directory = os.open(os.path.dirname(os.path.abspath(fileName)), os.O_RDONLY)
+  except OSError:
+    return
+  try:
+    os.fsync(directory)
+  except OSError:
+    pass
+  finally:
+    os.close(directory)
@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'DAY', 'EQUAL', 'FALSE', 'GREATER', 'GREAT_EQUAL', 'HOUR', 'INT', 'LAST_BACKUP', 'LESS', 'LESS_EQUAL', 'LPAREN', 'MINUTE', 'MODIFIED', 'MONTH', 'OR', 'PLUS', 'RPAREN', 'TRUE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_AND>&&)|(?P<t_LESS_EQUAL><=)|(?P<t_GREAT_EQUAL>>=)|(?P<t_GREATER>>)|(?P<t_LESS><)|(?P<t_EQUAL>==)|(?P<t_PLUS>\\+)|(?P<t_OR>\\|\\|)|(?P<t_MONTH>mon(th)?s?)|(?P<t_DAY>d((ay)s?)?)|(?P<t_HOUR>h((our)s?)?)|(?P<t_MINUTE>min(ute)?s?)|(?P<t_LAST_BACKUP>LastBU)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_INT>\\d+)|(?P<t_MODIFIED>Modified)|(?P<t_FALSE>False)|(?P<t_TRUE>True)', [None, ('t_AND', 'AND'), ('t_LESS_EQUAL', 'LESS_EQUAL'), ('t_GREAT_EQUAL', 'GREAT_EQUAL'), ('t_GREATER', 'GREATER'), ('t_LESS', 'LESS'), ('t_EQUAL', 'EQUAL'), ('t_PLUS', 'PLUS'), ('t_OR', 'OR'), ('t_MONTH', 'MONTH'), None, ('t_DAY', 'DAY'), None, None, ('t_HOUR', 'HOUR'), None, None, ('t_MINUTE', 'MINUTE'), None, ('t_LAST_BACKUP', 'LAST_BACKUP'), ('t_LPAREN', 'LPAREN'), ('t_RPAREN', 'RPAREN'), ('t_INT', 'INT'), (None, 'MODIFIED'), (None, 'FALSE'), (None, 'TRUE')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
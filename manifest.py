@@ -0,0 +1,237 @@
+import json
+import os
+import stat
+import change_index
+import journal
+
+## @package manifest
+#  This contains the manifests that make folder backups incremental
+#
+#  A manifest is kept next to the backup of every folder item. It lists each file
+#  of the tree with its size, mtime and content hash as of the last successful
+#  run, plus a tombstone for every file that has since been deleted from the
+#  source. The next run walks the tree with os.scandir, compares each file's stat
+#  data against the manifest and only transfers the files that are new or changed.
+#
+#  When a watcher.ChangeJournal lists the paths that changed since the last run,
+#  Diff() can be limited to those and the rest of the tree isn't walked at all.
+#
+#  The file is json lines. The first line is a header, then every line is either
+#  ["f", path, size, mtime_ns, hash] or ["d", path, deleted] where deleted is the
+#  timestamp of the run that noticed the deletion.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var FILE_NAME
+#  The name of the manifest inside the backup of a folder item
+FILE_NAME = '.pybakup-manifest'
+
+## @var VERSION
+#  The version written in the manifest header
+VERSION = 1
+
+## @var CORRUPT_SUFFIX
+#  Added to the name of a manifest that can't be read when the runner sets it
+#  aside, so the next run starts a new one
+CORRUPT_SUFFIX = '.corrupt'
+
+## A folder item's manifest
+#  This class loads a manifest, diffs a tree against it and writes the next one.
+class Manifest(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The previous manifest is loaded, or empty if there isn't one
+  #  @param self The current object being constructed
+  #  @param fileName The path of the manifest
+  #  @exception ValueError The manifest is corrupt
+  def __init__(self, fileName):
+    self.FileName = fileName
+    ## @var Entries
+    #  The files of the previous run, path to (size, mtime_ns, hash)
+    self.Entries = {}
+    ## @var Tombstones
+    #  The deleted files, path to the timestamp the deletion was noticed
+    self.Tombstones = {}
+    ## @var Deleted
+    #  The files Diff() found missing, set once it finishes
+    self.Deleted = []
+    ## @var Unreadable
+    #  The directories Diff() couldn't read, relative to the root. Their files
+    #  are carried over as they were instead of being taken for deleted.
+    self.Unreadable = []
+    ## @var Time
+    #  The start of the run that saved the manifest, None if there is no manifest
+    self.Time = None
+    self._Next = {}
+    self._Load()
+
+  ## Diff a tree against the manifest
+  #  @pre  None
+  #  @post Deleted lists the files that disappeared once the generator finishes
+  #  @param self The current instance
+  #  @param top The root of the folder item
+  #  @param paths (Optional)The only paths relative to top that may have changed
+  #         since Time, a directory standing for everything below it. By default
+  #         the whole tree is walked, as it is when there is no previous manifest.
+  #  @param onError (Optional)A function called with the relative path and the
+  #         OSError of every directory that can't be read
+  #  @retval generator Yields (path, relative path, size, mtime_ns) for every file
+  #                    that is new or whose size or mtime changed. Unchanged files
+  #                    are carried over to the next manifest as they are.
+  #  @exception OSError The root can't be read
+  def Diff(self, top, paths=None, onError=None):
+    if paths is None or self.Time is None:
+      roots = {''}
+    else:
+      roots = set(paths)
+      #a path below another one is already covered by it
+      roots = set(path for path in roots if not any(parent in roots for parent in _Parents(path)))
+    seen = set()
+    self.Unreadable = []
+    def unreadable(relative, error):
+      self.Unreadable.append(relative)
+      if onError is not None:
+        onError(relative, error)
+    for root in sorted(roots):
+      for path, relative, info in self._Stat(top, root, unreadable):
+        seen.add(relative)
+        previous = self.Entries.get(relative)
+        if previous is not None and previous[0] == info.st_size and previous[1] == info.st_mtime_ns:
+          self._Next[relative] = previous
+        else:
+          yield path, relative, info.st_size, info.st_mtime_ns
+
+    self.Deleted = []
+    skipped = set(self.Unreadable)
+    for relative, previous in self.Entries.items():
+      if relative in seen:
+        continue
+      if skipped and (relative in skipped or any(parent in skipped for parent in _Parents(relative))):
+        self._Next[relative] = previous #its directory couldn't be read, which says nothing about the file
+      elif '' in roots or relative in roots or any(parent in roots for parent in _Parents(relative)):
+        self.Deleted.append(relative)
+      else: #outside the changed paths, so it is as it was
+        self._Next[relative] = previous
+
+  ## Stat the files under a path
+  #  @param self The current instance
+  #  @param top The root of the folder item
+  #  @param root A path relative to top, '' for the whole tree
+  #  @param onError A function called with the relative path and the OSError of
+  #         every directory that can't be read
+  #  @retval generator Yields (path, relative path, stat result) for the file or
+  #                    the files of the tree at root, nothing if it is gone
+  def _Stat(self, top, root, onError):
+    path = os.path.join(top, root) if root else top
+    if root:
+      try:
+        info = os.lstat(path)
+      except (FileNotFoundError, NotADirectoryError):
+        return
+      except OSError as error:
+        onError(root, error)
+        return
+      if stat.S_ISREG(info.st_mode):
+        yield path, root, info
+      if not stat.S_ISDIR(info.st_mode):
+        return
+    for entry, relative in WalkEntries(path, lambda relative, error: onError(os.path.join(root, relative), error)):
+      try:
+        info = entry.stat(follow_symlinks=False)
+      except OSError:
+        continue
+      yield entry.path, os.path.join(root, relative), info
+
+  ## Add a transferred file
+  #  @pre  The file has been copied
+  #  @post The file will be listed in the next manifest
+  #  @param self The current instance
+  #  @param relative The path of the file relative to the folder item
+  #  @param size The size the file had when Diff() found it
+  #  @param mtime The mtime_ns the file had when Diff() found it
+  #  @param digest The hex digest of the file's contents, or None
+  def Update(self, relative, size, mtime, digest):
+    self._Next[relative] = (size, mtime, digest)
+
+  ## Save the next manifest
+  #  @pre  Diff() has finished and every changed file has been passed to Update()
+  #  @post The manifest on disk describes this run, written atomically
+  #  @param self The current instance
+  #  @param now The timestamp recorded on new tombstones
+  def Save(self, now):
+    tombstones = dict((relative, deleted) for relative, deleted in self.Tombstones.items()
+                      if relative not in self._Next) #a file that came back is alive again
+    for relative in self.Deleted:
+      tombstones.setdefault(relative, now)
+
+    def write(file):
+      file.write(self._Line({'version': VERSION, 'time': now}))
+      for relative, (size, mtime, digest) in self._Next.items():
+        file.write(self._Line(['f', relative, size, mtime, digest]))
+      for relative, deleted in tombstones.items():
+        file.write(self._Line(['d', relative, deleted]))
+
+    os.makedirs(os.path.dirname(self.FileName) or '.', exist_ok=True)
+    journal.ReplaceFile(self.FileName, write)
+    self.Entries, self.Tombstones, self._Next = self._Next, tombstones, {}
+    self.Time = now
+
+  def _Line(self, record):
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8', 'surrogateescape')
+
+  def _Load(self):
+    try:
+      file = open(self.FileName, 'rb')
+    except FileNotFoundError:
+      return
+    try:
+      with file:
+        self.Time = json.loads(file.readline().decode('utf-8')).get('time')
+        for line in file:
+          record = json.loads(line.decode('utf-8', 'surrogateescape'))
+          if record[0] == 'f':
+            self.Entries[record[1]] = (record[2], record[3], record[4])
+          else:
+            self.Tombstones[record[1]] = record[2]
+    except (ValueError, LookupError, TypeError, AttributeError) as error:
+      raise ValueError("%s is corrupt: %s" % (self.FileName, error))
+
+## Hash a file for the manifest
+#  @param fileName The path of the file
+#  @retval string The hex digest of the file's contents
+def HashFile(fileName):
+  return change_index.HashFile(fileName).hex()
+
+def _Parents(relative):
+  parent = os.path.dirname(relative)
+  while parent:
+    yield parent
+    parent = os.path.dirname(parent)
+
+## Walk the files of a tree
+#  @param top The root of the tree
+#  @param onError (Optional)A function called with the relative path and the
+#         OSError of every directory below top that can't be read
+#  @retval generator Yields (DirEntry, path relative to top) for every file,
+#                    symbolic links are not followed
+#  @exception OSError The root can't be read, the directories below it that
+#             can't be read are skipped after they are passed to onError
+def WalkEntries(top, onError=None):
+  pending = ['']
+  while pending:
+    relative = pending.pop()
+    try:
+      entries = os.scandir(os.path.join(top, relative))
+    except OSError as error:
+      if not relative:
+        raise
+      if onError is not None:
+        onError(relative, error)
+      continue
+    with entries:
+      for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+          pending.append(os.path.join(relative, entry.name))
+        elif entry.is_file(follow_symlinks=False):
+          yield entry, os.path.join(relative, entry.name)
@@ -0,0 +1,52 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'leftORleftANDleftEQUALleftLESSGREATERLESS_EQUALGREAT_EQUALleftPLUSAND DAY EQUAL FALSE GREATER GREAT_EQUAL HOUR INT LAST_BACKUP LESS LESS_EQUAL LPAREN MINUTE MODIFIED MONTH OR PLUS RPAREN TRUEexpr : expr OR expr\n          | expr AND expr\n          | expr LESS_EQUAL expr\n          | expr LESS expr\n          | expr GREAT_EQUAL expr\n          | expr GREATER expr\n          | expr EQUAL expr\n          | expr PLUS exprprimary : LPAREN expr RPARENexpr : operand\n          | primaryoperand : timeoperand : keytime : INT frameframe : MONTH\n           | DAY\n           | HOUR\n           | MINUTEkey :  LAST_BACKUPkey :  MODIFIED\n         |  TRUE\n         |  FALSE'
+    
+_lr_action_items = {'LPAREN':([0,6,12,13,14,15,16,17,18,19,],[6,6,6,6,6,6,6,6,6,6,]),'INT':([0,6,12,13,14,15,16,17,18,19,],[7,7,7,7,7,7,7,7,7,7,]),'LAST_BACKUP':([0,6,12,13,14,15,16,17,18,19,],[8,8,8,8,8,8,8,8,8,8,]),'MODIFIED':([0,6,12,13,14,15,16,17,18,19,],[9,9,9,9,9,9,9,9,9,9,]),'TRUE':([0,6,12,13,14,15,16,17,18,19,],[10,10,10,10,10,10,10,10,10,10,]),'FALSE':([0,6,12,13,14,15,16,17,18,19,],[11,11,11,11,11,11,11,11,11,11,]),'$end':([1,2,3,4,5,8,9,10,11,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[0,-10,-11,-12,-13,-19,-20,-21,-22,-14,-15,-16,-17,-18,-1,-2,-3,-4,-5,-6,-7,-8,-9,]),'OR':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[12,-10,-11,-12,-13,-19,-20,-21,-22,12,-14,-15,-16,-17,-18,-1,-2,-3,-4,-5,-6,-7,-8,-9,]),'AND':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[13,-10,-11,-12,-13,-19,-20,-21,-22,13,-14,-15,-16,-17,-18,13,-2,-3,-4,-5,-6,-7,-8,-9,]),'LESS_EQUAL':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[14,-10,-11,-12,-13,-19,-20,-21,-22,14,-14,-15,-16,-17,-18,14,14,-3,-4,-5,-6,14,-8,-9,]),'LESS':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[15,-10,-11,-12,-13,-19,-20,-21,-22,15,-14,-15,-16,-17,-18,15,15,-3,-4,-5,-6,15,-8,-9,]),'GREAT_EQUAL':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[16,-10,-11,-12,-13,-19,-20,-21,-22,16,-14,-15,-16,-17,-18,16,16,-3,-4,-5,-6,16,-8,-9,]),'GREATER':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[17,-10,-11,-12,-13,-19,-20,-21,-22,17,-14,-15,-16,-17,-18,17,17,-3,-4,-5,-6,17,-8,-9,]),'EQUAL':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[18,-10,-11,-12,-13,-19,-20,-21,-22,18,-14,-15,-16,-17,-18,18,18,-3,-4,-5,-6,-7,-8,-9,]),'PLUS':([1,2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[19,-10,-11,-12,-13,-19,-20,-21,-22,19,-14,-15,-16,-17,-18,19,19,19,19,19,19,19,-8,-9,]),'RPAREN':([2,3,4,5,8,9,10,11,20,21,22,23,24,25,26,27,28,29,30,31,32,33,34,],[-10,-11,-12,-13,-19,-20,-21,-22,34,-14,-15,-16,-17,-18,-1,-2,-3,-4,-5,-6,-7,-8,-9,]),'MONTH':([7,],[22,]),'DAY':([7,],[23,]),'HOUR':([7,],[24,]),'MINUTE':([7,],[25,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'expr':([0,6,12,13,14,15,16,17,18,19,],[1,20,26,27,28,29,30,31,32,33,]),'operand':([0,6,12,13,14,15,16,17,18,19,],[2,2,2,2,2,2,2,2,2,2,]),'primary':([0,6,12,13,14,15,16,17,18,19,],[3,3,3,3,3,3,3,3,3,3,]),'time':([0,6,12,13,14,15,16,17,18,19,],[4,4,4,4,4,4,4,4,4,4,]),'key':([0,6,12,13,14,15,16,17,18,19,],[5,5,5,5,5,5,5,5,5,5,]),'frame':([7,],[21,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> expr","S'",1,None,None,None),
+  ('expr -> expr OR expr','expr',3,'p_expr_operator','Parser.py',48),
+  ('expr -> expr AND expr','expr',3,'p_expr_operator','Parser.py',49),
+  ('expr -> expr LESS_EQUAL expr','expr',3,'p_expr_operator','Parser.py',50),
+  ('expr -> expr LESS expr','expr',3,'p_expr_operator','Parser.py',51),
+  ('expr -> expr GREAT_EQUAL expr','expr',3,'p_expr_operator','Parser.py',52),
+  ('expr -> expr GREATER expr','expr',3,'p_expr_operator','Parser.py',53),
+  ('expr -> expr EQUAL expr','expr',3,'p_expr_operator','Parser.py',54),
+  ('expr -> expr PLUS expr','expr',3,'p_expr_operator','Parser.py',55),
+  ('primary -> LPAREN expr RPAREN','primary',3,'p_expr_with_parens','Parser.py',70),
+  ('expr -> operand','expr',1,'p_expr_extra','Parser.py',81),
+  ('expr -> primary','expr',1,'p_expr_extra','Parser.py',82),
+  ('operand -> time','operand',1,'p_operand_time','Parser.py',93),
+  ('operand -> key','operand',1,'p_operand_key','Parser.py',102),
+  ('time -> INT frame','time',2,'p_time','Parser.py',112),
+  ('frame -> MONTH','frame',1,'p_frame','Parser.py',122),
+  ('frame -> DAY','frame',1,'p_frame','Parser.py',123),
+  ('frame -> HOUR','frame',1,'p_frame','Parser.py',124),
+  ('frame -> MINUTE','frame',1,'p_frame','Parser.py',125),
+  ('key -> LAST_BACKUP','key',1,'p_key_last_backup','Parser.py',143),
+  ('key -> MODIFIED','key',1,'p_key_booleon','Parser.py',155),
+  ('key -> TRUE','key',1,'p_key_booleon','Parser.py',156),
+  ('key -> FALSE','key',1,'p_key_booleon','Parser.py',157),
+]
@@ -0,0 +1,377 @@
+import hashlib
+import os
+import queue
+import shutil
+import stat
+import sys
+import threading
+import time
+import checkpoint
+import compress
+import copier
+import manifest
+import runner
+
+## @package restore
+#  This contains the restore engine, the way back from a backup
+#
+#  A backup is opened with OpenBackup(), which gives either a CopyBackup for the
+#  plain directories the runner writes or a StoreBackup for the recipes of a
+#  chunkstore.ChunkStore. Both find a file directly: a copy is its own file and a
+#  recipe has a chunkstore.RecipeIndex mapping every path to the pack locations
+#  of its chunks, so restoring one file never reads the rest of the backup.
+#
+#  A Restorer restores many files at once from a pool of threads fed through a
+#  bounded queue, like the runner. Every worker has at most a source and a
+#  target open, so the number of workers bounds the open files. Targets are
+#  preallocated to their final size, written next to their final name and only
+#  renamed into place once they are complete.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var OPEN_FILES
+#  The most files a Restorer keeps open at once
+OPEN_FILES = 64
+
+## @var READ_SIZE
+#  Adjacent chunks of a file are read from their pack together, up to this many bytes
+READ_SIZE = 8 * 1024 * 1024
+
+## @var _DONE
+#  Put on the work queue once per worker to tell it to stop
+_DONE = None
+
+## Open a backup
+#  @pre  None
+#  @post None
+#  @param destination The directory the runner wrote the backups to
+#  @param title The title of the backed up item
+#  @param compression (Optional)The item's compression spec, the copies of a
+#         compressed item carry the format's extension
+#  @param store (Optional)The chunkstore.ChunkStore the item was backed up to
+#  @param recipe (Optional)The recipe of the backup to open from the store, by
+#         default the newest one
+#  @retval A CopyBackup or a StoreBackup
+#  @exception KeyError The store has no backup of the item, or recipe belongs to
+#             another item
+def OpenBackup(destination, title, compression='none', store=None, recipe=None):
+  if store is None:
+    return CopyBackup(os.path.join(destination, runner.SafeName(title)), compression)
+  if recipe is None:
+    #checked by name too, restoring another item's files over this one's must never happen
+    recipes = [fileName for fileName in store.Backups(title) if store.BackupName(fileName) == title]
+    if not recipes:
+      raise KeyError(title)
+    recipe = recipes[-1]
+  elif store.BackupName(recipe) != title:
+    raise KeyError("%s isn't a backup of %s" % (recipe, title))
+  return StoreBackup(store, recipe)
+
+## A backup copied to a directory
+#  An entry is a (path, size, mtime_ns, stored path) tuple, size being the size
+#  of the stored file. The backup of an incremental run holds the copies of
+#  files deleted since, its manifest tells which files are live.
+class CopyBackup(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param directory The backup of the item
+  #  @param compression (Optional)The item's compression spec
+  def __init__(self, directory, compression='none'):
+    self.Directory = directory
+    self.Compression = compression
+    self._Extension = compress.Extension(compression)
+    self._Live = None
+    if os.path.exists(os.path.join(directory, manifest.FILE_NAME)):
+      self._Live = manifest.Manifest(os.path.join(directory, manifest.FILE_NAME)).Entries
+
+  ## Find a file
+  #  @param self The current instance
+  #  @param path The path of the file relative to the backup
+  #  @retval tuple The file's entry, None if the backup doesn't have it
+  def Find(self, path):
+    if self._Live is not None and path not in self._Live:
+      return None
+    stored = os.path.join(self.Directory, path) + self._Extension
+    try:
+      info = os.stat(stored)
+    except OSError:
+      return None
+    if not stat.S_ISREG(info.st_mode):
+      return None
+    return path, info.st_size, info.st_mtime_ns, stored
+
+  ## Select files
+  #  @param self The current instance
+  #  @param path (Optional)A file or directory relative to the backup, by default
+  #         the whole backup
+  #  @retval list The entries of the file or of every file below the directory
+  def Select(self, path=''):
+    entry = self.Find(path) if path else None
+    if entry is not None:
+      return [entry]
+    top = os.path.join(self.Directory, path)
+    if not os.path.isdir(top):
+      return []
+    entries = []
+    for dirEntry, relative in manifest.WalkEntries(top):
+      relative = os.path.join(path, relative) if path else relative
+      if relative == manifest.FILE_NAME or relative.endswith(checkpoint.PARTIAL_SUFFIX) or \
+         not relative.endswith(self._Extension):
+        continue
+      if self._Live is not None and relative[:len(relative) - len(self._Extension)] not in self._Live:
+        continue #deleted from the source, or copied by a run that failed
+      info = dirEntry.stat(follow_symlinks=False)
+      entries.append((relative[:len(relative) - len(self._Extension)], info.st_size, info.st_mtime_ns,
+                      dirEntry.path))
+    return entries
+
+  ## Restore a file
+  #  @pre  The directory of target exists
+  #  @post target is a complete copy of the file
+  #  @param self The current instance
+  #  @param entry The file's entry
+  #  @param target The path the file is written to
+  #  @param verify (Optional)Unused, copies carry no digests to check against
+  #  @retval int The number of bytes restored
+  def RestoreEntry(self, entry, target, verify=False):
+    stored = entry[3]
+    if not self._Extension:
+      size = copier.CopyFile(stored, target)
+    else:
+      with compress.Open(stored, self.Compression) as reader, open(target, 'wb') as writer:
+        shutil.copyfileobj(reader, writer, READ_SIZE)
+        size = writer.tell()
+      shutil.copystat(stored, target)
+    return size
+
+## A backup in a chunk store
+#  An entry is a chunkstore.RecipeIndex entry.
+class StoreBackup(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param store The chunkstore.ChunkStore
+  #  @param recipeFileName The recipe of the backup, it is indexed if it isn't yet
+  def __init__(self, store, recipeFileName):
+    self.Store = store
+    self.FileName = recipeFileName
+    self._Index = store.OpenIndex(recipeFileName)
+
+  ## Find a file
+  #  @param self The current instance
+  #  @param path The path of the file relative to the backup
+  #  @retval tuple The file's entry, None if the backup doesn't have it
+  def Find(self, path):
+    return self._Index.Find(path)
+
+  ## Select files
+  #  @param self The current instance
+  #  @param path (Optional)A file or directory relative to the backup
+  #  @retval list The entries of the file or of every file below the directory
+  def Select(self, path=''):
+    return self._Index.Select(path)
+
+  ## Restore a file
+  #  @pre  The directory of target exists
+  #  @post target holds the file's contents and mtime
+  #  @param self The current instance
+  #  @param entry The file's entry
+  #  @param target The path the file is written to
+  #  @param verify (Optional)Check every chunk against its digest
+  #  @retval int The number of bytes restored
+  #  @exception ValueError A chunk doesn't match its digest
+  def RestoreEntry(self, entry, target, verify=False):
+    path, size, mtime, locations = entry
+    with open(target, 'wb') as writer:
+      _Preallocate(writer.fileno(), size)
+      for (pack, offset, length), chunks in _Runs(locations):
+        data = self.Store.ReadAt(pack, offset, length)
+        if verify:
+          view = memoryview(data)
+          start = 0
+          for chunkLength, digest in chunks:
+            if hashlib.sha256(view[start:start + chunkLength]).digest() != digest:
+              raise ValueError("chunk %s of %s is corrupt" % (digest.hex(), path))
+            start += chunkLength
+        writer.write(data)
+      written = writer.tell()
+    os.utime(target, ns=(mtime, mtime))
+    return written
+
+  ## Close the backup's index
+  #  @param self The current instance
+  def Close(self):
+    self._Index.Close()
+
+## The parallel restore engine
+#  This class restores the files of a backup from a pool of threads.
+class Restorer(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param workers (Optional)The number of restore threads
+  #  @param openFiles (Optional)The most files open at once. Every worker holds a
+  #         source and a target, so the workers are capped at half of it.
+  #  @param verify (Optional)Check restored chunks against their digests
+  #  @param queueSize (Optional)The most files waiting for a worker at once
+  def __init__(self, workers=None, openFiles=OPEN_FILES, verify=False, queueSize=1024):
+    self.Workers = max(1, min(workers or min(32, (os.cpu_count() or 1) + 4), openFiles // 2))
+    self.Verify = verify
+    self.QueueSize = queueSize
+    self._Lock = threading.Lock()
+
+  ## Restore one file
+  #  @pre  None
+  #  @post target holds the file as it was backed up
+  #  @param self The current instance
+  #  @param backup A backup from OpenBackup()
+  #  @param path The path of the file relative to the backup
+  #  @param target The path the file is restored to
+  #  @retval int The number of bytes restored
+  #  @exception KeyError The backup doesn't have the file
+  #  @exception OSError The file couldn't be written
+  def RestoreFile(self, backup, path, target):
+    entry = backup.Find(path)
+    if entry is None:
+      raise KeyError(path)
+    return self._Restore(backup, entry, target)
+
+  ## Restore many files
+  #  @pre  None
+  #  @post Every selected file is restored below target, keeping its path
+  #  @param self The current instance
+  #  @param backup A backup from OpenBackup()
+  #  @param target The directory the files are restored to
+  #  @param paths (Optional)The files or directories of the backup to restore,
+  #         by default all of it
+  #  @retval dictionary A summary: 'files', 'bytes', 'seconds' and 'failed'
+  #          (path to error string)
+  def Restore(self, backup, target, paths=None):
+    start = time.time()
+    self._Result = {'files': 0, 'bytes': 0, 'failed': {}}
+    work = queue.Queue(self.QueueSize)
+    threads = [threading.Thread(target=self._Work, args=(backup, target, work), daemon=True)
+               for _ in range(self.Workers)]
+    for thread in threads:
+      thread.start()
+    try:
+      for path in (paths or ['']):
+        entries = backup.Select(path)
+        if not entries:
+          self._Result['failed'][path] = 'not in the backup'
+        for entry in entries:
+          work.put(entry) #blocks while the queue is full
+    finally:
+      for _ in threads:
+        work.put(_DONE)
+      for thread in threads:
+        thread.join()
+    self._Result['seconds'] = time.time() - start
+    return self._Result
+
+  def _Work(self, backup, target, work):
+    while True:
+      entry = work.get()
+      if entry is _DONE:
+        return
+      try:
+        size = self._Restore(backup, entry, _Inside(target, entry[0]))
+      except Exception as error: #a worker must survive anything or Restore() would block
+        with self._Lock:
+          self._Result['failed'][entry[0]] = str(error)
+      else:
+        with self._Lock:
+          self._Result['files'] += 1
+          self._Result['bytes'] += size
+
+  ## Restore a file next to its target and move it into place
+  #  @param self The current instance
+  #  @param backup The backup
+  #  @param entry The file's entry
+  #  @param target The path of the restored file
+  #  @retval int The number of bytes restored
+  def _Restore(self, backup, entry, target):
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    partial = target + '.partial'
+    try:
+      size = backup.RestoreEntry(entry, partial, self.Verify)
+      os.replace(partial, target)
+    except BaseException:
+      if os.path.exists(partial):
+        os.remove(partial)
+      raise
+    return size
+
+## Group the chunks of a file into reads
+#  @param locations The (pack, offset, length, digest) of every chunk in order
+#  @retval generator Yields ((pack, offset, length), [(length, digest), ...]) for
+#                    every run of chunks stored next to each other in one pack,
+#                    cut at READ_SIZE
+def _Runs(locations):
+  run = None
+  chunks = []
+  for pack, offset, length, digest in locations:
+    if run is not None and run[0] == pack and run[1] + run[2] == offset and run[2] + length <= READ_SIZE:
+      run[2] += length
+    else:
+      if run is not None:
+        yield tuple(run), chunks
+      run = [pack, offset, length]
+      chunks = []
+    chunks.append((length, digest))
+  if run is not None:
+    yield tuple(run), chunks
+
+## Reserve the space of a file
+#  @param descriptor The open file
+#  @param size Its final size
+#  @brief Allocating the whole file up front keeps it from fragmenting while
+#         many files grow at once. Where the file system can't do it the file
+#         simply grows as it is written.
+def _Preallocate(descriptor, size):
+  if size and hasattr(os, 'posix_fallocate'):
+    try:
+      os.posix_fallocate(descriptor, 0, size)
+    except OSError:
+      pass
+
+## Join a restored path to the target directory
+#  @param target The directory being restored to
+#  @param path A path from a backup
+#  @retval string The path of the restored file
+#  @exception ValueError The path would escape the target directory
+def _Inside(target, path):
+  normal = os.path.normpath(path)
+  if os.path.isabs(normal) or normal == os.pardir or normal.startswith(os.pardir + os.sep):
+    raise ValueError("%s is outside the backup" % path)
+  return os.path.join(target, normal)
+
+# python restore.py destination title target [path ...] [--store DIR] [--compression SPEC]
+if __name__ == "__main__":
+  import argparse
+  import chunkstore
+  parser = argparse.ArgumentParser(description='Restore a backed up item')
+  parser.add_argument('destination', help='the directory the backups were written to')
+  parser.add_argument('title', help='the title of the item')
+  parser.add_argument('target', help='the directory the files are restored to')
+  parser.add_argument('paths', nargs='*', help='the files or directories to restore, by default all')
+  parser.add_argument('--store', help='the chunk store the item was backed up to')
+  parser.add_argument('--compression', default='none', help="the item's compression spec")
+  parser.add_argument('--workers', type=int, help='the number of restore threads')
+  parser.add_argument('--verify', action='store_true', help='check restored chunks against their digests')
+  arguments = parser.parse_args()
+  store = chunkstore.ChunkStore(arguments.store) if arguments.store else None
+  try:
+    backup = OpenBackup(arguments.destination, arguments.title, arguments.compression, store)
+    result = Restorer(arguments.workers, verify=arguments.verify).Restore(backup, arguments.target,
+                                                                          arguments.paths)
+  finally:
+    if store is not None:
+      store.Close()
+  print("restored %d files, %d bytes in %.1fs" % (result['files'], result['bytes'], result['seconds']))
+  for path, error in result['failed'].items():
+    print("failed", path, error, file=sys.stderr)
+  sys.exit(1 if result['failed'] else 0)
@@ -0,0 +1,692 @@
+import hashlib
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import batch_eval
+import checkpoint
+import compress
+import copier
+import instrument
+import manifest
+import Parser
+import throttle
+
+## @package runner
+#  This contains the backup runner, the part of the program that copies files
+#
+#  The runner asks the model which items are due, expands folder items into one
+#  work unit per file and hands the units to a pool of worker threads through a
+#  bounded queue. The queue keeps memory flat however big a tree is, since the
+#  walk can only get a fixed number of files ahead of the copies. Once every file
+#  of an item has been copied its 'last' time is updated through the model.
+#
+#  A backup of an item titled T is written to destination/T, a folder item keeping
+#  the layout of its tree and a file item keeping its file name. In incremental
+#  mode folder items keep a manifest there and only new or changed files are
+#  copied, see manifest. A watcher.ChangeJournal spares those runs the walk of
+#  the tree while it covers the item. With a chunk store the files are deduplicated into the
+#  store instead and every run of an item commits a recipe there and indexes it
+#  for restores, see chunkstore and restore.
+#  Items with a 'compression' spec other than "none" are compressed on the way,
+#  see compress. The chunk store keeps its chunks uncompressed.
+#
+#  Every item keeps a checkpoint.Checkpoint in the destination while it is
+#  backed up, so a run that is killed part way through a large item resumes it
+#  from the files, and for large files from the chunks or segments, that were
+#  durably written instead of starting it over.
+#
+#  The workers are a ceiling: a throttle.AdaptiveConcurrency decides how many of
+#  them copy at once from the throughput and latency it measures, and token
+#  buckets keep the destination and each item group within their throttle.Limit.
+#  A file pays for its operation before it is opened and for its bytes block by
+#  block as they are copied, so a large file doesn't hold every other worker back
+#  for its whole size at once.
+#  The result of every run reports the limits and what they held back.
+#
+#  Inside an instrument.Session every stage of a run (walk, copy, compress, hash,
+#  store, finish and the time spent waiting on the queue) is timed and the depth
+#  of the work queue is sampled, and the result of Run() carries the report.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var _DONE
+#  Put on the work queue once per worker to tell it to stop
+_DONE = None
+
+## Progress of one backup item during a run
+class _ItemProgress(object):
+
+  def __init__(self, title, itemData):
+    self.Title = title
+    self.Data = itemData
+    self.Outstanding = 0
+    self.Expanded = False
+    self.Errors = []
+    self.Target = None
+    self.Manifest = None
+    self.Recipe = None
+    self.Checkpoint = None
+    self.Finished = False
+
+## The rate limit payments of one file
+#  This class is called with the size of every block of the file as it is copied.
+#  It keeps the seconds spent waiting, which aren't part of the file's latency.
+class _Charge(object):
+
+  def __init__(self, throttle, group):
+    self.Throttle = throttle
+    self.Group = group
+    self.Waited = 0.0
+
+  ## Pay for opening the file
+  #  @param self The current instance
+  def Open(self):
+    with instrument.Stage('throttle'):
+      self.Waited += self.Throttle.Charge(self.Group, 0)
+
+  def __call__(self, bytes):
+    with instrument.Stage('throttle'):
+      self.Waited += self.Throttle.Charge(self.Group, bytes, 0)
+
+## The backup runner
+#  This class runs the backups of every due item of a model.
+class BackupRunner(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param model A bumodel.Model or sqlmodel.SqliteModel
+  #  @param destination The directory backups are written to
+  #  @param workers (Optional)The number of copy threads
+  #  @param queueSize (Optional)The most work units waiting for a worker at once
+  #  @param changeIndex (Optional)A change_index.ChangeIndex, needed for conditions
+  #         that use Modified. Items are recorded in it after they are backed up.
+  #  @param default (Optional)The condition used by items whose condition is 'Default'
+  #  @param incremental (Optional)Only copy the files of folder items that changed
+  #         since their last successful backup
+  #  @param store (Optional)A chunkstore.ChunkStore to deduplicate the files into
+  #         instead of copying them to the destination
+  #  @param compressor (Optional)A compress.ParallelCompressor to share, by default
+  #         every run starts its own
+  #  @param changeJournal (Optional)A watcher.ChangeJournal listing the paths that
+  #         changed, used by incremental runs
+  #  @param limit (Optional)The throttle.Limit of the destination
+  #  @param groupLimits (Optional)A dictionary mapping item groups to their throttle.Limit
+  #  @param adaptive (Optional)Set to False to always copy with every worker
+  #  @param resume (Optional)Set to False to keep no checkpoints, so an item that
+  #         was interrupted starts over
+  #  @exception ValueError Incremental mode was combined with a chunk store. A
+  #             recipe has to list every file, so those runs read the whole tree.
+  def __init__(self, model, destination, workers=None, queueSize=1024, changeIndex=None, default='True',
+               incremental=False, store=None, compressor=None, changeJournal=None, limit=None,
+               groupLimits=None, adaptive=True, resume=True):
+    if incremental and store is not None:
+      raise ValueError("incremental runs can't write to a chunk store")
+    self.Model = model
+    self.Destination = destination
+    self.Workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    self.QueueSize = queueSize
+    self.ChangeIndex = changeIndex
+    self.Default = default
+    self.Incremental = incremental
+    self.Store = store
+    self.Compressor = compressor
+    self._Compressor = compressor
+    self.ChangeJournal = changeJournal
+    self.Limit = limit
+    self.GroupLimits = groupLimits
+    self.Adaptive = adaptive
+    self.Resume = resume
+    self._Lock = threading.Lock()
+
+  ## Get the due items
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance
+  #  @param now (Optional)The current time as a timestamp
+  #  @param errors (Optional)A dictionary that gets the title of every item whose
+  #         condition can't be evaluated mapped to the reason, see batch_eval.due_items()
+  #  @retval list (title, item data) pairs for the items whose conditions hold
+  def DueItems(self, now=None, errors=None):
+    now = time.time() if now is None else now
+    data = self.Model.GetBackUpData()
+    modified = self.ChangeIndex.IsModified if self.ChangeIndex is not None else None
+    return [(title, data[title]) for title in batch_eval.due_items(data, now, modified, self.Default, errors)]
+
+  ## Run the backups
+  #  @pre  The destination should be writable
+  #  @post Every due item is copied. Items copied without errors have their 'last'
+  #        time set to the start of the run and the model is saved. Items whose
+  #        condition can't be evaluated are reported as failed, as are items whose
+  #        title gives the same destination as an earlier item of the run.
+  #  @param self The current instance
+  #  @param items (Optional)The (title, item data) pairs to back up, by default DueItems()
+  #  @retval dictionary A summary of the run: 'succeeded' (titles), 'failed'
+  #          (title to a list of error strings), 'files' and 'bytes' (what this
+  #          run backed up), 'seconds', 'resumed', the 'files' and 'bytes' taken
+  #          over from interrupted runs, and 'limits', the concurrency and rate
+  #          limits and what they held back.
+  #          Inside an instrument.Session it has the stats so far as 'stats'.
+  def Run(self, items=None):
+    with instrument.Stage('run'):
+      result = self._Run(items)
+    if instrument.Active() is not None:
+      result['stats'] = instrument.Active().Report()
+    return result
+
+  def _Run(self, items):
+    start = time.time()
+    self._Result = {'succeeded': [], 'failed': {}, 'files': 0, 'bytes': 0, 'resumed': {'files': 0, 'bytes': 0}}
+    if items is None:
+      errors = {}
+      items = self.DueItems(start, errors)
+      for title, error in errors.items():
+        self._Result['failed'][title] = [error]
+    self._Started = start
+    self._Finished = []
+    self._Completing = threading.Lock()
+    #the pool behind a compressor only starts if an item is compressed
+    self._Compressor = self.Compressor or compress.ParallelCompressor()
+    self._Concurrency = throttle.AdaptiveConcurrency(self.Workers, adaptive=self.Adaptive)
+    self._Throttle = throttle.Throttle(self.Limit, self.GroupLimits)
+
+    work = queue.Queue(self.QueueSize)
+    threads = [threading.Thread(target=self._Work, args=(work,), daemon=True)
+               for _ in range(self.Workers)]
+    for thread in threads:
+      thread.start()
+
+    try:
+      targets = {}
+      for title, itemData in items:
+        target = SafeName(title)
+        if target in targets: #the two items would overwrite each other's copies
+          self._Result['failed'].setdefault(title, []).append(
+            "%s: the destination %s is already used by the item %r in this run" %
+            (itemData['source'], os.path.join(self.Destination, target), targets[target]))
+          continue
+        targets[target] = title
+        self._Expand(work, _ItemProgress(title, itemData))
+    finally:
+      for _ in threads:
+        work.put(_DONE)
+      for thread in threads:
+        thread.join()
+      if self.Compressor is None:
+        self._Compressor.Close()
+
+    self.Model.Save()
+    for finished in self._Finished: #only once the 'last' times are saved
+      finished.Remove()
+    self._Result['seconds'] = time.time() - start
+    self._Result['limits'] = self._Throttle.Report()
+    self._Result['limits']['concurrency'] = self._Concurrency.Report()
+    return self._Result
+
+  ## Queue the work units of an item
+  #  @param self The current instance
+  #  @param work The work queue
+  #  @param progress The _ItemProgress of the item
+  def _Expand(self, work, progress):
+    source = progress.Data['source']
+    progress.Target = os.path.join(self.Destination, SafeName(progress.Title))
+    try:
+      if self.Store is not None:
+        progress.Recipe = self.Store.NewBackup(progress.Title)
+      if self.Resume:
+        progress.Checkpoint = checkpoint.Checkpoint(
+          os.path.join(self.Destination, checkpoint.DIRECTORY, SafeName(progress.Title)),
+          self._CheckpointKey(progress.Data), self.Store.Flush if self.Store is not None else None)
+      if progress.Data['type'] == 'folder' and self.Incremental:
+        progress.Manifest = self._OpenManifest(os.path.join(progress.Target, manifest.FILE_NAME))
+        paths = None
+        if self.ChangeJournal is not None and self.ChangeJournal.IsTracked(source, progress.Manifest.Time):
+          paths = self.ChangeJournal.DirtyPaths(source, progress.Manifest.Time)
+        units = ((path, relative, (relative, size, mtime))
+                 for path, relative, size, mtime in progress.Manifest.Diff(source, paths, self._Unreadable(progress)))
+      elif progress.Data['type'] == 'folder':
+        units = ((path, relative, None) for path, relative in WalkFiles(source, self._Unreadable(progress)))
+      else:
+        units = iter([(source, os.path.basename(source), None)])
+      while True:
+        with instrument.Stage('walk'):
+          unit = next(units, None)
+        if unit is None:
+          break
+        with self._Lock:
+          progress.Outstanding += 1
+        instrument.Gauge('queue.depth', work.qsize())
+        with instrument.Stage('queue.wait'):
+          work.put((progress,) + unit) #blocks while the queue is full
+    except (OSError, ValueError) as error: #a corrupt manifest only fails its own item
+      with self._Lock:
+        progress.Errors.append(str(error))
+    with self._Lock:
+      progress.Expanded = True
+      finished = self._Finish(progress)
+    if finished:
+      self._Complete(progress)
+
+  ## Open the manifest of an incremental item
+  #  @param self The current instance
+  #  @param fileName The path of the manifest
+  #  @retval manifest.Manifest The manifest
+  #  @exception ValueError The manifest is corrupt. The item fails and the
+  #             manifest is set aside, so the next run starts a new one and
+  #             copies the whole item again.
+  def _OpenManifest(self, fileName):
+    try:
+      return manifest.Manifest(fileName)
+    except ValueError as error:
+      os.replace(fileName, fileName + manifest.CORRUPT_SUFFIX)
+      raise ValueError('%s, moved to %s for the next run to start over' %
+                       (error, fileName + manifest.CORRUPT_SUFFIX))
+
+  ## Fail an item for the directories its walk can't read
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @retval function The onError callback of WalkFiles(), which records the
+  #          error so the item fails instead of silently missing the files
+  def _Unreadable(self, progress):
+    def unreadable(relative, error):
+      with self._Lock:
+        progress.Errors.append('%s: %s' % (os.path.join(progress.Data['source'], relative), error))
+    return unreadable
+
+  ## Worker thread
+  #  @param self The current instance
+  #  @param work The work queue
+  def _Work(self, work):
+    try:
+      with instrument.ThreadProfile():
+        self._WorkLoop(work)
+    except BaseException as exception: #Run() would wait forever for the units this worker never takes
+      print('backup worker failed: %s' % exception, file=sys.stderr)
+      self._WorkLoop(work, exception)
+
+  ## Work through the queue
+  #  @param self The current instance
+  #  @param work The work queue
+  #  @param failure (Optional)The exception that killed this worker's loop, every
+  #         unit it takes from then on fails with it instead of being backed up
+  def _WorkLoop(self, work, failure=None):
+    while True:
+      unit = work.get()
+      if unit is _DONE:
+        return
+      progress, source, relative, record = unit
+      error = None
+      size = 0
+      started = None
+      resumed = False
+      charge = None
+      try:
+        if failure is not None:
+          raise RuntimeError('the backup worker failed: %s' % failure)
+        if record is None and progress.Checkpoint is not None:
+          info = os.stat(source)
+          record = (relative, info.st_size, info.st_mtime_ns)
+        if progress.Checkpoint is not None and self._Resume(progress, relative, record):
+          resumed = True #counted in 'resumed' instead
+          continue
+        if self._Throttle:
+          charge = _Charge(self._Throttle, progress.Data.get('group', 'default'))
+          charge.Open()
+        self._Concurrency.Enter()
+        started = time.perf_counter()
+        if progress.Recipe is not None:
+          size = self.StoreFile(progress, source, relative, charge)
+          continue
+        target = os.path.join(progress.Target, relative)
+        spec = progress.Data.get('compression', 'none')
+        if progress.Checkpoint is not None and record[1] >= checkpoint.RESUME_SIZE and compress.ParseSpec(spec) is None:
+          size = self._CopyResumable(progress, source, target, record, charge)
+        else:
+          size = self.CopyFile(source, target, spec, charge)
+        digest = None
+        if progress.Manifest is not None:
+          with instrument.Stage('hash') as measurement:
+            measurement.Bytes = record[1]
+            digest = manifest.HashFile(source)
+          with self._Lock:
+            progress.Manifest.Update(*(record + (digest,)))
+        if progress.Checkpoint is not None:
+          progress.Checkpoint.Complete(relative, record[1], record[2], digest, target + compress.Extension(spec))
+      except Exception as exception: #a worker must survive anything or Run() would block
+        error = '%s: %s' % (source, exception)
+      finally:
+        if started is not None:
+          self._Concurrency.Leave(size, time.perf_counter() - started - (charge.Waited if charge else 0.0))
+          instrument.Gauge('concurrency', self._Concurrency.Limit)
+        with self._Lock:
+          progress.Outstanding -= 1
+          if error is None and not resumed:
+            self._Result['files'] += 1
+            self._Result['bytes'] += size
+          elif error is not None:
+            progress.Errors.append(error)
+          finished = self._Finish(progress)
+        if finished: #the other workers carry on while this one completes the item
+          self._Complete(progress)
+
+  ## Store one file in the chunk store
+  #  @pre  None
+  #  @post The file's chunks are in the store and it is listed in the item's recipe
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @param source The path of the file being backed up
+  #  @param relative The path recorded in the recipe
+  #  @param charge (Optional)A function called with the size of every chunk before
+  #         it is stored, to pay the rate limits
+  #  @retval int The number of new bytes written to the store
+  #  @exception OSError The file couldn't be read
+  #  @note Called from the worker threads
+  def StoreFile(self, progress, source, relative, charge=None):
+    info = os.stat(source)
+    resume = report = None
+    if progress.Checkpoint is not None and info.st_size >= checkpoint.RESUME_SIZE:
+      resume = self._ResumeChunks(progress, source, relative, info)
+      report = lambda offset, chunks: progress.Checkpoint.Progress(relative, info.st_size, info.st_mtime_ns,
+                                                                   offset, chunks)
+    with instrument.Stage('store') as measurement:
+      chunks, written = self.Store.StoreFile(source, resume, report, charge)
+      measurement.Bytes, measurement.Files = info.st_size - (resume[0] if resume else 0), 1
+    with self._Lock:
+      progress.Recipe.Add(relative, info.st_size, info.st_mtime_ns, chunks)
+    if progress.Checkpoint is not None:
+      progress.Checkpoint.Complete(relative, info.st_size, info.st_mtime_ns, chunks)
+    return written
+
+  ## Copy one file
+  #  @pre  None
+  #  @post target is a copy of source, including its times and permissions.
+  #        The copy is done in the kernel where possible, see copier.
+  #  @param self The current instance
+  #  @param source The path of the file being backed up
+  #  @param target The path of the copy, compressed copies get the format's extension
+  #  @param spec (Optional)The compression spec of the item
+  #  @param charge (Optional)A function called with the size of every block before
+  #         it is copied, to pay the rate limits
+  #  @retval int The number of bytes read from source
+  #  @exception OSError The copy failed
+  #  @exception ValueError The compression spec is invalid
+  #  @note Called from the worker threads
+  def CopyFile(self, source, target, spec='none', charge=None):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if compress.ParseSpec(spec) is None:
+      with instrument.Stage('copy') as measurement:
+        size = copier.CopyFile(source, target, charge=charge)
+        measurement.Bytes, measurement.Files = size, 1
+      return size
+    target += compress.Extension(spec)
+    with instrument.Stage('compress') as measurement:
+      size = self._Compressor.CompressFile(source, target, spec, charge)[0]
+      measurement.Bytes, measurement.Files = size, 1
+    shutil.copystat(source, target)
+    return size
+
+  ## Take over a file finished by an interrupted run
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @param relative The path of the file relative to the item
+  #  @param record (relative path, size, mtime_ns) of the file now
+  #  @retval bool True if the file needs no backup, it is listed in the item's
+  #          recipe or manifest as it would have been if this run backed it up
+  #  @note Called from the worker threads
+  def _Resume(self, progress, relative, record):
+    done, extra = progress.Checkpoint.Done(relative, record[1], record[2])
+    if not done or not self._ValidExtra(progress, record[1], extra):
+      return False
+    if progress.Recipe is None and not os.path.exists(
+        os.path.join(progress.Target, relative) + compress.Extension(progress.Data.get('compression', 'none'))):
+      return False
+    with self._Lock:
+      if progress.Recipe is not None:
+        progress.Recipe.Add(relative, record[1], record[2], extra)
+      elif progress.Manifest is not None:
+        progress.Manifest.Update(*(record + (extra,)))
+      self._Result['resumed']['files'] += 1
+      self._Result['resumed']['bytes'] += record[1]
+    return True
+
+  ## Check what a checkpoint lists a finished file with
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @param size The size of the file
+  #  @param extra The extra value of the file's checkpoint record
+  #  @retval bool True if extra is what this run would list the file with, the
+  #          chunks of the whole file or its manifest digest
+  def _ValidExtra(self, progress, size, extra):
+    if progress.Recipe is not None:
+      return _ValidChunks(extra, size)
+    return extra is None or isinstance(extra, str)
+
+  ## Store the rest of a large file an interrupted run stored part of
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @param source The path of the file
+  #  @param relative The path of the file relative to the item
+  #  @param info The stat result of the file
+  #  @retval tuple The (offset, chunks) to resume from for chunkstore.ChunkStore.StoreFile(),
+  #          None unless the store holds every chunk and the last one matches the file
+  def _ResumeChunks(self, progress, source, relative, info):
+    resume = progress.Checkpoint.Partial(relative, info.st_size, info.st_mtime_ns)
+    if resume is None or not resume[1] or not _ValidChunks(resume[1], resume[0]):
+      return None
+    offset, chunks = resume
+    if not all(self.Store.Has(bytes.fromhex(digest)) for digest, _ in chunks):
+      return None
+    digest, length = chunks[-1]
+    with open(source, 'rb') as file: #the tail the next chunk starts from
+      if hashlib.sha256(os.pread(file.fileno(), length, offset - length)).hexdigest() != digest:
+        return None
+    with self._Lock:
+      self._Result['resumed']['bytes'] += offset
+    return resume
+
+  ## Copy a large file so an interrupted run can carry on with it
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @param source The path of the file
+  #  @param target The path of the copy
+  #  @param record (relative path, size, mtime_ns) of the file
+  #  @param charge (Optional)A function called with the size of every block before
+  #         it is copied, to pay the rate limits
+  #  @retval int The number of bytes read from source
+  #  @note Called from the worker threads
+  def _CopyResumable(self, progress, source, target, record, charge=None):
+    relative, size, mtime = record
+    partial = target + checkpoint.PARTIAL_SUFFIX
+    offset = 0
+    resume = progress.Checkpoint.Partial(relative, size, mtime)
+    if resume is not None:
+      offset = checkpoint.VerifiedOffset(source, partial, resume[0])
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with instrument.Stage('copy') as measurement:
+      copied = copier.CopyFileFrom(source, partial, offset,
+                                   lambda reached: progress.Checkpoint.Progress(relative, size, mtime, reached,
+                                                                                path=partial),
+                                   checkpoint.SEGMENT_SIZE, charge) - offset
+      measurement.Bytes, measurement.Files = copied, 1
+    os.replace(partial, target)
+    if offset:
+      with self._Lock:
+        self._Result['resumed']['bytes'] += offset
+    return copied
+
+  ## The key of an item's checkpoint
+  #  @param self The current instance
+  #  @param data The item's data
+  #  @retval list What the files of an interrupted run depend on, its checkpoint
+  #          is discarded when any of it changed
+  def _CheckpointKey(self, data):
+    if self.Store is not None:
+      mode = ['store', os.path.abspath(self.Store.Directory)]
+    else:
+      mode = ['incremental' if self.Incremental and data['type'] == 'folder' else 'full',
+              data.get('compression', 'none')]
+    return [data['source'], data['type']] + mode
+
+  ## Check whether all of an item's work is done
+  #  @pre  self._Lock is held
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  #  @retval bool True exactly once per item, when its last work unit is done.
+  #          The caller then completes the item with _Complete() after releasing
+  #          the lock, so the I/O of one item never stalls the workers of the others.
+  def _Finish(self, progress):
+    if not progress.Expanded or progress.Outstanding or progress.Finished:
+      return False
+    progress.Finished = True
+    return True
+
+  ## Complete an item once all of its work is done
+  #  @pre  _Finish() returned True for the item and self._Lock is not held
+  #  @post The item's manifest, recipe and index are written and it is reported.
+  #        Items that succeeded have their 'last' time updated.
+  #  @param self The current instance
+  #  @param progress The _ItemProgress of the item
+  def _Complete(self, progress):
+    with instrument.Stage('finish'):
+      self._CompleteItem(progress)
+
+  def _CompleteItem(self, progress):
+    if progress.Manifest is not None and not progress.Errors:
+      try:
+        progress.Manifest.Save(self._Started)
+      except OSError as error:
+        progress.Errors.append('%s: %s' % (progress.Manifest.FileName, error))
+      else:
+        extension = compress.Extension(progress.Data.get('compression', 'none'))
+        for relative in progress.Manifest.Deleted: #the manifest holds their tombstones now
+          try:
+            os.remove(os.path.join(progress.Target, relative) + extension)
+          except OSError:
+            pass
+    if progress.Recipe is not None:
+      try:
+        if progress.Errors:
+          progress.Recipe.Discard()
+        else:
+          self.Store.Flush()
+          progress.Recipe.Commit()
+      except OSError as error:
+        progress.Errors.append('%s: %s' % (progress.Recipe.FileName, error))
+      if not progress.Errors:
+        try:
+          self.Store.IndexBackup(progress.Recipe.FileName).Close()
+        except Exception as error: #the backup is committed, restore.py indexes it when it is first needed
+          print('unable to index %s: %s' % (progress.Recipe.FileName, error), file=sys.stderr)
+    if progress.Errors:
+      with self._Lock:
+        self._Result['failed'].setdefault(progress.Title, []).extend(progress.Errors)
+      if progress.Checkpoint is not None:
+        try: #the next run carries on from the files that did make it
+          progress.Checkpoint.Save()
+        except OSError as error:
+          print('unable to checkpoint %s: %s' % (progress.Title, error), file=sys.stderr)
+      return
+    source = progress.Data['source']
+    with self._Completing: #the model and the indexes are shared by every item
+      self.Model.ModifyItem(source, 'last', repr(self._Started))
+      if self.ChangeIndex is not None and self._NeedsModified(progress.Data):
+        self.ChangeIndex.Record(source)
+      if self.ChangeJournal is not None:
+        self.ChangeJournal.Clear(source, self._Started)
+    with self._Lock:
+      if progress.Checkpoint is not None:
+        self._Finished.append(progress.Checkpoint)
+      self._Result['succeeded'].append(progress.Title)
+
+  ## Check whether an item's condition needs its Modified flag
+  #  @param self The current instance
+  #  @param data The item's data
+  #  @retval bool False when the condition never looks at Modified, so recording
+  #          (and hashing) the item for the change index can be skipped
+  def _NeedsModified(self, data):
+    condition = data.get('condition', 'Default')
+    try:
+      return 'Modified' in Parser.compile_condition(self.Default if condition == 'Default' else condition).facts
+    except SyntaxError: #record it anyway, the condition may still be fixed to use Modified
+      return True
+
+## Walk the files of a tree
+#  @pre  None
+#  @post None
+#  @param top The root of the tree
+#  @param onError (Optional)A function called with the relative path and the
+#         OSError of every directory below top that can't be read
+#  @retval generator Yields (path, path relative to top) for every file in the
+#                    tree. Symbolic links are not followed.
+#  @exception OSError The root can't be read, the directories below it that
+#             can't be read are skipped after they are passed to onError
+def WalkFiles(top, onError=None):
+  for entry, relative in manifest.WalkEntries(top, onError):
+    yield entry.path, relative
+
+## Check a list of chunks read from a checkpoint
+#  @param chunks The [digest, length] pairs
+#  @param size The bytes the chunks should add up to
+#  @retval bool True if chunks is well formed and covers size bytes
+def _ValidChunks(chunks, size):
+  try:
+    for digest, length in chunks:
+      if not isinstance(length, int) or len(bytes.fromhex(digest)) != 32:
+        return False
+    return sum(length for digest, length in chunks) == size
+  except (ValueError, TypeError):
+    return False
+
+## Make a title safe to use as a directory name
+#  @param title The title of a backup item
+#  @retval string The title with path separators replaced
+def SafeName(title):
+  name = (title or 'untitled').replace(os.sep, '_')
+  if os.altsep:
+    name = name.replace(os.altsep, '_')
+  return '_' + name if name in ('.', '..') else name
+
+# python runner.py destination [database] [--report FILE] [--live FILE] [--profile cprofile|tracemalloc]
+if __name__ == "__main__":
+  import argparse
+  import bumodel
+  parser = argparse.ArgumentParser(description='Back up the due items of a catalog')
+  parser.add_argument('destination')
+  parser.add_argument('database', nargs='?', default='PyBakUP.xml')
+  parser.add_argument('--report', help='write a JSON report of the stages of the run')
+  parser.add_argument('--live', help='keep a JSON file with the stats of the run so far')
+  parser.add_argument('--profile', choices=instrument.PROFILERS, help='profile the run')
+  parser.add_argument('--limit-bytes', type=int, help='bytes per second read for the destination')
+  parser.add_argument('--limit-iops', type=int, help='files per second for the destination')
+  parser.add_argument('--group-limit', action='append', default=[], metavar='GROUP=BYTES[,IOPS]',
+                      help='bytes and files per second for the items of a group, 0 for no limit')
+  parser.add_argument('--limit-hours', metavar='START-END',
+                      help='local hours the limits apply in, such as 9-18, by default always')
+  parser.add_argument('--fixed', action='store_true', help='copy with every worker instead of adapting')
+  parser.add_argument('--no-resume', action='store_true',
+                      help='keep no checkpoints, an interrupted item starts over on the next run')
+  arguments = parser.parse_args()
+  hours = tuple(float(hour) for hour in arguments.limit_hours.split('-')) if arguments.limit_hours else None
+  limit = None
+  if arguments.limit_bytes or arguments.limit_iops:
+    limit = throttle.Limit(arguments.limit_bytes, arguments.limit_iops, hours)
+  groupLimits = {}
+  for spec in arguments.group_limit:
+    group, _, rates = spec.partition('=')
+    rates = [int(rate) or None for rate in rates.split(',')] + [None]
+    groupLimits[group] = throttle.Limit(rates[0], rates[1], hours)
+  with instrument.Session(arguments.report, arguments.live, arguments.profile):
+    model = bumodel.OpenModel(arguments.database) #inside the session so the catalog load is measured
+    result = BackupRunner(model, arguments.destination, limit=limit, groupLimits=groupLimits,
+                          adaptive=not arguments.fixed, resume=not arguments.no_resume).Run()
+  print("backed up %d items, %d files, %d bytes in %.1fs" %
+        (len(result['succeeded']), result['files'], result['bytes'], result['seconds']))
+  if result['resumed']['files'] or result['resumed']['bytes']:
+    print("resumed %d files, %d bytes from interrupted runs" %
+          (result['resumed']['files'], result['resumed']['bytes']))
+  for title, errors in result['failed'].items():
+    print("failed", title, *errors, sep='\n  ')
@@ -0,0 +1,361 @@
+import heapq
+import itertools
+import threading
+import time
+import batch_eval
+import Parser
+
+## @package scheduler
+#  This contains the scheduler that sleeps until the next backup is due
+#
+#  Instead of evaluating every item's condition over and over, the scheduler
+#  works out when each condition will next hold. As time passes only LastBU
+#  changes, and every comparison in a condition switches value at most at the
+#  point where its two sides cross, so a condition built from LastBU, constants,
+#  comparisons, + and the logical operators only has to be evaluated at those
+#  crossing points to find the first time it becomes true. For example
+#  "LastBU > 3 days" is due just after last + 3 days.
+#
+#  Items are kept in a heap by due time and the daemon sleeps until the earliest
+#  one. Conditions that depend on Modified can't be solved for a time. They are
+#  solved assuming Modified holds and assuming it doesn't, the earlier of the two
+#  being the earliest time they could be due, and from then on rechecked in
+#  batches every recheck interval. Items whose condition can't be analysed at all
+#  are rechecked the same way. Items with a broken condition or last backup time
+#  are left out and listed in Scheduler.Errors.
+#
+#  The heap belongs to the thread running the scheduler. Other threads tell it
+#  about edited, added or removed items with Reschedule(), which only queues the
+#  source and wakes the scheduler up to apply it. Items added to the model
+#  without a Reschedule() are picked up when Run() schedules everything again,
+#  every refresh interval.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var EPSILON
+#  How far past a crossing point a strict comparison is checked
+EPSILON = 0.001
+
+## @var _COMPARISONS
+#  The operators whose value can switch where their operands cross
+_COMPARISONS = ('LESS', 'LESS_EQUAL', 'GREATER', 'GREAT_EQUAL', 'EQUAL')
+
+## @var UNSOLVABLE
+#  Returned by NextDue() for conditions that can't be solved for a time
+UNSOLVABLE = object()
+
+## Find when a condition is next due
+#  @pre  None
+#  @post None
+#  @param condition A Parser.Condition or a condition string
+#  @param last The timestamp of the last backup, None for never
+#  @param now The current time as a timestamp
+#  @param modified (Optional)The value used for Modified. Conditions that use it
+#         are UNSOLVABLE without one.
+#  @retval The earliest timestamp no earlier than now at which the condition
+#          holds, None if it never will, or UNSOLVABLE
+def NextDue(condition, last, now, modified=None):
+  if isinstance(condition, str):
+    condition = Parser.compile_condition(condition)
+  crossings = set()
+  shape = _Shape(condition.tree, crossings, modified is not None)
+  if shape is None:
+    return UNSOLVABLE
+
+  context = {'Modified': modified}
+  def holds(moment):
+    context['LastBU'] = Parser.elapsed_since(last, moment)
+    return condition(context)
+
+  if holds(now):
+    return now
+  if last is None: #LastBU stays infinite so nothing changes with time
+    return None
+  moments = set()
+  for elapsed in crossings:
+    moments.add(last + elapsed)
+    moments.add(last + elapsed + EPSILON)
+  for moment in sorted(moments):
+    if moment > now and holds(moment):
+      return moment
+  return None
+
+## Analyse how a node changes with LastBU
+#  @param node A parse tree node
+#  @param crossings A set that collects the LastBU values where comparisons switch
+#  @param modifiedKnown True if Modified has a fixed value
+#  @retval tuple ('linear', slope, offset) for a number that is slope * LastBU +
+#          offset, ('step',) for a value that only changes at crossings, or None
+#          if the node can't be analysed
+def _Shape(node, crossings, modifiedKnown):
+  kind = node[0]
+  if kind == 'const':
+    return ('linear', 0, node[1])
+  if kind == 'key':
+    if node[1] == 'LastBU':
+      return ('linear', 1, 0)
+    return ('step',) if modifiedKnown else None
+
+  name = node[1]
+  left = _Shape(node[2], crossings, modifiedKnown)
+  right = _Shape(node[3], crossings, modifiedKnown)
+  if left is None or right is None:
+    return None
+  if name == 'PLUS' and left[0] == 'linear' and right[0] == 'linear':
+    return ('linear', left[1] + right[1], left[2] + right[2])
+  if name in _COMPARISONS and left[0] == 'linear' and right[0] == 'linear':
+    if left[1] != right[1]:
+      crossings.add((right[2] - left[2]) / (left[1] - right[1]))
+    return ('step',)
+  #anything else is fine as long as no operand moves continuously with LastBU
+  if _Moves(left) or _Moves(right):
+    return None
+  return ('step',)
+
+def _Moves(shape):
+  return shape[0] == 'linear' and shape[1] != 0
+
+## The scheduler daemon
+#  This class keeps the items of a model in a heap by due time and runs them
+#  through a runner.BackupRunner when they come due.
+class Scheduler(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None, call Schedule() or Run() to start
+  #  @param self The current object being constructed
+  #  @param model A bumodel.Model or sqlmodel.SqliteModel
+  #  @param runner (Optional)The runner.BackupRunner due items are handed to
+  #  @param changeIndex (Optional)A change_index.ChangeIndex used for Modified
+  #  @param recheck (Optional)Seconds between batched rechecks of conditions that
+  #         can't be solved for a time. Failed items are retried after this long.
+  #  @param default (Optional)The condition used by items whose condition is 'Default'
+  #  @param refresh (Optional)Seconds between the times Run() schedules every item
+  #         of the model again, None to only schedule them once
+  def __init__(self, model, runner=None, changeIndex=None, recheck=300, default='True', refresh=3600):
+    self.Model = model
+    self.Runner = runner
+    self.ChangeIndex = changeIndex
+    self.Recheck = recheck
+    self.Default = default
+    self.Refresh = refresh
+    self._Scheduled = None
+    self._Requests = []
+    self._RequestLock = threading.Lock()
+    self._Heap = []
+    self._Version = {}
+    self._Dynamic = set()
+    self._Counter = itertools.count()
+    self._Wake = threading.Event()
+    self._Stopping = False
+    ## @var Errors
+    #  The source of every item that can't be scheduled mapped to the reason, the
+    #  item isn't run until its data is fixed
+    self.Errors = {}
+
+  ## Schedule every item
+  #  @pre  None
+  #  @post The heap holds the next due time of every item of the model
+  #  @param self The current instance
+  #  @param now (Optional)The current time as a timestamp
+  def Schedule(self, now=None):
+    now = time.time() if now is None else now
+    self._Scheduled = now
+    self._Heap = []
+    self._Version = {}
+    self._Dynamic = set()
+    self.Errors = {}
+    for title, itemData in self.Model.IterBackUpData():
+      self._Push(itemData, now)
+    heapq.heapify(self._Heap)
+
+  ## Reschedule one item
+  #  @pre  None
+  #  @post The item is queued to be scheduled by its current data, or dropped if
+  #        it was removed, by the thread running the scheduler
+  #  @param self The current instance
+  #  @param source The source of the item, for instance after it was edited or added
+  #  @param now (Optional)The current time as a timestamp, by default the time the
+  #         request is applied
+  #  @note Safe to call from any thread
+  def Reschedule(self, source, now=None):
+    with self._RequestLock:
+      self._Requests.append((source, now))
+    self._Wake.set()
+
+  ## Apply the queued reschedules
+  #  @param self The current instance
+  def _ApplyRequests(self):
+    with self._RequestLock:
+      requests, self._Requests = self._Requests, []
+    for source, now in requests:
+      self._Reschedule(source, now)
+
+  def _Reschedule(self, source, now=None):
+    now = time.time() if now is None else now
+    itemData = self.Model.GetBackUpItem(source)
+    if itemData is None:
+      self._Version.pop(source, None)
+      self._Dynamic.discard(source)
+      self.Errors.pop(source, None)
+    else:
+      self._Push(itemData, now, heap=True)
+
+  ## The next wake up
+  #  @param self The current instance
+  #  @retval float The earliest due time in the heap, None if nothing is scheduled
+  def NextWakeUp(self):
+    self._ApplyRequests()
+    while self._Heap and self._Heap[0][2] != self._Version.get(self._Heap[0][3]):
+      heapq.heappop(self._Heap) #an entry left behind by a reschedule
+    return self._Heap[0][0] if self._Heap else None
+
+  ## Run the items that are due
+  #  @pre  Schedule() has been called
+  #  @post Due items are backed up and rescheduled
+  #  @param self The current instance
+  #  @param now (Optional)The current time as a timestamp
+  #  @retval list The (title, item data) pairs that were run. An item sharing its
+  #          title with another due item is run by a later batch.
+  def RunPending(self, now=None):
+    now = time.time() if now is None else now
+    ready = []
+    while self.NextWakeUp() is not None and self._Heap[0][0] <= now:
+      ready.append(heapq.heappop(self._Heap)[3])
+
+    due = []
+    recheck = []
+    for source in ready:
+      itemData = self.Model.GetBackUpItem(source)
+      if itemData is None:
+        continue
+      if source in self._Dynamic:
+        recheck.append(itemData)
+      else:
+        due.append(itemData)
+    due.extend(self._Recheck(recheck, now))
+
+    items = []
+    titles = set()
+    for itemData in due:
+      if itemData['title'] in titles: #the runner's results are by title, so it goes first in the next batch
+        self._PushAt(itemData['source'], now)
+        continue
+      titles.add(itemData['title'])
+      items.append((itemData['title'], itemData))
+    if items and self.Runner is not None:
+      result = self.Runner.Run(items)
+      failed = set(result['failed'])
+    else:
+      failed = set()
+    for title, itemData in items:
+      if title in failed or self.Runner is None:
+        self._PushAt(itemData['source'], now + self.Recheck)
+      else:
+        self._Reschedule(itemData['source'], now)
+    return items
+
+  ## Run the scheduler
+  #  @pre  None
+  #  @post The items are backed up as they come due until Stop() is called
+  #  @param self The current instance
+  #  @brief Between runs the thread sleeps until the next due time, so an idle
+  #         scheduler costs nothing however many items it holds. Every refresh
+  #         interval all items are scheduled again from the model.
+  def Run(self):
+    self.Schedule()
+    while not self._Stopping:
+      if self.Refresh is not None and time.time() >= self._Scheduled + self.Refresh:
+        self.Schedule()
+      self.RunPending()
+      wakeUp = self.NextWakeUp()
+      if self.Refresh is not None:
+        wakeUp = self._Scheduled + self.Refresh if wakeUp is None else min(wakeUp, self._Scheduled + self.Refresh)
+      timeout = None if wakeUp is None else max(0, wakeUp - time.time())
+      self._Wake.wait(timeout)
+      self._Wake.clear()
+
+  ## Stop the scheduler
+  #  @param self The current instance
+  def Stop(self):
+    self._Stopping = True
+    self._Wake.set()
+
+  ## Evaluate a batch of dynamic items
+  #  @param self The current instance
+  #  @param items The item data of the items being rechecked
+  #  @param now The current time as a timestamp
+  #  @retval list The item data of the items that are due, the others are
+  #          scheduled for the next recheck
+  def _Recheck(self, items, now):
+    if not items:
+      return []
+    #keyed by source rather than title, since titles don't have to be unique
+    data = dict((itemData['source'], itemData) for itemData in items)
+    if self.ChangeIndex is not None:
+      modified = self.ChangeIndex.IsModified
+    else: #without a change index Modified never holds
+      modified = lambda source: False
+    errors = {}
+    due = set(batch_eval.due_items(data, now, modified, self.Default, errors))
+    self.Errors.update(errors)
+    nextCheck = self._NextRecheck(now)
+    for source in data:
+      if source not in due and source not in errors:
+        self._PushAt(source, nextCheck)
+    return [data[source] for source in due]
+
+  ## Schedule an item by its condition
+  #  @param self The current instance
+  #  @param itemData The item's data
+  #  @param now The current time as a timestamp
+  #  @param heap (Optional)Push onto the heap instead of appending before a heapify
+  def _Push(self, itemData, now, heap=False):
+    source = itemData['source']
+    expression = itemData['condition']
+    if expression == 'Default':
+      expression = self.Default
+    self.Errors.pop(source, None)
+    try:
+      last = None if itemData['last'] == 'never' else float(itemData['last'])
+      condition = Parser.compile_condition(expression)
+      due = NextDue(condition, last, now)
+      dynamic = due is UNSOLVABLE
+      if dynamic: #the earliest it could hold, whichever way Modified goes
+        candidates = [NextDue(condition, last, now, modified=flag) for flag in (True, False)]
+        if UNSOLVABLE in candidates:
+          due = now
+        else:
+          due = min((candidate for candidate in candidates if candidate is not None), default=None)
+    except SyntaxError as error: #a broken condition never comes due
+      self.Errors[source] = 'invalid condition %r: %s' % (expression, error)
+      due, dynamic = None, False
+    except ValueError: #left out like batch_eval.due_items() does, instead of stopping every other item
+      self.Errors[source] = 'invalid last backup time %r' % itemData['last']
+      due, dynamic = None, False
+
+    if dynamic:
+      self._Dynamic.add(source)
+    else:
+      self._Dynamic.discard(source)
+    if due is None:
+      self._Version.pop(source, None)
+      return
+    self._PushAt(source, due, heap)
+
+  def _PushAt(self, source, due, heap=True):
+    version = next(self._Counter)
+    self._Version[source] = version
+    entry = (due, version, version, source)
+    if heap:
+      heapq.heappush(self._Heap, entry)
+    else:
+      self._Heap.append(entry)
+
+  ## The next batched recheck
+  #  @param self The current instance
+  #  @param now The current time as a timestamp
+  #  @retval float The next multiple of the recheck interval, so items rechecked at
+  #          different times still share wake ups
+  def _NextRecheck(self, now):
+    return (now // self.Recheck + 1) * self.Recheck
@@ -0,0 +1,238 @@
+import array
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+import bumodel
+import journal
+
+## @package snapshot
+#  This contains a read only binary snapshot of the catalog
+#
+#  Processes that only read the catalog, like backup workers, would otherwise
+#  parse the xml database or be handed a pickled copy of GetBackUpData(). A
+#  snapshot is written once with WriteSnapshot() and every reader maps it with
+#  Snapshot, which looks items up in place without deserializing the file, so
+#  opening one is near instant and its pages are shared between the processes
+#  through the page cache.
+#
+#  The file is laid out as
+#  - a header: the MAGIC, the item count, the bucket count and the offsets of
+#    the buckets and of the string heap
+#  - a record per item: an (offset, length) pair into the heap for each of FIELDS
+#  - a hash table of buckets, each the index of an item plus one (0 is an empty
+#    bucket), keyed by the crc32 of the item's source and probed linearly
+#  - the string heap holding every distinct string once, utf-8 encoded
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var MAGIC
+#  The first bytes of a snapshot, the last one is the version of the layout
+MAGIC = b'PyBakSn2'
+
+## @var FIELDS
+#  The strings of a record in the order they are stored
+FIELDS = ('title', 'source', 'type', 'last', 'condition', 'description', 'compression', 'group')
+
+_HEADER = struct.Struct('<8sIIII')
+_RECORD = struct.Struct('<%dI' % (2 * len(FIELDS)))
+_BUCKET = struct.Struct('<I')
+
+## @var _NONE
+#  The length stored for a field that is None, like the description of an item
+#  whose description element is empty
+_NONE = 0xFFFFFFFF
+
+## Write a snapshot
+#  @pre  None
+#  @post fileName holds a snapshot of the items, it is replaced atomically
+#  @param fileName The path of the snapshot
+#  @param items An iterable of (title, item data) pairs in the format of
+#         bumodel.Model.IterBackUpData(), for example that of a model or
+#         bumodel.StreamBackUpData()
+#  @retval int The number of items written
+#  @exception ValueError The heap outgrew the 4GB the offsets can address
+#  @brief The records are written as the items come in and the heap is spilled
+#         to a temporary file, so only the distinct strings and a crc per item
+#         are held in memory. The header is filled in last.
+def WriteSnapshot(fileName, items):
+  counts = []
+  def write(file):
+    counts.append(_WriteSnapshot(file, items))
+  journal.ReplaceFile(fileName, write)
+  return counts[0]
+
+def _WriteSnapshot(file, items):
+  strings = {}
+  hashes = array.array('I')
+  heapSize = 0
+  file.seek(_HEADER.size)
+  with tempfile.TemporaryFile() as heap:
+    for title, itemData in items:
+      fields = []
+      for field in FIELDS:
+        value = title if field == 'title' else itemData[field]
+        if value is None:
+          fields += (0, _NONE)
+          continue
+        encoded = value.encode('utf-8')
+        offset = strings.get(encoded)
+        if offset is None:
+          offset = strings[encoded] = heapSize
+          heap.write(encoded)
+          heapSize += len(encoded)
+        fields += (offset, len(encoded))
+      if heapSize > _NONE:
+        raise ValueError("the catalog is too large for a snapshot")
+      file.write(_RECORD.pack(*fields))
+      hashes.append(zlib.crc32(itemData['source'].encode('utf-8')))
+    strings = None
+
+    count = len(hashes)
+    bucketCount = 1
+    while bucketCount < 2 * count: #at most half full keeps the probes short
+      bucketCount *= 2
+    buckets = array.array('I', bytes(bucketCount * _BUCKET.size))
+    for index, hashed in enumerate(hashes):
+      bucket = hashed & (bucketCount - 1)
+      while buckets[bucket]:
+        bucket = (bucket + 1) & (bucketCount - 1)
+      buckets[bucket] = index + 1
+    if sys.byteorder != 'little':
+      buckets.byteswap()
+
+    bucketsOffset = _HEADER.size + count * _RECORD.size
+    heapOffset = bucketsOffset + bucketCount * _BUCKET.size
+    buckets.tofile(file)
+    heap.seek(0)
+    shutil.copyfileobj(heap, file)
+  file.seek(0)
+  file.write(_HEADER.pack(MAGIC, count, bucketCount, bucketsOffset, heapOffset))
+  file.seek(0, os.SEEK_END)
+  return count
+
+## A mapped snapshot
+#  This class reads the items of a snapshot written by WriteSnapshot(). It has
+#  the read only part of the api of bumodel.Model, and items can also be read by
+#  their index in the catalog's order.
+class Snapshot(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The snapshot is mapped, nothing else is read
+  #  @param self The current object being constructed
+  #  @param fileName The path of the snapshot
+  #  @exception ValueError The file isn't a snapshot
+  def __init__(self, fileName):
+    self.FileName = fileName
+    with open(fileName, 'rb') as file:
+      self._Map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(self._Map) < _HEADER.size:
+      self._Map.close()
+      raise ValueError("%s is not a catalog snapshot" % fileName)
+    magic, self._Count, self._Buckets, self._BucketsOffset, self._Heap = _HEADER.unpack_from(self._Map)
+    if magic != MAGIC:
+      self._Map.close()
+      raise ValueError("%s is not a catalog snapshot" % fileName)
+
+  ## Unmap the snapshot
+  #  @param self The current instance
+  def Close(self):
+    self._Map.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exception):
+    self.Close()
+
+  def __len__(self):
+    return self._Count
+
+  ## Read an item
+  #  @param self The current instance
+  #  @param index The index of the item
+  #  @retval tuple (title, item data) like bumodel.Model.IterBackUpData() yields
+  #  @exception IndexError There is no such item
+  def __getitem__(self, index):
+    if index < 0:
+      index += self._Count
+    if not 0 <= index < self._Count:
+      raise IndexError("snapshot index out of range")
+    fields = _RECORD.unpack_from(self._Map, _HEADER.size + index * _RECORD.size)
+    itemData = {}
+    for number, field in enumerate(FIELDS):
+      itemData[field] = self._String(fields[2 * number], fields[2 * number + 1])
+    return itemData.pop('title'), itemData
+
+  def __iter__(self):
+    for index in range(self._Count):
+      yield self[index]
+
+  ## Find an item by its source
+  #  @param self The current instance
+  #  @param source The source of the item
+  #  @retval int The index of the item or None if the source isn't in the snapshot
+  def Find(self, source):
+    if not self._Count:
+      return None
+    encoded = source.encode('utf-8')
+    mask = self._Buckets - 1
+    sourceField = 2 * FIELDS.index('source')
+    bucket = zlib.crc32(encoded) & mask
+    while True:
+      entry = _BUCKET.unpack_from(self._Map, self._BucketsOffset + bucket * _BUCKET.size)[0]
+      if not entry:
+        return None
+      offset, length = struct.unpack_from('<II', self._Map,
+                                          _HEADER.size + (entry - 1) * _RECORD.size + sourceField * 4)
+      if self._Map[self._Heap + offset:self._Heap + offset + length] == encoded:
+        return entry - 1
+      bucket = (bucket + 1) & mask
+
+  ## Get a single backup item
+  #  @param self The current instance
+  #  @param source The source of the item
+  #  @retval dictionary The item's data plus its 'title', like
+  #          bumodel.Model.GetBackUpItem(), or None if the source isn't in the snapshot
+  def GetBackUpItem(self, source):
+    index = self.Find(source)
+    if index is None:
+      return None
+    title, itemData = self[index]
+    itemData['title'] = title
+    return itemData
+
+  ## Iterate over the items
+  #  @param self The current instance
+  #  @retval generator Yields a (title, item data) pair for every item
+  def IterBackUpData(self):
+    return iter(self)
+
+  ## Get every item
+  #  @param self The current instance
+  #  @retval dictionary The items indexed by title, see bumodel.Model.GetBackUpData()
+  def GetBackUpData(self):
+    return dict(self)
+
+  def _String(self, offset, length):
+    if length == _NONE:
+      return None
+    start = self._Heap + offset
+    return self._Map[start:start + length].decode('utf-8')
+
+# python snapshot.py PyBakUP.xml PyBakUP.snapshot
+if __name__ == "__main__":
+  if len(sys.argv) != 3:
+    print("usage: snapshot.py catalog snapshot")
+    sys.exit(2)
+  if os.path.splitext(sys.argv[1])[1].lower() in bumodel.SQLITE_EXTENSIONS:
+    model = bumodel.OpenModel(sys.argv[1])
+    count = WriteSnapshot(sys.argv[2], model.IterBackUpData())
+    model.Close()
+  else: #streamed so exporting a large catalog doesn't build its tree
+    count = WriteSnapshot(sys.argv[2], bumodel.StreamBackUpData(sys.argv[1]))
+  print("wrote", count, "items")
@@ -0,0 +1,311 @@
+import sqlite3
+import sys
+import bumodel
+
+## @package sqlmodel
+#  This contains an SQLite backed version of the data model
+#
+#  SqliteModel has the same api as bumodel.Model but keeps the backup items in
+#  an SQLite database instead of an xml file. The database runs in WAL mode so the
+#  configuration tool and the backup runner can use it at the same time, and the
+#  columns the runner queries by are indexed. bumodel.OpenModel() picks the
+#  backend from the file name.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var _SCHEMA
+#  The statements that create the database. They are safe to run on an existing one.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+  id          INTEGER PRIMARY KEY,
+  src         TEXT NOT NULL UNIQUE,
+  type        TEXT NOT NULL,
+  title       TEXT NOT NULL,
+  description TEXT NOT NULL DEFAULT '',
+  condition   TEXT NOT NULL DEFAULT 'Default',
+  last        TEXT NOT NULL DEFAULT 'never',
+  compression TEXT NOT NULL DEFAULT 'none',
+  item_group  TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS items_title ON items (title);
+CREATE INDEX IF NOT EXISTS items_condition ON items (condition);
+CREATE INDEX IF NOT EXISTS items_last ON items (last);
+'''
+
+## @var _COLUMNS
+#  The item attributes ModifyItem can change, mapped to their columns
+_COLUMNS = {'last': 'last',
+            'condition': 'condition',
+            'title': 'title',
+            'description': 'description',
+            'compression': 'compression',
+            'group': 'item_group'}
+
+## The SQLite data model.
+#  This class has the same interface as bumodel.Model.
+#
+#  Like the journal of the xml model, every change made outside a Batch() is
+#  committed as it is made, so the write lock is only held for one statement and
+#  a long backup run doesn't block other writers. A Batch() commits once when it
+#  ends. Readers are never blocked thanks to WAL mode, a second writer waits up
+#  to TIMEOUT seconds for the lock.
+class SqliteModel(object):
+
+  ## @var TIMEOUT
+  #  Seconds a writer waits for another process to commit before giving up
+  TIMEOUT = 30
+
+  ## @var _Depth
+  #  How many Batch() blocks are open
+  _Depth = 0
+
+  ## The constructor.
+  #  @pre  None
+  #  @post The database exists, is in WAL mode and has the current schema
+  #  @param self The current instance pointer
+  #  @param fileName (Optional)The path of the database. Defaults to PyBakUP.db
+  def __init__(self, fileName='PyBakUP.db'):
+    self._FileName = fileName
+    #the runner updates items from its worker threads, one at a time
+    self._Connection = sqlite3.connect(fileName, timeout=self.TIMEOUT, check_same_thread=False)
+    self._Connection.execute('PRAGMA journal_mode=WAL')
+    self._Connection.execute('PRAGMA synchronous=NORMAL')
+    self._Connection.executescript(_SCHEMA)
+    columns = [row[1] for row in self._Connection.execute('PRAGMA table_info(items)')]
+    if 'compression' not in columns: #databases created before the column existed
+      self._Connection.execute("ALTER TABLE items ADD COLUMN compression TEXT NOT NULL DEFAULT 'none'")
+      self._Connection.commit()
+    if 'item_group' not in columns: #group is a keyword in SQL, hence the prefix
+      self._Connection.execute("ALTER TABLE items ADD COLUMN item_group TEXT NOT NULL DEFAULT 'default'")
+      self._Connection.commit()
+
+  ## Save the document.
+  #  @pre  None
+  #  @post Every change made since the last save is committed
+  #  @param self The current instance pointer
+  def Save(self):
+    self._Connection.commit()
+
+  ## Group changes into one transaction
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval bumodel.Transaction A context manager. The changes made in its body
+  #          are committed once when it ends, or rolled back if it raises. Nested
+  #          blocks only commit when the outermost one ends.
+  def Batch(self):
+    return bumodel.Transaction(self)
+
+  #every block is a savepoint, so a failed inner block only undoes its own changes
+  def _BeginBatch(self):
+    self._Depth += 1
+    self._Connection.execute('SAVEPOINT batch%d' % self._Depth)
+    return self._Depth
+
+  def _EndBatch(self, mark):
+    self._Connection.execute('RELEASE batch%d' % mark)
+    self._Depth -= 1
+    self._Commit()
+
+  def _AbortBatch(self, mark):
+    self._Connection.execute('ROLLBACK TO batch%d' % mark)
+    self._Connection.execute('RELEASE batch%d' % mark)
+    self._Depth -= 1
+
+  #a change outside of a Batch() is committed right away
+  def _Commit(self):
+    if not self._Depth:
+      self.Save()
+
+  ## Close the database
+  #  @pre  None
+  #  @post Unsaved changes are discarded and the connection is closed
+  #  @param self The current instance pointer
+  def Close(self):
+    self._Connection.close()
+
+  ## Add a new backup item to our database.
+  #  @pre  We must give either a file or folder.
+  #  @post The new backup item is added to the database
+  #  @param self The current instance pointer
+  #  @param source A file or folder on the disk to be inserted into the backup list
+  #  @param itemType Should be either file or folder
+  #  @param title The name that will be displayed to the user
+  #  @param description (Optional)An optional description of the backup item. Defaults to an empty string
+  #  @retval bool True if element was inserted false otherwise
+  def AddBackUpItem(self, source, itemType, title, description=''):
+    if itemType != 'folder' and itemType != 'file':
+      return False
+    cursor = self._Connection.execute(
+      'INSERT OR IGNORE INTO items (src, type, title, description) VALUES (?, ?, ?, ?)',
+      (source, itemType, title, description or ''))
+    self._Commit()
+    return cursor.rowcount == 1
+
+  ## Add many backup items
+  #  @pre  None
+  #  @post The valid items are added and committed as one Batch()
+  #  @param self The current instance pointer
+  #  @param items An iterable of (source, itemType, title[, description]) tuples
+  #  @retval list Whether each item was inserted, see bumodel.Model.AddBackUpItems()
+  def AddBackUpItems(self, items):
+    with self.Batch():
+      return [self.AddBackUpItem(*item) for item in items]
+
+  ## Get a detailed list of elements in the database.
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval dictionary The items indexed by title, see bumodel.Model.GetBackUpData()
+  def GetBackUpData(self):
+    return dict(self.IterBackUpData())
+
+  ## Iterate over the elements in the database.
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval generator Yields a (title, item data) pair for every backup item
+  def IterBackUpData(self):
+    cursor = self._Connection.execute(
+      'SELECT title, src, type, last, condition, description, compression, item_group FROM items ORDER BY id')
+    for row in cursor:
+      yield row[0], self._ItemData(row[1:])
+
+  ## Iterate over the saved elements in the database.
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @retval generator Yields a (title, item data) pair for every backup item
+  #  @brief Every query already reads what other processes committed, so this is
+  #         IterBackUpData(), see bumodel.Model.IterSavedBackUpData().
+  def IterSavedBackUpData(self):
+    return self.IterBackUpData()
+
+  ## Get a single backup item
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @param source The source of the item
+  #  @retval dictionary The item's data plus its 'title', or None if the source isn't backed up
+  def GetBackUpItem(self, source):
+    row = self._Connection.execute(
+      'SELECT src, type, last, condition, description, compression, item_group, title FROM items WHERE src = ?',
+      (source,)).fetchone()
+    if row is None:
+      return None
+    itemData = self._ItemData(row)
+    itemData['title'] = row[7]
+    return itemData
+
+  ## Get the source of a backup item by its title
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance pointer
+  #  @param title The title of the item
+  #  @retval string The source of the item or None, the newest item wins when titles are shared
+  def GetSourceByTitle(self, title):
+    row = self._Connection.execute(
+      'SELECT src FROM items WHERE title = ? ORDER BY id DESC LIMIT 1', (title,)).fetchone()
+    return row[0] if row else None
+
+  ## Remove a backup item from the database.
+  #  @pre  None
+  #  @post The item with the given source is no longer in the database
+  #  @param self The current instance pointer
+  #  @param source The source that is being removed from the database
+  def RemoveBackUpItem(self, source):
+    self._Connection.execute('DELETE FROM items WHERE src = ?', (source,))
+    self._Commit()
+
+  ## Remove many backup items
+  #  @pre  None
+  #  @post None of the sources are in the database, committed as one Batch()
+  #  @param self The current instance pointer
+  #  @param sources An iterable of the sources being removed
+  def RemoveBackUpItems(self, sources):
+    with self.Batch():
+      self._Connection.executemany('DELETE FROM items WHERE src = ?', ((source,) for source in sources))
+
+  ## Modify many backup items
+  #  @pre  The new values should be valid values.
+  #  @post Every change is applied and committed as one Batch()
+  #  @param self The current instance pointer
+  #  @param changes An iterable of (source, attribute, attributeValue) tuples
+  #  @brief The changes are grouped by column, keeping their order within a
+  #         column, and each column is updated with a single executemany.
+  def ModifyItems(self, changes):
+    columns = {}
+    for source, attribute, attributeValue in changes:
+      column = _COLUMNS.get(attribute)
+      if column is not None:
+        columns.setdefault(column, []).append((attributeValue, source))
+    with self.Batch():
+      for column, rows in columns.items():
+        self._Connection.executemany('UPDATE items SET %s = ? WHERE src = ?' % column, rows)
+
+  ## Modify an attribute of a backup item
+  #  @pre  The new attributeValue should be a valid value.
+  #  @post The item of the given source will have its selected attribute changed,
+  #        committed right away unless a Batch() is open
+  #  @param self The current instance pointer
+  #  @param source The source of the item that is going to be modified
+  #  @param attribute The name of the attribute that is going to be modified
+  #  @param attributeValue The new value of the attribute being modified
+  def ModifyItem(self, source, attribute, attributeValue):
+    column = _COLUMNS.get(attribute)
+    if column is None:
+      return
+    self._Connection.execute('UPDATE items SET %s = ? WHERE src = ?' % column,
+                             (attributeValue, source))
+    self._Commit()
+
+  ## Build item data from a row
+  #  @param row The src, type, last, condition, description, compression and item_group columns
+  #  @retval dictionary The item data in the format of bumodel.Model.GetBackUpData()
+  @staticmethod
+  def _ItemData(row):
+    return {'source': row[0],
+            'type': row[1],
+            'last': row[2],
+            'condition': row[3],
+            'description': row[4],
+            'compression': row[5],
+            'group': row[6]}
+
+## Migrate an xml database
+#  @pre  The xml database exists
+#  @post Every item of the xml database whose source dbFileName doesn't hold yet
+#        is copied into the SQLite database
+#  @param xmlFileName The path of the xml database, its journal is applied too
+#  @param dbFileName The path of the SQLite database, created if needed
+#  @retval tuple (items copied, items skipped because dbFileName already held their source)
+#  @brief The xml file is streamed so the migration runs in constant memory and
+#         the copy is committed as a single transaction.
+def MigrateXml(xmlFileName, dbFileName):
+  model = SqliteModel(dbFileName)
+  copied = skipped = 0
+  try:
+    for title, itemData in bumodel.StreamBackUpData(xmlFileName):
+      cursor = model._Connection.execute(
+        'INSERT OR IGNORE INTO items (src, type, title, description, condition, last, compression, item_group) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (itemData['source'], itemData['type'], title, itemData['description'] or '',
+         itemData['condition'], itemData['last'], itemData['compression'], itemData['group']))
+      if cursor.rowcount > 0:
+        copied += 1
+      else: #ignored as a duplicate
+        skipped += 1
+    model.Save()
+  finally:
+    model.Close()
+  return copied, skipped
+
+# python sqlmodel.py PyBakUP.xml PyBakUP.db
+if __name__ == "__main__":
+  if len(sys.argv) != 3:
+    print("usage: sqlmodel.py source.xml destination.db")
+    sys.exit(2)
+  copied, skipped = MigrateXml(sys.argv[1], sys.argv[2])
+  print("migrated", copied, "items")
+  if skipped:
+    print("skipped", skipped, "items already in", sys.argv[2])
@@ -0,0 +1,107 @@
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import backup_obj
+
+## @package test_backup_obj
+#  Tests of the backup objects and of their columnar table
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var WHEN
+#  A last backup time, whole seconds so it survives a timestamp
+WHEN = datetime.datetime(2026, 10, 18, 9, 30, 5)
+
+def _Never(obj):
+  return False
+
+def _Named(obj):
+  return obj.Name.startswith('keep')
+
+class BackupObjectTest(unittest.TestCase):
+
+  def test_fields(self):
+    obj = backup_obj.BackupObject(3, Name='docs', Location='/home/docs', Group='nightly', LastBackup=None)
+    self.assertEqual((obj.ID, obj.Name, obj.Description, obj.Location, obj.Group, obj.LastBackup),
+                     (3, 'docs', '', '/home/docs', 'nightly', None))
+    self.assertTrue(obj.Backup)
+    obj.Backup = _Never
+    obj.Description = 'my documents'
+    self.assertFalse(obj.Backup)
+    self.assertEqual(obj.Description, 'my documents')
+    self.assertRaises(AttributeError, setattr, obj, 'ID', 4)
+    self.assertRaises(AttributeError, setattr, obj, 'Other', 1) #slots, no instance dictionary
+    self.assertRaises(TypeError, backup_obj.BackupObject, 1, Other='value')
+
+class BackupObjectTableTest(unittest.TestCase):
+
+  def setUp(self):
+    self.Table = backup_obj.BackupObjectTable()
+    for number in range(10):
+      self.Table.Append(number * 2, Name='item %d' % number, Location='/data/dir%d/file%d' % (number % 3, number),
+                        Group='nightly' if number % 2 else 'default', LastBackup=WHEN if number % 4 else None)
+
+  def test_rows(self):
+    self.assertEqual(len(self.Table), 10)
+    row = self.Table[3]
+    self.assertEqual((row.ID, row.Name, row.Location, row.Group, row.LastBackup, row.Description),
+                     (6, 'item 3', '/data/dir0/file3', 'nightly', WHEN, ''))
+    self.assertIsNone(self.Table[0].LastBackup)
+    self.assertEqual(self.Table[-1].ID, 18)
+    self.assertRaises(IndexError, self.Table.__getitem__, 10)
+    self.assertEqual([row.ID for row in self.Table], list(range(0, 20, 2)))
+    self.assertRaises(TypeError, self.Table.Append, 30, Other='value')
+
+  def test_changes(self):
+    row = self.Table[4]
+    text = 'ß' * 300 + '\udcff' #a multi byte length and a surrogate escaped byte
+    row.Name = text
+    row.Description = 'described'
+    row.Location = 'C:\\backup\\file'
+    row.Group = 'weekly'
+    row.LastBackup = 1700000000.5
+    row.Backup = _Named
+    self.assertEqual((row.Name, row.Description, row.Location, row.Group),
+                     (text, 'described', 'C:\\backup\\file', 'weekly'))
+    self.assertEqual(row.LastBackup, datetime.datetime.fromtimestamp(1700000000.5))
+    self.assertFalse(row.Backup)
+    row.Name = 'keep this'
+    self.assertTrue(row.Backup)
+    self.assertEqual(self.Table[5].Name, 'item 5') #the neighbours are untouched
+    self.assertEqual(self.Table[4].Name, 'keep this') #a new view of the row sees the change
+
+  def test_detach(self):
+    self.Table[2].Backup = _Never
+    detached = self.Table[2].Detach()
+    self.assertIsInstance(detached, backup_obj.BackupObject)
+    for field in ('ID', 'Name', 'Description', 'Location', 'Group', 'LastBackup', 'Backup'):
+      self.assertEqual(getattr(detached, field), getattr(self.Table[2], field), field)
+    copy = backup_obj.BackupObjectTable().AppendObject(detached)
+    self.assertEqual((copy.ID, copy.Location, copy.Backup), (4, '/data/dir2/file2', False))
+
+  def test_find(self):
+    self.assertEqual(self.Table.Find(8).Name, 'item 4')
+    self.assertIsNone(self.Table.Find(7))
+    self.assertIsNone(self.Table.Find(100))
+    self.Table.Append(5, Name='out of order')
+    self.Table.Append(-1, Name='first')
+    for id, name in ((5, 'out of order'), (-1, 'first'), (18, 'item 9'), (0, 'item 0')):
+      self.assertEqual(self.Table.Find(id).Name, name)
+    self.assertIsNone(self.Table.Find(7))
+    self.assertIsNone(self.Table.Find(100))
+
+  def test_columns(self):
+    self.assertEqual(self.Table.GroupRows('nightly'), [1, 3, 5, 7, 9])
+    self.assertEqual(self.Table.GroupRows('missing'), [])
+    timestamps = self.Table.LastBackups()
+    self.assertEqual(timestamps[1], WHEN.timestamp())
+    self.assertNotEqual(timestamps[0], timestamps[0]) #NaN for never
+    before = self.Table.MemoryUsage()
+    self.Table.Append(20, Name='x' * 1000)
+    self.assertGreater(self.Table.MemoryUsage(), before + 1000)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import change_index
+
+## @package test_change_index
+#  Tests of the change index answering the Modified keyword
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var OLD
+#  An mtime well before any recording, in nanoseconds
+OLD = 10**18
+
+class ChangeIndexTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.FileName = os.path.join(self._Directory.name, 'file')
+    self._Write(b'contents', OLD)
+    self.Index = change_index.ChangeIndex(os.path.join(self._Directory.name, 'changes.db'))
+    self.Hashed = []
+    self._HashFile = change_index.HashFile
+    change_index.HashFile = lambda fileName: self.Hashed.append(fileName) or self._HashFile(fileName)
+
+  def tearDown(self):
+    change_index.HashFile = self._HashFile
+    self.Index.Close()
+    self._Directory.cleanup()
+
+  def _Write(self, data, mtime=None):
+    with open(self.FileName, 'wb') as file:
+      file.write(data)
+    if mtime is not None:
+      os.utime(self.FileName, ns=(mtime, mtime))
+
+  def test_never_recorded(self):
+    self.assertTrue(self.Index.IsModified(self.FileName))
+
+  def test_old_files_are_recorded_by_stat(self):
+    self.Index.Record(self.FileName)
+    self.assertEqual(self.Hashed, [])
+    self.assertFalse(self.Index.IsModified(self.FileName))
+    self._Write(b'longer contents', OLD)
+    self.assertTrue(self.Index.IsModified(self.FileName))
+    self.assertEqual(self.Hashed, [])
+
+  def test_unhashed_ambiguous_file_is_modified(self):
+    self.Index.Record(self.FileName)
+    os.utime(self.FileName, ns=(OLD + 10**9, OLD + 10**9)) #touched, the contents are the same
+    self.assertTrue(self.Index.IsModified(self.FileName))
+
+  def test_reset_mtime(self):
+    self.Index.Record(self.FileName)
+    os.chmod(self.FileName, 0o600) #the ctime moves on, as a write with the mtime restored would leave it
+    self.assertTrue(self.Index.IsModified(self.FileName))
+    self.Index.Record(self.FileName) #the mtime can't be trusted for this file any more
+    self.assertEqual(self.Hashed, [self.FileName])
+    os.chmod(self.FileName, 0o644)
+    self.assertFalse(self.Index.IsModified(self.FileName))
+    self._Write(b'CONTENTS', OLD)
+    self.assertTrue(self.Index.IsModified(self.FileName))
+
+  def test_racy_files_are_hashed(self):
+    self._Write(b'contents') #written just now
+    self.Index.Record(self.FileName)
+    self.assertEqual(self.Hashed, [self.FileName])
+    self.assertFalse(self.Index.IsModified(self.FileName))
+    with open(self.FileName, 'r+b') as file: #same size, within the same tick
+      file.write(b'C')
+    self.assertTrue(self.Index.IsModified(self.FileName))
+
+  def test_without_hashes(self):
+    index = change_index.ChangeIndex(os.path.join(self._Directory.name, 'other.db'), useHash=False)
+    self._Write(b'contents')
+    index.Record(self.FileName)
+    self.assertEqual(self.Hashed, [])
+    self.assertTrue(index.IsModified(self.FileName)) #racy and nothing to settle it
+    index.Close()
+
+  def test_folder(self):
+    folder = os.path.join(self._Directory.name, 'folder')
+    os.makedirs(os.path.join(folder, 'sub'))
+    with open(os.path.join(folder, 'sub', 'a'), 'w') as file:
+      file.write('a')
+    self.Index.Record(folder)
+    self.assertFalse(self.Index.IsModified(folder))
+    with open(os.path.join(folder, 'sub', 'b'), 'w') as file:
+      file.write('b')
+    self.assertTrue(self.Index.IsModified(folder))
+    self.Index.Record(folder)
+    self.assertFalse(self.Index.IsModified(folder))
+    self.Index.Forget(folder)
+    self.assertTrue(self.Index.IsModified(folder))
+    self.assertEqual(self.Hashed, [])
+
+  def test_old_index(self):
+    fileName = os.path.join(self._Directory.name, 'old.db')
+    connection = sqlite3.connect(fileName)
+    connection.execute('CREATE TABLE files (item TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, '
+                       'inode INTEGER NOT NULL, recorded INTEGER NOT NULL, hash BLOB)')
+    info = os.stat(self.FileName)
+    connection.execute('INSERT INTO files VALUES (?, ?, ?, ?, ?, NULL)',
+                       (self.FileName, info.st_size, info.st_mtime_ns, info.st_ino, OLD + 10**12))
+    connection.commit()
+    connection.close()
+    index = change_index.ChangeIndex(fileName)
+    self.assertFalse(index.IsModified(self.FileName))
+    index.Close()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,183 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import checkpoint
+import journal
+import runner
+
+## @package test_checkpoint
+#  Tests of the checkpoints that let an interrupted backup run resume
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class CheckpointTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.FileName = os.path.join(self._Directory.name, checkpoint.DIRECTORY, 'item')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def test_finished_files(self):
+    saved = checkpoint.Checkpoint(self.FileName, ['/source', 'folder', 'full', 'none'])
+    saved.Complete('a', 10, 100, 'digest')
+    saved.Complete('b', 20, 200)
+    saved.Save()
+    loaded = checkpoint.Checkpoint(self.FileName, ['/source', 'folder', 'full', 'none'])
+    self.assertEqual(loaded.Done('a', 10, 100), (True, 'digest'))
+    self.assertEqual(loaded.Done('b', 20, 200), (True, None))
+    self.assertEqual(loaded.Done('a', 11, 100), (False, None))
+    self.assertEqual(loaded.Done('a', 10, 101), (False, None))
+    self.assertEqual(loaded.Done('c', 10, 100), (False, None))
+    loaded.Remove()
+    self.assertEqual(checkpoint.Checkpoint(self.FileName, ['/source', 'folder', 'full', 'none']).Finished, {})
+
+  def test_other_key_is_discarded(self):
+    saved = checkpoint.Checkpoint(self.FileName, ['/source', 'folder', 'full', 'none'])
+    saved.Complete('a', 10, 100)
+    saved.Save()
+    self.assertEqual(checkpoint.Checkpoint(self.FileName, ['/source', 'folder', 'full', 'gzip']).Finished, {})
+    self.assertFalse(os.path.exists(self.FileName))
+
+  def test_progress(self):
+    saved = checkpoint.Checkpoint(self.FileName, 'key')
+    chunks = [('00', 5), ('11', 7)]
+    saved.Progress('chunked', 100, 1, 12, chunks)
+    saved.Progress('copied', 200, 2, 64)
+    saved.Save()
+    chunks.append(('22', 3)) #only the new chunk is written by the next checkpoint
+    saved.Progress('chunked', 100, 1, 15, chunks)
+    saved.Save()
+    loaded = checkpoint.Checkpoint(self.FileName, 'key')
+    self.assertEqual(loaded.Partial('chunked', 100, 1), (15, [('00', 5), ('11', 7), ('22', 3)]))
+    self.assertEqual(loaded.Partial('copied', 200, 2), (64, None))
+    self.assertIsNone(loaded.Partial('copied', 200, 3))
+    loaded.Complete('copied', 200, 2)
+    loaded.Save()
+    loaded = checkpoint.Checkpoint(self.FileName, 'key')
+    self.assertIsNone(loaded.Partial('copied', 200, 2))
+    self.assertEqual(loaded.Done('copied', 200, 2), (True, None))
+    self.assertEqual(loaded.Partial('chunked', 100, 1), (15, [('00', 5), ('11', 7), ('22', 3)]))
+
+  def test_torn_checkpoint(self):
+    saved = checkpoint.Checkpoint(self.FileName, 'key')
+    saved.Complete('a', 10, 100)
+    saved.Save()
+    with open(self.FileName, 'ab') as file:
+      file.write(b'12345678 ["f","b",') #killed while checkpointing
+    loaded = checkpoint.Checkpoint(self.FileName, 'key')
+    self.assertEqual(sorted(loaded.Finished), ['a'])
+
+  def test_malformed_checkpoint_is_discarded(self):
+    for records in ([['f', 'a']], [['p', 'a', 1, 2]], [['f', 'a', 10, 100, None], 'x'], [{'f': 'a'}]):
+      log = journal.Journal(self.FileName)
+      os.makedirs(os.path.dirname(self.FileName), exist_ok=True)
+      log.Reset('key')
+      log.Append(records)
+      loaded = checkpoint.Checkpoint(self.FileName, 'key')
+      self.assertEqual((loaded.Finished, loaded.Partial('a', 1, 2)), ({}, None), records)
+      self.assertFalse(os.path.exists(self.FileName))
+      loaded.Complete('b', 1, 2)
+      loaded.Save()
+      self.assertEqual(checkpoint.Checkpoint(self.FileName, 'key').Done('b', 1, 2), (True, None))
+      os.remove(self.FileName)
+    with open(self.FileName, 'wb') as file: #a header that isn't one
+      file.write(journal.Journal(self.FileName)._Encode(['key']))
+    self.assertEqual(checkpoint.Checkpoint(self.FileName, 'key').Finished, {})
+
+  def test_failed_save_keeps_the_files(self):
+    saved = checkpoint.Checkpoint(self.FileName, 'key', flush=_Fail)
+    saved.Complete('a', 10, 100)
+    self.assertRaises(OSError, saved.Save)
+    saved.Flush = None
+    saved.Save()
+    self.assertEqual(checkpoint.Checkpoint(self.FileName, 'key').Done('a', 10, 100), (True, None))
+
+  def test_verified_offset(self):
+    source = os.path.join(self._Directory.name, 'source')
+    partial = source + checkpoint.PARTIAL_SUFFIX
+    data = bytes(range(256)) * 1000
+    with open(source, 'wb') as file:
+      file.write(data)
+    with open(partial, 'wb') as file:
+      file.write(data[:100000] + b'torn')
+    self.assertEqual(checkpoint.VerifiedOffset(source, partial, 100000), 100000)
+    self.assertEqual(os.path.getsize(partial), 100000)
+    self.assertEqual(checkpoint.VerifiedOffset(source, partial, 200000), 0) #shorter than the checkpoint
+    with open(partial, 'wb') as file:
+      file.write(b'x' * 100000)
+    self.assertEqual(checkpoint.VerifiedOffset(source, partial, 100000), 0)
+    self.assertEqual(checkpoint.VerifiedOffset(source, partial + 'missing', 10), 0)
+
+class ResumeTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    self.Destination = os.path.join(self._Directory.name, 'backups')
+    for number in range(5):
+      path = os.path.join(self.Source, 'file%d' % number)
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(path, 'wb') as file:
+        file.write(b'%d' % number * 1000)
+    self.Model = bumodel.Model(os.path.join(self._Directory.name, 'PyBakUP.xml'))
+    self.Model.AddBackUpItem(self.Source, 'folder', 'item')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Run(self):
+    return runner.BackupRunner(self.Model, self.Destination, workers=2).Run(
+      [('item', self.Model.GetBackUpItem(self.Source))])
+
+  def test_resume(self):
+    blocked = os.path.join(self.Destination, 'item', 'file3')
+    os.makedirs(blocked) #the copy of file3 fails, the item with it
+    result = self._Run()
+    self.assertEqual(list(result['failed']), ['item'])
+    self.assertEqual(result['files'], 4)
+    self.assertEqual(self.Model.GetBackUpItem(self.Source)['last'], 'never')
+    fileName = os.path.join(self.Destination, checkpoint.DIRECTORY, 'item')
+    self.assertTrue(os.path.exists(fileName))
+
+    os.rmdir(blocked)
+    with open(os.path.join(self.Source, 'file0'), 'ab') as file:
+      file.write(b'changed since') #copied again
+    result = self._Run()
+    self.assertEqual(result['succeeded'], ['item'])
+    self.assertEqual(result['files'], 2)
+    self.assertEqual(result['resumed'], {'files': 3, 'bytes': 3000})
+    self.assertNotEqual(self.Model.GetBackUpItem(self.Source)['last'], 'never')
+    self.assertFalse(os.path.exists(fileName))
+    for number in range(5):
+      with open(os.path.join(self.Source, 'file%d' % number), 'rb') as source, \
+           open(os.path.join(self.Destination, 'item', 'file%d' % number), 'rb') as copy:
+        self.assertEqual(source.read(), copy.read())
+
+  def test_malformed_records_are_copied_again(self):
+    items = [('item', self.Model.GetBackUpItem(self.Source))]
+    backups = runner.BackupRunner(self.Model, self.Destination)
+    log = journal.Journal(os.path.join(self.Destination, checkpoint.DIRECTORY, 'item'))
+    os.makedirs(os.path.dirname(log.FileName))
+    log.Reset(backups._CheckpointKey(items[0][1]))
+    info = os.stat(os.path.join(self.Source, 'file1'))
+    os.makedirs(os.path.join(self.Destination, 'item'))
+    with open(os.path.join(self.Destination, 'item', 'file1'), 'wb') as file: #the copy the record claims
+      file.write(b'torn')
+    log.Append([['f', 'file1', info.st_size, info.st_mtime_ns, 5]]) #a manifest digest can't be a number
+    result = backups.Run(items)
+    self.assertEqual(result['succeeded'], ['item'])
+    self.assertEqual((result['files'], result['resumed']['files']), (5, 0))
+    with open(os.path.join(self.Destination, 'item', 'file1'), 'rb') as file:
+      self.assertEqual(file.read(), b'1' * 1000)
+
+def _Fail():
+  raise OSError('the store is unavailable')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,166 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import chunkstore
+
+## @package test_chunkstore
+#  Tests of the content addressed chunk store
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+def _Data(seed, size):
+  return random.Random(seed).getrandbits(8 * size).to_bytes(size, 'little')
+
+def _Chunks(data, useNumpy=True):
+  chunks = []
+  start = 0
+  for cut in chunkstore.Boundaries(data, True, useNumpy):
+    chunks.append(data[start:cut])
+    start = cut
+  return chunks
+
+class ChunkerTest(unittest.TestCase):
+
+  def test_numpy_matches_python(self):
+    data = _Data(5, 3 * chunkstore.MAX_SIZE + 12345)
+    chunks = _Chunks(data, useNumpy=False)
+    self.assertEqual(_Chunks(data, useNumpy=True), chunks)
+    self.assertEqual(b''.join(chunks), data)
+    for chunk in chunks[:-1]:
+      self.assertTrue(chunkstore.MIN_SIZE <= len(chunk) <= chunkstore.MAX_SIZE)
+
+  def test_insertion_keeps_later_chunks(self):
+    data = _Data(6, 8 * chunkstore.MAX_SIZE)
+    before = _Chunks(data)
+    after = _Chunks(data[:1000] + b'inserted' + data[1000:])
+    self.assertGreaterEqual(len(set(before) & set(after)), len(before) - 2)
+
+  def test_chunk_file(self):
+    data = _Data(11, 2 * chunkstore.READ_SIZE + 999)
+    with tempfile.NamedTemporaryFile() as file:
+      file.write(data)
+      file.flush()
+      chunks = list(chunkstore.ChunkFile(file.name))
+      self.assertEqual(chunks, _Chunks(data))
+      offset = sum(len(chunk) for chunk in chunks[:5])
+      self.assertEqual(list(chunkstore.ChunkFile(file.name, offset)), chunks[5:])
+
+class StoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Directory = os.path.join(self._Directory.name, 'store')
+    self.Store = chunkstore.ChunkStore(self.Directory, bloomBits=64)
+
+  def tearDown(self):
+    self.Store.Close()
+    self._Directory.cleanup()
+
+  def _File(self, name, data):
+    path = os.path.join(self._Directory.name, name)
+    with open(path, 'wb') as file:
+      file.write(data)
+    return path
+
+  def _Read(self, path):
+    with open(path, 'rb') as file:
+      return file.read()
+
+  def test_round_trip(self):
+    data = _Data(7, 2 * 1024 * 1024 + 17)
+    chunks, written = self.Store.StoreFile(self._File('big', data))
+    self.assertEqual(written, len(data))
+    self.assertEqual(sum(length for digest, length in chunks), len(data))
+    target = os.path.join(self._Directory.name, 'restored')
+    self.Store.ReadFile(chunks, target)
+    self.assertEqual(self._Read(target), data)
+    self.assertEqual(self.Store.StoreFile(self._File('empty', b''))[0], [])
+
+  def test_deduplication(self):
+    data = _Data(8, 1024 * 1024)
+    chunks, written = self.Store.StoreFile(self._File('one', data))
+    again, writtenAgain = self.Store.StoreFile(self._File('two', data))
+    self.assertEqual(chunks, again)
+    self.assertEqual(writtenAgain, 0)
+    digest, new = self.Store.Put(b'chunk')
+    self.assertTrue(new)
+    self.assertEqual(self.Store.Put(b'chunk'), (digest, False))
+    self.assertEqual(self.Store.Get(digest), b'chunk')
+
+  def test_reopen(self):
+    digests = [self.Store.Put(_Data(number, 100))[0] for number in range(200)]
+    self.assertGreaterEqual(self.Store._Bloom.Bits, 200 * chunkstore.BLOOM_BITS)
+    self.Store.Close()
+    self.Store = chunkstore.ChunkStore(self.Directory, bloomBits=64)
+    self.assertEqual(self.Store._Bloom.Count, 200)
+    self.assertTrue(all(self.Store.Has(digest) for digest in digests))
+    self.assertEqual(self.Store.Get(digests[10]), _Data(10, 100))
+    self.assertFalse(self.Store.Put(_Data(10, 100))[1])
+    self.Store.Close()
+    os.remove(os.path.join(self.Directory, 'bloom')) #a crash, the filter is rebuilt from the index
+    self.Store = chunkstore.ChunkStore(self.Directory, bloomBits=64)
+    self.assertTrue(all(self.Store.Has(digest) for digest in digests))
+
+  def test_recipes(self):
+    files = {'a': _Data(9, 300000), os.path.join('dir', 'b'): _Data(10, 5000), 'empty': b''}
+    recipes = []
+    for _ in range(2): #in the same millisecond as often as not
+      recipe = self.Store.NewBackup('item/title')
+      for relative, data in sorted(files.items()):
+        chunks, written = self.Store.StoreFile(self._File('source', data))
+        recipe.Add(relative, len(data), 7, chunks)
+      self.Store.Flush()
+      recipe.Commit()
+      recipes.append(recipe.FileName)
+    self.assertEqual(len(set(recipes)), 2)
+    self.assertEqual(self.Store.Backups('item/title'), sorted(recipes))
+    self.assertEqual(self.Store.Backups('item'), [])
+    self.assertEqual(sorted(record['path'] for record in chunkstore.ReadRecipe(recipes[-1])), sorted(files))
+
+    index = self.Store.IndexBackup(recipes[-1])
+    try:
+      entry = index.Find(os.path.join('dir', 'b'))
+      self.assertEqual(entry[:3], (os.path.join('dir', 'b'), 5000, 7))
+      data = b''.join(self.Store.ReadAt(pack, offset, length) for pack, offset, length, digest in entry[3])
+      self.assertEqual(data, files[os.path.join('dir', 'b')])
+      self.assertEqual([entry[0] for entry in index.Select('dir')], [os.path.join('dir', 'b')])
+      self.assertEqual(len(index.Select()), 3)
+      self.assertIsNone(index.Find('missing'))
+    finally:
+      index.Close()
+
+  def test_discarded_recipe(self):
+    recipe = self.Store.NewBackup('item')
+    recipe.Discard()
+    self.assertEqual(self.Store.Backups('item'), [])
+    self.assertEqual(os.listdir(os.path.dirname(recipe.FileName)), [])
+
+  def test_names_are_exact(self):
+    names = ['db', 'db-logs', 'db logs', 'db_logs', 'db/logs', '..', 'db.']
+    recipes = {}
+    for name in names:
+      recipe = self.Store.NewBackup(name)
+      recipe.Commit()
+      recipes[name] = recipe.FileName
+    for name in names:
+      self.assertEqual(self.Store.Backups(name), [recipes[name]], name)
+      self.assertEqual(next(iter(chunkstore.ReadRecipe(recipes[name])), None), None)
+    self.assertEqual(self.Store.Backups('d'), [])
+
+  def test_legacy_recipes(self):
+    directory = os.path.join(self.Directory, 'backups')
+    for name, fileName in [('db/logs', 'db_logs-5.recipe'), ('db_logs', 'db_logs-7.recipe'), ('db', 'db-9.recipe')]:
+      with open(os.path.join(directory, fileName), 'w') as file:
+        file.write('{"name": "%s"}\n' % name)
+    recipe = self.Store.NewBackup('db_logs')
+    recipe.Commit()
+    self.assertEqual(self.Store.Backups('db/logs'), [os.path.join(directory, 'db_logs-5.recipe')])
+    self.assertEqual(self.Store.Backups('db_logs'), [os.path.join(directory, 'db_logs-7.recipe'), recipe.FileName])
+    self.assertEqual(self.Store.Backups('db'), [os.path.join(directory, 'db-9.recipe')])
+
+if __name__ == '__main__':
+  unittest.main()
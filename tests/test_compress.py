@@ -0,0 +1,86 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import compress
+
+## @package test_compress
+#  Tests of the parallel block compression
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var DECOMPRESS
+#  The standard decompressor of every format
+DECOMPRESS = {'gzip': gzip.decompress, 'bz2': bz2.decompress, 'xz': lzma.decompress}
+
+## Make compressible data
+#  @param size The size of the data
+#  @retval bytes Random words, the same for every run
+def _Data(size):
+  generator = random.Random(3)
+  words = [b'alpha', b'beta', b'gamma', b'delta', b'\x00\xff']
+  data = bytearray()
+  while len(data) < size:
+    data += generator.choice(words)
+  return bytes(data[:size])
+
+class SpecTest(unittest.TestCase):
+
+  def test_parse(self):
+    self.assertIsNone(compress.ParseSpec('none'))
+    self.assertIsNone(compress.ParseSpec(''))
+    self.assertEqual(compress.ParseSpec('gzip'), ('gzip', 6))
+    self.assertEqual(compress.ParseSpec('xz:9'), ('xz', 9))
+    self.assertEqual(compress.Extension('bz2:1'), '.bz2')
+    self.assertEqual(compress.Extension('none'), '')
+    for spec in ('zip', 'gzip:10', 'gzip:fast'):
+      self.assertRaises(ValueError, compress.ParseSpec, spec)
+
+class ParallelCompressorTest(unittest.TestCase):
+
+  def setUp(self):
+    self.Data = _Data(5 * 1000 + 17)
+
+  def _Round(self, compressor, spec, data):
+    output = io.BytesIO()
+    self.assertEqual(compressor.CompressStream(io.BytesIO(data), output, spec)[0], len(data))
+    return output.getvalue()
+
+  def test_formats_in_the_calling_thread(self):
+    compressor = compress.ParallelCompressor(0, blockSize=1000, inFlight=2)
+    for name in compress.FORMATS:
+      for data in (self.Data, b''):
+        compressed = self._Round(compressor, name + ':1', data)
+        self.assertEqual(DECOMPRESS[name](compressed), data, name) #the concatenated members read back as one
+    self.assertEqual(self._Round(compressor, 'none', self.Data), self.Data)
+
+  def test_process_pool(self):
+    with compress.ParallelCompressor(2, blockSize=1000) as compressor:
+      compressed = self._Round(compressor, 'gzip', self.Data)
+      self.assertEqual(compressed, self._Round(compress.ParallelCompressor(0, blockSize=1000), 'gzip', self.Data))
+    self.assertEqual(gzip.decompress(compressed), self.Data)
+
+  def test_file(self):
+    with tempfile.TemporaryDirectory() as directory:
+      source = os.path.join(directory, 'source')
+      with open(source, 'wb') as file:
+        file.write(self.Data)
+      charged = []
+      for spec in ('xz', 'none'):
+        target = os.path.join(directory, 'copy') + compress.Extension(spec)
+        read, written = compress.ParallelCompressor(0, blockSize=1000).CompressFile(source, target, spec,
+                                                                                     charged.append)
+        self.assertEqual((read, written), (len(self.Data), os.path.getsize(target)))
+        with compress.Open(target, spec) as file:
+          self.assertEqual(file.read(), self.Data)
+      self.assertEqual(charged, [1000] * 5 + [17] + [1000] * 5 + [17])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,130 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import batch_eval
+import Lexer
+import Parser
+
+## @package test_conditions
+#  Tests of the condition compiler, its optimizer and the batch evaluator
+#
+#  Random conditions are compiled and checked against a plain evaluation of
+#  their unoptimized parse tree, which gives the values the original parser
+#  computed while it parsed.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var OPERATORS
+#  The binary operators of the language
+OPERATORS = ['||', '&&', '<', '<=', '>', '>=', '==', '+']
+
+## @var OPERANDS
+#  The leaves random conditions are built from
+OPERANDS = ['LastBU', 'Modified', 'True', 'False', '3 days', '1 d', '12 hours', '2 h',
+            '30 minutes', '5 min', '1 month', '2 mons', '0 days']
+
+## @var LAST
+#  The LastBU values every condition is evaluated with, None for never
+LAST = [None, 0, 59, 60, 3600, 86400, 3 * 86400 + 1, 2629743 * 3]
+
+def _Random(generator, depth):
+  if depth == 0 or generator.random() < 0.3:
+    return generator.choice(OPERANDS)
+  expression = '%s %s %s' % (_Random(generator, depth - 1), generator.choice(OPERATORS),
+                             _Random(generator, depth - 1))
+  return '(%s)' % expression if generator.random() < 0.3 else expression
+
+## Evaluate a parse tree the way the original parser did
+#  @param node A node of an unoptimized parse tree
+#  @param context The keyword values
+#  @retval The value of the node
+def _Reference(node, context):
+  if node[0] == 'const':
+    return node[1]
+  if node[0] == 'key':
+    value = context[node[1]]
+    return float('inf') if value is None else value
+  name, left = node[1], _Reference(node[2], context)
+  if name == 'OR':
+    return left or _Reference(node[3], context)
+  if name == 'AND':
+    return left and _Reference(node[3], context)
+  return Parser._OPERATORS[name](left, _Reference(node[3], context))
+
+def _Tree(expression):
+  return Parser._get_parser().parse(expression, lexer=Lexer.get_lexer().clone())
+
+class CompilerTest(unittest.TestCase):
+
+  def test_matches_reference(self):
+    generator = random.Random(1)
+    for _ in range(500):
+      expression = _Random(generator, 4)
+      condition = Parser.compile_condition(expression)
+      tree = _Tree(expression)
+      for last in LAST:
+        for modified in (False, True):
+          context = {'LastBU': last, 'Modified': modified}
+          self.assertEqual(condition(context), bool(_Reference(tree, context)),
+                           '%s with %r' % (expression, context))
+
+  def test_optimizer_skips_expensive_lookups(self):
+    def modified():
+      raise AssertionError("Modified was looked up")
+    condition = Parser.compile_condition('Modified || LastBU > 1 day')
+    self.assertTrue(condition({'LastBU': None, 'Modified': modified}))
+    condition = Parser.compile_condition('Modified && LastBU > 1 day')
+    self.assertFalse(condition({'LastBU': 0, 'Modified': modified}))
+    self.assertEqual(Parser.compile_condition('True || Modified').tree, ('const', True))
+
+  def test_facts(self):
+    self.assertEqual(Parser.compile_condition('LastBU > 2 h').facts, frozenset(['LastBU']))
+    self.assertEqual(Parser.compile_condition('LastBU > 2 h && Modified').facts,
+                     frozenset(['LastBU', 'Modified']))
+    self.assertEqual(Parser.compile_condition('False && Modified').facts, frozenset())
+
+  def test_invalid(self):
+    for expression in ['LastBU >', '&& True', '3 weeks', 'LastBU > 1 day)']:
+      self.assertRaises(SyntaxError, Parser.compile_condition, expression)
+      self.assertFalse(Parser.validate(expression))
+
+class BatchTest(unittest.TestCase):
+
+  def test_matches_compiled(self):
+    generator = random.Random(2)
+    now = 10 ** 9
+    last = [None if value is None else now - value for value in LAST] * 2
+    modified = [False] * len(LAST) + [True] * len(LAST)
+    for _ in range(200):
+      condition = Parser.compile_condition(_Random(generator, 3))
+      expected = [condition({'LastBU': Parser.elapsed_since(stamp, now), 'Modified': flag})
+                  for stamp, flag in zip(last, modified)]
+      for useNumpy in (False, True):
+        mask = batch_eval.evaluate_batch(condition, last, now, modified, useNumpy=useNumpy)
+        self.assertEqual([bool(value) for value in mask], expected, condition.expression)
+
+  def test_due_items(self):
+    now = 10 ** 9
+    data = {'old': {'source': '/old', 'last': repr(now - 5 * 86400), 'condition': 'LastBU > 3 days'},
+            'new': {'source': '/new', 'last': repr(now - 60), 'condition': 'LastBU > 3 days'},
+            'never': {'source': '/never', 'last': 'never', 'condition': 'Default'},
+            'changed': {'source': '/changed', 'last': repr(now), 'condition': 'Modified'},
+            'same': {'source': '/same', 'last': repr(now), 'condition': 'Modified'}}
+    due = batch_eval.due_items(data, now, lambda source: source == '/changed', 'LastBU > 1 day')
+    self.assertEqual(sorted(due), ['changed', 'never', 'old'])
+
+  def test_due_items_errors(self):
+    now = 10 ** 9
+    data = {'broken': {'source': '/broken', 'last': 'never', 'condition': 'LastBU >'},
+            'badlast': {'source': '/badlast', 'last': 'yesterday', 'condition': 'True'},
+            'modified': {'source': '/modified', 'last': 'never', 'condition': 'Modified'},
+            'fine': {'source': '/fine', 'last': 'never', 'condition': 'True'}}
+    errors = {}
+    self.assertEqual(batch_eval.due_items(data, now, errors=errors), ['fine'])
+    self.assertEqual(sorted(errors), ['badlast', 'broken', 'modified'])
+
+if __name__ == '__main__':
+  unittest.main()
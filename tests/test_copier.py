@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import copier
+
+## @package test_copier
+#  Tests of the file copy strategies
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class CopierTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    self.Target = os.path.join(self._Directory.name, 'target')
+    self.Data = os.urandom(3 * copier.BUFFER_SIZE + 12345)
+    self._Write(self.Source, self.Data)
+    os.chmod(self.Source, 0o640)
+    os.utime(self.Source, ns=(10**18, 10**18))
+    self._Unsupported = set(copier._unsupported)
+
+  def tearDown(self):
+    copier._unsupported.clear()
+    copier._unsupported.update(self._Unsupported)
+    self._Directory.cleanup()
+
+  def _Write(self, fileName, data):
+    with open(fileName, 'wb') as file:
+      file.write(data)
+
+  def _Read(self, fileName):
+    with open(fileName, 'rb') as file:
+      return file.read()
+
+  def _Check(self):
+    self.assertEqual(self._Read(self.Target), self.Data)
+    self.assertEqual(os.stat(self.Target).st_mtime_ns, 10**18)
+    self.assertEqual(os.stat(self.Target).st_mode & 0o777, 0o640)
+
+  def test_strategies(self):
+    for strategy in copier.STRATEGIES:
+      self._Write(self.Target, b'older and longer contents' * 200000)
+      try:
+        size = copier.CopyFile(self.Source, self.Target, strategy)
+      except OSError: #reflink needs a file system that clones
+        self.assertEqual(strategy, 'reflink')
+        continue
+      self.assertEqual(size, len(self.Data), strategy)
+      self._Check()
+
+  def test_fallback(self):
+    self.assertEqual(copier.CopyFile(self.Source, self.Target), len(self.Data))
+    self._Check()
+    copier._unsupported.update(['reflink', 'copy_file_range', 'sendfile']) #as on a kernel without them
+    self.assertEqual(copier.CopyFile(self.Source, self.Target), len(self.Data))
+    self._Check()
+
+  def test_empty_file(self):
+    self.Data = b''
+    self._Write(self.Source, b'')
+    os.utime(self.Source, ns=(10**18, 10**18))
+    for strategy in copier.STRATEGIES[1:]:
+      self.assertEqual(copier.CopyFile(self.Source, self.Target, strategy), 0)
+      self._Check()
+
+  def test_charge(self):
+    for strategy in copier.STRATEGIES[1:]:
+      charged = []
+      copier.CopyFile(self.Source, self.Target, strategy, charged.append)
+      self.assertEqual(sum(charged), len(self.Data), strategy)
+      self.assertLessEqual(max(charged), copier.CHARGE_SIZE, strategy)
+      self._Check()
+
+  def test_copy_from(self):
+    offset = copier.BUFFER_SIZE + 7
+    self._Write(self.Target, self.Data[:offset] + b'torn tail')
+    reached = []
+    charged = []
+    size = copier.CopyFileFrom(self.Source, self.Target, offset, reached.append, copier.BUFFER_SIZE, charged.append)
+    self.assertEqual(size, len(self.Data))
+    self._Check()
+    self.assertEqual(reached[-1], len(self.Data))
+    self.assertEqual(reached, sorted(reached))
+    self.assertEqual(sum(charged), len(self.Data) - offset)
+    copier._unsupported.add('copy_file_range')
+    os.remove(self.Target)
+    self.assertEqual(copier.CopyFileFrom(self.Source, self.Target), len(self.Data))
+    self._Check()
+
+if __name__ == '__main__':
+  unittest.main()
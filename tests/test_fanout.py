@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import weakref
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import fanout
+
+## @package test_fanout
+#  Tests of the pipeline that backs items up to several destinations at once
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## A destination that fails every file under one name
+class _FailingDestination(fanout.DirectoryDestination):
+
+  def __init__(self, directory, failing):
+    fanout.DirectoryDestination.__init__(self, directory)
+    self.Failing = failing
+
+  def Open(self, relative):
+    if os.path.basename(relative) == self.Failing:
+      raise OSError('the destination is full')
+    return fanout.DirectoryDestination.Open(self, relative)
+
+class FanOutTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    os.makedirs(os.path.join(self.Source, 'sub'))
+    self.Files = {'a': b'a' * 3000, os.path.join('sub', 'b'): b'b' * 10, 'empty': b''}
+    for relative, data in self.Files.items():
+      with open(os.path.join(self.Source, relative), 'wb') as file:
+        file.write(data)
+    self.Targets = [os.path.join(self._Directory.name, name) for name in ('one', 'two')]
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Item(self, source=None):
+    return ('item', {'source': source or self.Source, 'type': 'folder'})
+
+  def _Contents(self, target):
+    return dict((relative, open(os.path.join(target, 'item', relative), 'rb').read()) for relative in self.Files)
+
+  def test_every_destination(self):
+    result = fanout.FanOut([fanout.DirectoryDestination(target) for target in self.Targets],
+                           blockSize=1024, bufferBlocks=1).Run([self._Item()])
+    self.assertEqual(result['succeeded'], ['item'])
+    self.assertEqual((result['files'], result['bytes']), (3, 3010))
+    for target in self.Targets:
+      self.assertEqual(self._Contents(target), self.Files)
+      self.assertEqual(result['destinations'][target], {'files': 3, 'bytes': 3010, 'failed': {},
+                                                        'stalled': result['destinations'][target]['stalled']})
+    self.assertEqual(os.stat(os.path.join(self.Targets[0], 'item', 'a')).st_mtime_ns,
+                     os.stat(os.path.join(self.Source, 'a')).st_mtime_ns)
+
+  def test_failed_destination_is_dropped_from_the_file(self):
+    destinations = [fanout.DirectoryDestination(self.Targets[0]), _FailingDestination(self.Targets[1], 'a')]
+    result = fanout.FanOut(destinations).Run([self._Item()])
+    self.assertEqual(result['succeeded'], [])
+    self.assertEqual(self._Contents(self.Targets[0]), self.Files)
+    self.assertEqual(result['destinations'][self.Targets[1]]['failed'],
+                     {os.path.join('item', 'a'): 'the destination is full'})
+    self.assertEqual(result['destinations'][self.Targets[1]]['files'], 2)
+    self.assertFalse(os.path.exists(os.path.join(self.Targets[1], 'item', 'a')))
+
+  def test_missing_source(self):
+    result = fanout.FanOut([fanout.DirectoryDestination(self.Targets[0])]).Run(
+      [('gone', {'source': os.path.join(self._Directory.name, 'gone'), 'type': 'file'}), self._Item()])
+    self.assertEqual(result['succeeded'], ['item'])
+    self.assertEqual(list(result['destinations'][self.Targets[0]]['failed']), [os.path.join('gone', 'gone')])
+
+  def test_tasks_stay_bounded(self):
+    for number in range(100):
+      with open(os.path.join(self.Source, 'many%d' % number), 'wb') as file:
+        file.write(b'%d' % number)
+    pipeline = fanout.FanOut([fanout.DirectoryDestination(target) for target in self.Targets], files=3)
+    alive = weakref.WeakSet() #finished tasks included, as long as something holds them
+    peak = [0]
+    def factory(loop, coroutine, **options):
+      task = asyncio.Task(coroutine, loop=loop, **options)
+      alive.add(task)
+      peak[0] = max(peak[0], len(alive))
+      return task
+    async def run():
+      asyncio.get_running_loop().set_task_factory(factory)
+      return await pipeline.RunAsync([self._Item()])
+    result = asyncio.run(run())
+    self.assertEqual(result['succeeded'], ['item'])
+    self.assertEqual(result['files'], 103)
+    #the run, its copiers and the writers of the files they hold, plus those of a file being finished
+    self.assertLessEqual(peak[0], 1 + 3 + (3 + 1) * 2)
+
+if __name__ == '__main__':
+  unittest.main()
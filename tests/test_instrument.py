@@ -0,0 +1,121 @@
+import cProfile
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import instrument
+import runner
+
+## @package test_instrument
+#  Tests of the instrumentation of backup runs
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## A profiler that, like cProfile on Python 3.12 and later, can only be enabled once at a time
+class _SingleProfile(cProfile.Profile):
+
+  _Enabled = 0
+
+  def enable(self, *arguments, **keywords):
+    if _SingleProfile._Enabled:
+      raise ValueError('Another profiling tool is already active')
+    _SingleProfile._Enabled += 1
+    self._Mine = True
+    super().enable(*arguments, **keywords)
+
+  def disable(self):
+    if getattr(self, '_Mine', False):
+      _SingleProfile._Enabled -= 1
+      self._Mine = False
+    super().disable()
+
+class InstrumentTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    os.makedirs(self.Source)
+    for number in range(20):
+      with open(os.path.join(self.Source, 'file%d' % number), 'wb') as file:
+        file.write(b'x' * number)
+    self.Model = bumodel.Model(os.path.join(self._Directory.name, 'PyBakUP.xml'))
+    self.Model.AddBackUpItem(self.Source, 'folder', 'item')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  ## Run a backup of the item on another thread
+  #  @param self The current instance
+  #  @retval dictionary The result of the run
+  def _Run(self):
+    results = []
+    backups = runner.BackupRunner(self.Model, os.path.join(self._Directory.name, 'backups'), workers=4)
+    items = [('item', self.Model.GetBackUpItem(self.Source))]
+    thread = threading.Thread(target=lambda: results.append(backups.Run(items)), daemon=True)
+    thread.start()
+    thread.join(60)
+    self.assertFalse(thread.is_alive(), 'the run hangs')
+    return results[0]
+
+  def test_off(self):
+    self.assertIsNone(instrument.Active())
+    with instrument.Stage('stage') as measurement:
+      measurement.Bytes = 5
+    self.assertEqual(instrument.Stage('stage').Bytes, 0)
+    instrument.Gauge('gauge', 1)
+
+  def test_stats(self):
+    stats = instrument.Stats()
+    for value in (3, 1, 2):
+      with stats.Stage('copy') as measurement:
+        measurement.Bytes, measurement.Files = value, 1
+      stats.Gauge('depth', value)
+    report = stats.Report()
+    self.assertEqual(report['stages']['copy']['calls'], 3)
+    self.assertEqual(report['stages']['copy']['bytes'], 6)
+    self.assertEqual(report['stages']['copy']['files'], 3)
+    self.assertEqual(report['gauges']['depth'], {'last': 2, 'max': 3, 'mean': 2.0})
+
+  def test_session(self):
+    fileName = os.path.join(self._Directory.name, 'report.json')
+    with instrument.Session(fileName, profile='cprofile') as session:
+      result = self._Run()
+    self.assertIsNone(instrument.Active())
+    self.assertEqual(result['files'], 20)
+    self.assertEqual(result['stats']['stages']['copy']['files'], 20)
+    with open(fileName) as file:
+      self.assertEqual(json.load(file)['stages']['copy']['calls'], 20)
+    self.assertTrue(os.path.exists(session.Result['profile']))
+    self.assertRaises(ValueError, instrument.Session, profile='perf')
+
+  def test_one_profiler_at_a_time(self):
+    profile = cProfile.Profile
+    cProfile.Profile = _SingleProfile
+    try:
+      with instrument.Session(os.path.join(self._Directory.name, 'report.json'), profile='cprofile') as session:
+        result = self._Run()
+    finally:
+      cProfile.Profile = profile
+    self.assertEqual(result['failed'], {})
+    self.assertEqual(result['files'], 20)
+    self.assertEqual(_SingleProfile._Enabled, 0)
+    self.assertTrue(os.path.exists(session.Result['profile']))
+
+  def test_dead_worker(self):
+    threadProfile = instrument.ThreadProfile
+    instrument.ThreadProfile = lambda: 1 / 0 #every worker dies before its first unit
+    try:
+      result = self._Run()
+    finally:
+      instrument.ThreadProfile = threadProfile
+    self.assertEqual(list(result['failed']), ['item'])
+    self.assertEqual(len(result['failed']['item']), 20)
+    self.assertEqual(self.Model.GetBackUpItem(self.Source)['last'], 'never')
+
+if __name__ == '__main__':
+  unittest.main()
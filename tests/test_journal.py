@@ -0,0 +1,135 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import journal
+
+## @package test_journal
+#  Tests of the write ahead journal and of replaying it after a crash
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class JournalTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.FileName = os.path.join(self._Directory.name, 'journal')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Write(self, operations):
+    log = journal.Journal(self.FileName)
+    log.Reset(3)
+    log.Append(operations)
+    return log
+
+  def test_round_trip(self):
+    self._Write([['add', 'a'], ['modify', 'a', 'last', '1.5']])
+    log = journal.Journal(self.FileName)
+    self.assertEqual(log.Replay(), [['add', 'a'], ['modify', 'a', 'last', '1.5']])
+    self.assertEqual((log.Generation, log.Count), (3, 2))
+
+  def test_torn_line_is_cut_off(self):
+    self._Write([['add', 'a'], ['add', 'b']])
+    good = os.path.getsize(self.FileName)
+    line = journal.Journal(self.FileName)._Encode(['add', 'c'])
+    for length in range(1, len(line)):
+      with open(self.FileName, 'ab') as file:
+        file.write(line[:length]) #a crash part way through the append
+      log = journal.Journal(self.FileName)
+      self.assertEqual(log.Replay(), [['add', 'a'], ['add', 'b']])
+      self.assertEqual(os.path.getsize(self.FileName), good)
+    log.Append([['add', 'd']])
+    self.assertEqual(journal.Journal(self.FileName).Replay(), [['add', 'a'], ['add', 'b'], ['add', 'd']])
+
+  def test_corrupt_line_ends_the_journal(self):
+    self._Write([['add', 'a'], ['add', 'b'], ['add', 'c']])
+    with open(self.FileName, 'rb') as file:
+      lines = file.readlines()
+    lines[2] = lines[2].replace(b'"b"', b'"x"') #the crc no longer matches
+    with open(self.FileName, 'wb') as file:
+      file.writelines(lines)
+    log = journal.Journal(self.FileName)
+    self.assertEqual(log.Replay(repair=False), [['add', 'a']])
+    self.assertEqual(os.path.getsize(self.FileName), sum(len(line) for line in lines))
+    self.assertEqual(log.Replay(), [['add', 'a']])
+    self.assertEqual(os.path.getsize(self.FileName), len(lines[0]) + len(lines[1]))
+
+  def test_missing(self):
+    log = journal.Journal(self.FileName)
+    self.assertEqual(log.Replay(), [])
+    self.assertIsNone(log.Generation)
+
+  def test_replace_file(self):
+    journal.ReplaceFile(self.FileName, b'first')
+    def fail(file):
+      file.write(b'half')
+      raise ValueError('stop')
+    self.assertRaises(ValueError, journal.ReplaceFile, self.FileName, fail)
+    with open(self.FileName, 'rb') as file:
+      self.assertEqual(file.read(), b'first')
+    self.assertEqual(os.listdir(self._Directory.name), ['journal'])
+
+class ModelReplayTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.FileName = os.path.join(self._Directory.name, 'PyBakUP.xml')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def test_saved_changes_survive_a_torn_append(self):
+    model = bumodel.Model(self.FileName)
+    model.AddBackUpItem('/a', 'folder', 'A')
+    model.AddBackUpItem('/b', 'file', 'B', 'the b file')
+    model.Save()
+    model.ModifyItem('/a', 'last', '100.0')
+    model.RemoveBackUpItem('/b')
+    model.Save()
+    expected = model.GetBackUpData()
+    with open(self.FileName + '.journal', 'ab') as file:
+      file.write(b'0badc0de ["add","/c"') #the crash
+    model = bumodel.Model(self.FileName)
+    self.assertEqual(model.GetBackUpData(), expected)
+    model.AddBackUpItem('/c', 'folder', 'C')
+    model.Save()
+    self.assertEqual(sorted(bumodel.Model(self.FileName).GetBackUpData()), ['A', 'C'])
+    self.assertEqual(sorted(title for title, itemData in bumodel.StreamBackUpData(self.FileName)), ['A', 'C'])
+
+  def test_unsaved_changes_are_lost(self):
+    model = bumodel.Model(self.FileName)
+    model.AddBackUpItem('/a', 'folder', 'A')
+    model.Save()
+    model.AddBackUpItem('/b', 'folder', 'B')
+    self.assertEqual(sorted(bumodel.Model(self.FileName).GetBackUpData()), ['A'])
+
+  def test_compaction(self):
+    model = bumodel.Model(self.FileName)
+    model.AddBackUpItem('/a', 'folder', 'A')
+    for number in range(bumodel.Model.COMPACT_MINIMUM + 10):
+      model.ModifyItem('/a', 'last', repr(float(number)))
+      model.Save()
+    self.assertLess(model._Journal.Count, bumodel.Model.COMPACT_MINIMUM)
+    self.assertEqual(bumodel.Model(self.FileName).GetBackUpItem('/a')['last'],
+                     repr(float(bumodel.Model.COMPACT_MINIMUM + 9)))
+
+  def test_old_generation_is_not_replayed(self):
+    model = bumodel.Model(self.FileName)
+    model.AddBackUpItem('/a', 'folder', 'A')
+    model.ModifyItem('/a', 'last', '1.0')
+    model.Save()
+    with open(self.FileName + '.journal', 'rb') as file:
+      stale = file.read()
+    model.ModifyItem('/a', 'last', '2.0')
+    model._Compact() #a crash after this, before the journal was reset, leaves the old one
+    with open(self.FileName + '.journal', 'wb') as file:
+      file.write(stale)
+    self.assertEqual(bumodel.Model(self.FileName).GetBackUpItem('/a')['last'], '2.0')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import manifest
+
+## @package test_manifest
+#  Tests of the manifests that make folder backups incremental
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class ManifestTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Top = os.path.join(self._Directory.name, 'source')
+    self.FileName = os.path.join(self._Directory.name, 'backup', manifest.FILE_NAME)
+    for relative in ['a', os.path.join('sub', 'b'), os.path.join('sub', 'deep', 'c')]:
+      self._Write(relative, relative)
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Write(self, relative, data):
+    path = os.path.join(self.Top, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+      file.write(data)
+
+  ## Run a backup the way the runner does
+  #  @param self The current instance
+  #  @param now The time of the run
+  #  @param paths (Optional)The changed paths, see Manifest.Diff()
+  #  @param onError (Optional)See Manifest.Diff()
+  #  @retval tuple The manifest and the sorted relative paths that were transferred
+  def _Run(self, now, paths=None, onError=None):
+    current = manifest.Manifest(self.FileName)
+    changed = []
+    for path, relative, size, mtime in current.Diff(self.Top, paths, onError):
+      changed.append(relative)
+      current.Update(relative, size, mtime, manifest.HashFile(path))
+    current.Save(now)
+    return current, sorted(changed)
+
+  def test_first_run_takes_everything(self):
+    current, changed = self._Run(1.0)
+    self.assertEqual(changed, sorted(['a', os.path.join('sub', 'b'), os.path.join('sub', 'deep', 'c')]))
+    self.assertEqual(current.Deleted, [])
+    loaded = manifest.Manifest(self.FileName)
+    self.assertEqual(loaded.Time, 1.0)
+    self.assertEqual(loaded.Entries, current.Entries)
+
+  def test_only_changes_are_transferred(self):
+    self._Run(1.0)
+    self.assertEqual(self._Run(2.0)[1], [])
+    self._Write('a', 'longer contents')
+    self._Write('new', 'new')
+    self.assertEqual(self._Run(3.0)[1], ['a', 'new'])
+
+  def test_tombstones(self):
+    self._Run(1.0)
+    os.remove(os.path.join(self.Top, 'sub', 'b'))
+    current, changed = self._Run(2.0)
+    self.assertEqual(changed, [])
+    self.assertEqual(current.Deleted, [os.path.join('sub', 'b')])
+    loaded = manifest.Manifest(self.FileName)
+    self.assertNotIn(os.path.join('sub', 'b'), loaded.Entries)
+    self.assertEqual(loaded.Tombstones, {os.path.join('sub', 'b'): 2.0})
+    self._Run(3.0)
+    self.assertEqual(manifest.Manifest(self.FileName).Tombstones, {os.path.join('sub', 'b'): 2.0})
+    self._Write(os.path.join('sub', 'b'), 'back')
+    current, changed = self._Run(4.0)
+    self.assertEqual(changed, [os.path.join('sub', 'b')])
+    self.assertEqual(manifest.Manifest(self.FileName).Tombstones, {})
+
+  def test_changed_paths_only(self):
+    self._Run(1.0)
+    os.remove(os.path.join(self.Top, 'a'))
+    self._Write(os.path.join('sub', 'deep', 'c'), 'changed contents')
+    current, changed = self._Run(2.0, [os.path.join('sub', 'deep'), os.path.join('sub', 'deep', 'c')])
+    self.assertEqual(changed, [os.path.join('sub', 'deep', 'c')])
+    self.assertEqual(current.Deleted, []) #'a' is outside the changed paths
+    self.assertIn('a', manifest.Manifest(self.FileName).Entries)
+    current, changed = self._Run(3.0, ['a'])
+    self.assertEqual(current.Deleted, ['a'])
+
+  def test_unreadable_directory_is_not_deleted(self):
+    self._Run(1.0)
+    unreadable = os.path.join(self.Top, 'sub')
+    scandir = os.scandir
+    def failing(path):
+      if os.path.abspath(path) == unreadable:
+        raise PermissionError(13, 'Permission denied', path)
+      return scandir(path)
+    errors = []
+    os.scandir = failing #chmod doesn't stop root, which the tests may run as
+    try:
+      current, changed = self._Run(2.0, onError=lambda relative, error: errors.append(relative))
+    finally:
+      os.scandir = scandir
+    self.assertEqual(errors, ['sub'])
+    self.assertEqual(current.Unreadable, ['sub'])
+    self.assertEqual(current.Deleted, [])
+    loaded = manifest.Manifest(self.FileName)
+    self.assertIn(os.path.join('sub', 'deep', 'c'), loaded.Entries)
+    self.assertEqual(loaded.Tombstones, {})
+
+  def test_walk(self):
+    os.symlink(os.path.join(self.Top, 'a'), os.path.join(self.Top, 'link'))
+    walked = sorted(relative for entry, relative in manifest.WalkEntries(self.Top))
+    self.assertEqual(walked, sorted(['a', os.path.join('sub', 'b'), os.path.join('sub', 'deep', 'c')]))
+    self.assertRaises(OSError, list, manifest.WalkEntries(os.path.join(self.Top, 'missing')))
+
+if __name__ == '__main__':
+  unittest.main()
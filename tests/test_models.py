@@ -0,0 +1,135 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import sqlmodel
+
+## @package test_models
+#  Tests that the xml and the SQLite models behave the same
+#
+#  The same random changes are made to both models, which must then hold the same
+#  items, before and after they are saved and opened again.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var ATTRIBUTES
+#  The attributes changed by the random modifications and example values
+ATTRIBUTES = {'last': ['never', '1.5', '1700000000.25'],
+              'condition': ['Default', 'LastBU > 3 days', 'Modified'],
+              'title': ['one', 'two', 'three', 'four'],
+              'description': ['', 'some text'],
+              'compression': ['none', 'gzip:6'],
+              'group': ['default', 'nightly']}
+
+class ParityTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.XmlName = os.path.join(self._Directory.name, 'PyBakUP.xml')
+    self.DbName = os.path.join(self._Directory.name, 'PyBakUP.db')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Open(self):
+    return bumodel.Model(self.XmlName), sqlmodel.SqliteModel(self.DbName)
+
+  def _Change(self, generator, models):
+    sources = ['/item%d' % number for number in range(12)]
+    action = generator.random()
+    if action < 0.3:
+      arguments = (generator.choice(sources), generator.choice(['file', 'folder', 'link']),
+                   generator.choice(ATTRIBUTES['title']), generator.choice(ATTRIBUTES['description']))
+      results = [model.AddBackUpItem(*arguments) for model in models]
+    elif action < 0.45:
+      source = generator.choice(sources)
+      results = [model.RemoveBackUpItem(source) for model in models]
+    elif action < 0.55:
+      chosen = generator.sample(sources, 3)
+      results = [model.RemoveBackUpItems(chosen) for model in models]
+    elif action < 0.65:
+      items = [(generator.choice(sources), 'file', generator.choice(ATTRIBUTES['title'])) for _ in range(3)]
+      results = [model.AddBackUpItems(items) for model in models]
+    elif action < 0.75:
+      changes = []
+      for _ in range(3):
+        attribute = generator.choice(sorted(ATTRIBUTES))
+        changes.append((generator.choice(sources), attribute, generator.choice(ATTRIBUTES[attribute])))
+      results = [model.ModifyItems(changes) for model in models]
+    else:
+      attribute = generator.choice(sorted(ATTRIBUTES))
+      arguments = (generator.choice(sources), attribute, generator.choice(ATTRIBUTES[attribute]))
+      results = [model.ModifyItem(*arguments) for model in models]
+    self.assertEqual(results[0], results[1])
+
+  def _Compare(self, xmlModel, sqliteModel):
+    self.assertEqual(list(_Normal(xmlModel.IterBackUpData())), list(_Normal(sqliteModel.IterBackUpData())))
+    self.assertEqual(dict(_Normal(xmlModel.GetBackUpData().items())),
+                     dict(_Normal(sqliteModel.GetBackUpData().items())))
+    for number in range(12):
+      source = '/item%d' % number
+      self.assertEqual(_NormalItem(xmlModel.GetBackUpItem(source)), _NormalItem(sqliteModel.GetBackUpItem(source)))
+    for title in ATTRIBUTES['title'] + ['missing']:
+      self.assertEqual(xmlModel.GetSourceByTitle(title), sqliteModel.GetSourceByTitle(title), title)
+
+  def test_random_changes(self):
+    generator = random.Random(3)
+    models = self._Open()
+    for step in range(400):
+      self._Change(generator, models)
+      self._Compare(*models)
+      if step % 50 == 49:
+        for model in models:
+          model.Save()
+        models[1].Close()
+        models = self._Open()
+        self._Compare(*models)
+
+  def test_failed_batch_is_undone(self):
+    models = self._Open()
+    for model in models:
+      model.AddBackUpItem('/kept', 'folder', 'kept')
+      model.Save()
+      try:
+        with model.Batch():
+          model.AddBackUpItem('/dropped', 'folder', 'dropped')
+          model.ModifyItem('/kept', 'last', '5.0')
+          raise RuntimeError('abort')
+      except RuntimeError:
+        pass
+    self._Compare(*models)
+    self.assertEqual(list(models[1].GetBackUpData()), ['kept'])
+    self.assertEqual(models[1].GetBackUpItem('/kept')['last'], 'never')
+
+  def test_migration(self):
+    xmlModel = bumodel.Model(self.XmlName)
+    generator = random.Random(4)
+    sqliteModel = sqlmodel.SqliteModel(os.path.join(self._Directory.name, 'scratch.db'))
+    for _ in range(100):
+      self._Change(generator, (xmlModel, sqliteModel))
+    xmlModel.Save()
+    count = len(list(bumodel.StreamBackUpData(self.XmlName))) #titles may repeat
+    self.assertEqual(sqlmodel.MigrateXml(self.XmlName, self.DbName), (count, 0))
+    self._Compare(xmlModel, sqlmodel.SqliteModel(self.DbName))
+    self.assertEqual(sqlmodel.MigrateXml(self.XmlName, self.DbName), (0, count)) #every source is already there
+    self._Compare(xmlModel, sqlmodel.SqliteModel(self.DbName))
+
+## Normalize item data for comparison
+#  @param itemData The data of an item or None
+#  @retval The data with an empty description as '', the xml model reads an
+#          empty element back as None
+def _NormalItem(itemData):
+  if itemData is not None and not itemData['description']:
+    itemData = dict(itemData, description='')
+  return itemData
+
+def _Normal(pairs):
+  for title, itemData in pairs:
+    yield title, _NormalItem(itemData)
+
+if __name__ == '__main__':
+  unittest.main()
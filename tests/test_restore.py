@@ -0,0 +1,129 @@
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import chunkstore
+import restore
+import runner
+
+## @package test_restore
+#  Tests that what the runner backs up restores to the files it read
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var FILES
+#  The files of the backed up folder, relative path to size
+FILES = {'small': 10, 'empty': 0, os.path.join('sub', 'medium'): 200000,
+         os.path.join('sub', 'deep', 'large'): 3 * 1024 * 1024 + 5}
+
+class RestoreTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    self.Destination = os.path.join(self._Directory.name, 'backups')
+    generator = random.Random(12)
+    for relative, size in FILES.items():
+      #getrandbits(0) raises before python 3.9
+      self._Write(relative, generator.getrandbits(8 * size).to_bytes(size, 'little') if size else b'')
+    self.Model = bumodel.Model(os.path.join(self._Directory.name, 'PyBakUP.xml'))
+    self.Model.AddBackUpItem(self.Source, 'folder', 'the/item')
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Write(self, relative, data):
+    path = os.path.join(self.Source, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+      file.write(data)
+
+  def _Files(self, top):
+    files = {}
+    for path, relative in runner.WalkFiles(top):
+      with open(path, 'rb') as file:
+        files[relative] = file.read()
+    return files
+
+  ## Back up the item and restore it
+  #  @param self The current instance
+  #  @param name The directory below the temporary one the item is restored to
+  #  @param arguments Keyword arguments of the runner
+  #  @retval The restored files, relative path to contents
+  def _RoundTrip(self, name, **arguments):
+    result = runner.BackupRunner(self.Model, self.Destination, workers=3, **arguments).Run(
+      [('the/item', self.Model.GetBackUpItem(self.Source))])
+    self.assertEqual(result['failed'], {})
+    self.assertEqual(result['succeeded'], ['the/item'])
+    backup = restore.OpenBackup(self.Destination, 'the/item', self.Model.GetBackUpItem(self.Source)['compression'],
+                                arguments.get('store'))
+    target = os.path.join(self._Directory.name, name)
+    summary = restore.Restorer(workers=2).Restore(backup, target)
+    if hasattr(backup, 'Close'):
+      backup.Close()
+    self.assertEqual(summary['failed'], {})
+    return self._Files(target)
+
+  def test_copy(self):
+    self.assertEqual(self._RoundTrip('restored'), self._Files(self.Source))
+
+  def test_compressed(self):
+    self.Model.ModifyItem(self.Source, 'compression', 'gzip:6')
+    self.assertEqual(self._RoundTrip('restored'), self._Files(self.Source))
+
+  def test_incremental(self):
+    self.assertEqual(self._RoundTrip('first', incremental=True), self._Files(self.Source))
+    os.remove(os.path.join(self.Source, 'sub', 'medium'))
+    self._Write('small', b'changed')
+    self._Write('added', b'added')
+    restored = self._RoundTrip('second', incremental=True)
+    self.assertEqual(restored, self._Files(self.Source))
+    self.assertNotIn(os.path.join('sub', 'medium'), restored)
+
+  def test_store(self):
+    store = chunkstore.ChunkStore(os.path.join(self._Directory.name, 'store'))
+    try:
+      self.assertEqual(self._RoundTrip('first', store=store), self._Files(self.Source))
+      os.remove(os.path.join(self.Source, 'small'))
+      restored = self._RoundTrip('second', store=store)
+      self.assertEqual(restored, self._Files(self.Source))
+      self.assertEqual(len(store.Backups('the/item')), 2)
+      older = restore.OpenBackup(self.Destination, 'the/item', store=store, recipe=store.Backups('the/item')[0])
+      try:
+        target = os.path.join(self._Directory.name, 'older')
+        restore.Restorer().RestoreFile(older, 'small', target)
+        self.assertEqual(os.path.getsize(target), FILES['small'])
+        self.assertRaises(KeyError, restore.Restorer().RestoreFile, older, 'missing', target)
+      finally:
+        older.Close()
+    finally:
+      store.Close()
+
+  def test_store_titles_are_exact(self):
+    store = chunkstore.ChunkStore(os.path.join(self._Directory.name, 'store'))
+    try:
+      self.Model.ModifyItem(self.Source, 'title', 'db-logs')
+      runner.BackupRunner(self.Model, self.Destination, store=store).Run(
+        [('db-logs', self.Model.GetBackUpItem(self.Source))])
+      self.assertRaises(KeyError, restore.OpenBackup, self.Destination, 'db', store=store)
+      recipe = store.Backups('db-logs')[-1]
+      self.assertRaises(KeyError, restore.OpenBackup, self.Destination, 'db', store=store, recipe=recipe)
+      backup = restore.OpenBackup(self.Destination, 'db-logs', store=store, recipe=recipe)
+      self.assertEqual(len(backup.Select()), len(FILES))
+      backup.Close()
+    finally:
+      store.Close()
+
+  def test_missing_paths(self):
+    self._RoundTrip('restored')
+    backup = restore.OpenBackup(self.Destination, 'the/item')
+    summary = restore.Restorer().Restore(backup, os.path.join(self._Directory.name, 'part'), ['sub', 'nothing'])
+    self.assertEqual(summary['failed'], {'nothing': 'not in the backup'})
+    self.assertEqual(summary['files'], 2)
+
+if __name__ == '__main__':
+  unittest.main()
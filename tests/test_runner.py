@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import manifest
+import runner
+
+## @package test_runner
+#  Tests of the threaded backup runner
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class RunnerTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Destination = os.path.join(self._Directory.name, 'backups')
+    self.CatalogName = os.path.join(self._Directory.name, 'PyBakUP.xml')
+    self.Model = bumodel.Model(self.CatalogName)
+    for name in ('one', 'two'):
+      source = os.path.join(self._Directory.name, name)
+      os.makedirs(os.path.join(source, 'sub'))
+      for relative in ('a', os.path.join('sub', 'b')):
+        with open(os.path.join(source, relative), 'w') as file:
+          file.write(name + relative)
+      self.Model.AddBackUpItem(source, 'folder', name)
+    self.Model.Save()
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Items(self):
+    return sorted(self.Model.GetBackUpData().items())
+
+  def test_run(self):
+    result = runner.BackupRunner(self.Model, self.Destination, workers=2).Run(self._Items())
+    self.assertEqual(sorted(result['succeeded']), ['one', 'two'])
+    self.assertEqual((result['files'], result['failed']), (4, {}))
+    with open(os.path.join(self.Destination, 'two', 'sub', 'b')) as file:
+      self.assertEqual(file.read(), 'two' + os.path.join('sub', 'b'))
+    saved = bumodel.Model(self.CatalogName)
+    self.assertTrue(all(itemData['last'] != 'never' for itemData in saved.GetBackUpData().values()))
+
+  def test_shared_destination(self):
+    self.Model.ModifyItem(os.path.join(self._Directory.name, 'two'), 'title', 'one')
+    items = [('one', self.Model.GetBackUpItem(os.path.join(self._Directory.name, name))) for name in ('one', 'two')]
+    result = runner.BackupRunner(self.Model, self.Destination).Run(items)
+    self.assertEqual(result['succeeded'], ['one'])
+    self.assertEqual(list(result['failed']), ['one'])
+    self.assertEqual(result['files'], 2)
+
+  def test_corrupt_manifest_fails_only_its_item(self):
+    runner.BackupRunner(self.Model, self.Destination, incremental=True).Run(self._Items())
+    fileName = os.path.join(self.Destination, 'one', manifest.FILE_NAME)
+    with open(fileName, 'w') as file:
+      file.write('{"version": 1, "time": 5}\n["f", "a"\n')
+    self.assertRaises(ValueError, manifest.Manifest, fileName)
+    for name in ('one', 'two'):
+      self.Model.ModifyItem(os.path.join(self._Directory.name, name), 'last', 'never')
+    self.Model.Save()
+
+    result = runner.BackupRunner(self.Model, self.Destination, incremental=True).Run(self._Items())
+    self.assertEqual(result['succeeded'], ['two'])
+    self.assertEqual(list(result['failed']), ['one'])
+    self.assertTrue(os.path.exists(fileName + manifest.CORRUPT_SUFFIX))
+    saved = bumodel.Model(self.CatalogName) #the items that did succeed are saved
+    self.assertNotEqual(saved.GetBackUpItem(os.path.join(self._Directory.name, 'two'))['last'], 'never')
+    self.assertEqual(saved.GetBackUpItem(os.path.join(self._Directory.name, 'one'))['last'], 'never')
+
+    result = runner.BackupRunner(self.Model, self.Destination, incremental=True).Run(self._Items())
+    self.assertEqual(sorted(result['succeeded']), ['one', 'two'])
+    self.assertEqual(sorted(manifest.Manifest(fileName).Entries), ['a', os.path.join('sub', 'b')])
+
+  def test_missing_source_fails_only_its_item(self):
+    os.rename(os.path.join(self._Directory.name, 'one'), os.path.join(self._Directory.name, 'gone'))
+    result = runner.BackupRunner(self.Model, self.Destination).Run(self._Items())
+    self.assertEqual(result['succeeded'], ['two'])
+    self.assertEqual(list(result['failed']), ['one'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,140 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import scheduler
+
+## @package test_scheduler
+#  Tests of the due time scheduler
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var DAY
+#  Seconds in a day
+DAY = 86400
+
+## A runner that records the items it is given
+#  Like runner.BackupRunner it sets the last backup time of the items that succeed,
+#  to its Now attribute.
+class _Runner(object):
+
+  def __init__(self, model, failed=()):
+    self.Model = model
+    self.Runs = []
+    self.Failed = failed
+    self.Now = 0.0
+
+  def Run(self, items):
+    self.Runs.append(sorted(title for title, itemData in items))
+    for title, itemData in items:
+      if title not in self.Failed:
+        self.Model.ModifyItem(itemData['source'], 'last', repr(self.Now))
+    return {'failed': dict((title, ['failed']) for title, itemData in items if title in self.Failed)}
+
+class NextDueTest(unittest.TestCase):
+
+  def test_solved(self):
+    self.assertEqual(scheduler.NextDue('LastBU > 3 days', 1000, 2000), 1000 + 3 * DAY + scheduler.EPSILON)
+    self.assertEqual(scheduler.NextDue('LastBU >= 3 days', 1000, 2000), 1000 + 3 * DAY)
+    self.assertEqual(scheduler.NextDue('LastBU > 3 days', None, 2000), 2000)
+    self.assertEqual(scheduler.NextDue('LastBU > 3 days', 1000, 10 * DAY), 10 * DAY)
+    self.assertEqual(scheduler.NextDue('LastBU + 1 day > 3 days || False', 1000, 2000),
+                     1000 + 2 * DAY + scheduler.EPSILON)
+    self.assertIsNone(scheduler.NextDue('LastBU < 1 day', 1000, 10 * DAY))
+    self.assertIsNone(scheduler.NextDue('False', 1000, 2000))
+
+  def test_modified(self):
+    self.assertIs(scheduler.NextDue('Modified && LastBU > 1 day', 0, 100), scheduler.UNSOLVABLE)
+    self.assertEqual(scheduler.NextDue('Modified && LastBU > 1 day', 0, 100, modified=True), DAY + scheduler.EPSILON)
+    self.assertIsNone(scheduler.NextDue('Modified && LastBU > 1 day', 0, 100, modified=False))
+
+class SchedulerTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Model = bumodel.Model(os.path.join(self._Directory.name, 'PyBakUP.xml'))
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def _Add(self, source, title, condition, last='never'):
+    self.Model.AddBackUpItem(source, 'folder', title)
+    self.Model.ModifyItem(source, 'condition', condition)
+    self.Model.ModifyItem(source, 'last', last)
+
+  def test_runs_items_when_due(self):
+    self._Add('/daily', 'daily', 'LastBU > 1 day', '0.0')
+    self._Add('/never', 'never', 'LastBU > 1 day')
+    self._Add('/off', 'off', 'False')
+    runner = _Runner(self.Model)
+    daemon = scheduler.Scheduler(self.Model, runner)
+    daemon.Schedule(100.0)
+    self.assertEqual(daemon.NextWakeUp(), 100.0)
+    runner.Now = 100.0
+    self.assertEqual([title for title, itemData in daemon.RunPending(100.0)], ['never'])
+    self.assertEqual(daemon.NextWakeUp(), DAY + scheduler.EPSILON)
+    self.assertEqual(daemon.RunPending(DAY), [])
+    runner.Now = DAY + 1.0
+    self.assertEqual([title for title, itemData in daemon.RunPending(DAY + 1)], ['daily'])
+    self.assertEqual(runner.Runs, [['never'], ['daily']])
+    self.assertEqual(daemon.NextWakeUp(), 100.0 + DAY + scheduler.EPSILON)
+
+  def test_failed_items_are_retried(self):
+    self._Add('/item', 'item', 'True')
+    daemon = scheduler.Scheduler(self.Model, _Runner(self.Model, failed=['item']), recheck=60)
+    daemon.Schedule(0.0)
+    daemon.RunPending(0.0)
+    self.assertEqual(daemon.NextWakeUp(), 60.0)
+
+  def test_modified_either_way(self):
+    self._Add('/changed', 'changed', 'Modified && LastBU > 1 day', '0.0')
+    self._Add('/unchanged', 'unchanged', 'Modified == False && LastBU > 1 day', '0.0')
+    runner = _Runner(self.Model)
+    daemon = scheduler.Scheduler(self.Model, runner, recheck=60)
+    daemon.Schedule(100.0)
+    self.assertEqual(daemon.NextWakeUp(), DAY + scheduler.EPSILON)
+    self.assertEqual(len(daemon._Heap), 2)
+    #without a change index Modified never holds
+    runner.Now = DAY + 1.0
+    self.assertEqual([title for title, itemData in daemon.RunPending(DAY + 1)], ['unchanged'])
+    self.assertEqual(daemon.NextWakeUp(), daemon._NextRecheck(DAY + 1))
+
+  def test_broken_items_are_left_out(self):
+    self._Add('/broken', 'broken', 'LastBU >')
+    self._Add('/badlast', 'badlast', 'True', 'yesterday')
+    self._Add('/fine', 'fine', 'True')
+    daemon = scheduler.Scheduler(self.Model, _Runner(self.Model))
+    daemon.Schedule(0.0)
+    self.assertEqual(sorted(daemon.Errors), ['/badlast', '/broken'])
+    self.assertEqual([title for title, itemData in daemon.RunPending(0.0)], ['fine'])
+    self.Model.ModifyItem('/badlast', 'last', '0.0')
+    daemon.Reschedule('/badlast', 0.0)
+    self.assertEqual(daemon.NextWakeUp(), 0.0)
+    self.assertEqual(sorted(daemon.Errors), ['/broken'])
+    self.assertEqual(sorted(title for title, itemData in daemon.RunPending(0.0)), ['badlast', 'fine'])
+
+  def test_reschedule(self):
+    self._Add('/item', 'item', 'LastBU > 1 day', '0.0')
+    daemon = scheduler.Scheduler(self.Model)
+    daemon.Schedule(0.0)
+    self.Model.ModifyItem('/item', 'condition', 'LastBU > 2 days')
+    daemon.Reschedule('/item', 0.0)
+    self.assertEqual(daemon.NextWakeUp(), 2 * DAY + scheduler.EPSILON)
+    self.Model.RemoveBackUpItem('/item')
+    daemon.Reschedule('/item', 0.0)
+    self.assertIsNone(daemon.NextWakeUp())
+
+  def test_shared_titles_take_turns(self):
+    self._Add('/one', 'same', 'True')
+    self._Add('/two', 'same', 'True')
+    daemon = scheduler.Scheduler(self.Model, _Runner(self.Model))
+    daemon.Schedule(0.0)
+    sources = [itemData['source'] for title, itemData in daemon.RunPending(0.0)]
+    sources += [itemData['source'] for title, itemData in daemon.RunPending(0.0)]
+    self.assertEqual(sorted(sources), ['/one', '/two'])
+
+if __name__ == '__main__':
+  unittest.main()
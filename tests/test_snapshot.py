@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import snapshot
+
+## @package test_snapshot
+#  Tests of the memory mapped snapshot of the catalog
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+class SnapshotTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.XmlName = os.path.join(self._Directory.name, 'PyBakUP.xml')
+    self.FileName = os.path.join(self._Directory.name, 'PyBakUP.snapshot')
+    self.Model = bumodel.Model(self.XmlName)
+    for number in range(300): #enough for the probes to collide
+      self.Model.AddBackUpItem('/data/item%d' % number, 'folder' if number % 3 else 'file',
+                               'item %d' % (number % 250), 'described' if number % 2 else '')
+    self.Model.AddBackUpItem('/données/élément', 'file', 'élément', 'ünïcode')
+    self.Model.ModifyItem('/data/item7', 'last', '1700000000.25')
+    self.Model.ModifyItem('/data/item7', 'compression', 'gzip:6')
+    self.Model.ModifyItem('/data/item7', 'group', 'nightly')
+    self.Model.Save()
+
+  def tearDown(self):
+    self._Directory.cleanup()
+
+  def test_items(self):
+    self.assertEqual(snapshot.WriteSnapshot(self.FileName, self.Model.IterBackUpData()), 301)
+    with snapshot.Snapshot(self.FileName) as mapped:
+      self.assertEqual(len(mapped), 301)
+      self.assertEqual(list(mapped.IterBackUpData()), list(self.Model.IterBackUpData()))
+      self.assertEqual(mapped.GetBackUpData(), self.Model.GetBackUpData())
+      self.assertEqual(mapped[-1], mapped[300])
+      self.assertRaises(IndexError, mapped.__getitem__, 301)
+      for title, itemData in self.Model.IterBackUpData():
+        self.assertEqual(mapped.GetBackUpItem(itemData['source']), self.Model.GetBackUpItem(itemData['source']))
+      self.assertEqual(mapped.GetBackUpItem('/données/élément')['description'], 'ünïcode')
+      self.assertIsNone(mapped.GetBackUpItem('/data/missing'))
+      self.assertIsNone(mapped.Find('/data/item'))
+
+  def test_streamed_catalog(self):
+    snapshot.WriteSnapshot(self.FileName, bumodel.StreamBackUpData(self.XmlName))
+    with snapshot.Snapshot(self.FileName) as mapped:
+      self.assertEqual(list(mapped), list(bumodel.StreamBackUpData(self.XmlName)))
+
+  def test_empty(self):
+    self.assertEqual(snapshot.WriteSnapshot(self.FileName, []), 0)
+    with snapshot.Snapshot(self.FileName) as mapped:
+      self.assertEqual((len(mapped), list(mapped), mapped.Find('/data/item1')), (0, [], None))
+
+  def test_not_a_snapshot(self):
+    for data in (b'', b'PyBakSn1' + bytes(16), b"<?xml version='1.0' encoding='utf-8'?>\n<backdb><bl/></backdb>"):
+      with open(self.FileName, 'wb') as file:
+        file.write(data)
+      self.assertRaises(ValueError, snapshot.Snapshot, self.FileName)
+
+  def test_failed_write_keeps_the_old_snapshot(self):
+    snapshot.WriteSnapshot(self.FileName, self.Model.IterBackUpData())
+    def broken():
+      yield 'title', {'source': '/partial'}
+    self.assertRaises(KeyError, snapshot.WriteSnapshot, self.FileName, broken())
+    with snapshot.Snapshot(self.FileName) as mapped:
+      self.assertEqual(len(mapped), 301)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,181 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import compress
+import copier
+import runner
+import throttle
+
+## @package test_throttle
+#  Tests of the rate limits and the adaptive concurrency of the backup runner
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var MB
+#  Bytes in a megabyte
+MB = 1 << 20
+
+## A clock that only moves when it is slept on
+#  It stands in for the time module inside throttle, so waits take no time.
+class _Clock(object):
+
+  def __init__(self):
+    self.Now = 1000.0
+    self.Slept = []
+
+  def monotonic(self):
+    return self.Now
+
+  def time(self):
+    return self.Now
+
+  def localtime(self, seconds=None):
+    return time.localtime(seconds)
+
+  def sleep(self, seconds):
+    self.Slept.append(seconds)
+    self.Now += seconds
+
+class _ClockTest(unittest.TestCase):
+
+  def setUp(self):
+    self.Clock = _Clock()
+    self._Time = throttle.time
+    throttle.time = self.Clock
+
+  def tearDown(self):
+    throttle.time = self._Time
+
+class TokenBucketTest(_ClockTest):
+
+  def test_rate(self):
+    bucket = throttle.TokenBucket(100)
+    self.assertEqual(bucket.Take(100), 0.0) #the bucket starts full
+    self.assertEqual(bucket.Take(50), 0.5)
+    self.assertEqual(bucket.Take(250), 2.5) #larger than the burst, paid back by waiting
+    self.Clock.Now += 10
+    self.assertEqual(bucket.Take(100), 0.0) #refilled, but only up to the burst
+    self.assertEqual(bucket.Take(1), 0.01)
+    self.assertEqual((bucket.Waited, bucket.Throttled), (3.01, 3))
+    self.assertEqual(self.Clock.Slept, [0.5, 2.5, 0.01])
+
+class LimitTest(unittest.TestCase):
+
+  def test_hours(self):
+    noon = time.mktime((2026, 10, 18, 12, 0, 0, 0, 0, -1))
+    night = time.mktime((2026, 10, 18, 23, 30, 0, 0, 0, -1))
+    self.assertTrue(throttle.Limit(1).Active(noon))
+    self.assertTrue(throttle.Limit(1, hours=(9, 18)).Active(noon))
+    self.assertFalse(throttle.Limit(1, hours=(9, 18)).Active(night))
+    self.assertTrue(throttle.Limit(1, hours=(22, 6)).Active(night))
+    self.assertFalse(throttle.Limit(1, hours=(22, 6)).Active(noon))
+    self.assertRaises(ValueError, throttle.Limit, 1, None, (9, 25))
+
+class ThrottleTest(_ClockTest):
+
+  def test_destination_and_groups(self):
+    limits = throttle.Throttle(throttle.Limit(bytes=100), {'slow': throttle.Limit(bytes=10, iops=1)})
+    self.assertTrue(limits)
+    self.assertFalse(throttle.Throttle())
+    self.assertEqual(limits.Charge('fast', 100), 0.0)
+    self.assertEqual(limits.Charge('fast', 50), 0.5)
+    self.Clock.Now += 10
+    self.assertEqual(limits.Charge('slow', 10), 0.0)
+    self.assertEqual(limits.Charge('slow', 10), 1.0) #on the group's bytes, its file is paid for meanwhile
+    self.assertEqual(limits.Charge('slow', 0), 1.0) #on the group's files
+    report = limits.Report()
+    self.assertEqual(report['destination']['throttled'], 1)
+    self.assertEqual(report['groups']['slow']['throttled'], 2)
+    self.assertEqual(report['groups']['slow']['waited'], 2.0)
+
+  def test_blocks_dont_pay_for_operations(self):
+    limits = throttle.Throttle(throttle.Limit(bytes=100, iops=1))
+    self.assertEqual(limits.Charge('group', 0), 0.0) #the file is opened
+    self.assertEqual(limits.Charge('group', 100, 0), 0.0)
+    self.assertEqual(limits.Charge('group', 50, 0), 0.5) #only the bytes are owed
+    self.assertEqual(limits.Charge('group', 0), 0.5) #the next file owes a second of operations, half of it passed
+
+  def test_inactive_limit(self):
+    noon = time.mktime((2026, 10, 18, 12, 0, 0, 0, 0, -1))
+    self.Clock.Now = noon
+    limits = throttle.Throttle(throttle.Limit(bytes=1, hours=(22, 6)))
+    self.assertEqual(limits.Charge('group', 1000), 0.0)
+    self.assertFalse(limits.Report()['destination']['active'])
+
+class AdaptiveConcurrencyTest(_ClockTest):
+
+  def test_fixed(self):
+    concurrency = throttle.AdaptiveConcurrency(8, adaptive=False)
+    self.assertEqual(concurrency.Limit, 8)
+    concurrency.Enter()
+    self.Clock.Now += 1
+    concurrency.Leave(MB, 100.0)
+    self.assertEqual(concurrency.Limit, 8)
+
+  def test_grows_while_it_pays_off(self):
+    concurrency = throttle.AdaptiveConcurrency(8, initial=2)
+    for window in range(1, 4): #every slot is busy and the throughput keeps climbing
+      for _ in range(concurrency.Limit):
+        concurrency.Enter()
+      self.Clock.Now += throttle.INTERVAL
+      concurrency.Leave(window * MB, 0.1 * window)
+      self.assertEqual(concurrency.Limit, 2 + window)
+      for _ in range(concurrency.Limit - 2):
+        concurrency.Leave(0, 0.0)
+    self.assertEqual(concurrency.Limit, 5)
+    self.assertEqual(concurrency.Report()['increases'], 3)
+
+  def test_halves_when_the_latency_climbs(self):
+    concurrency = throttle.AdaptiveConcurrency(8, initial=8)
+    concurrency.Enter()
+    self.Clock.Now += throttle.INTERVAL
+    concurrency.Leave(MB, 0.1)
+    concurrency.Enter()
+    self.Clock.Now += throttle.INTERVAL
+    concurrency.Leave(MB, 1.0)
+    self.assertEqual(concurrency.Limit, 4)
+    self.assertEqual(concurrency.Report()['lowest'], 4)
+
+class RunnerTest(_ClockTest):
+
+  def setUp(self):
+    _ClockTest.setUp(self)
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    os.makedirs(self.Source)
+    with open(os.path.join(self.Source, 'big'), 'wb') as file:
+      file.write(b'x' * (3 * MB + MB // 2))
+    self.Model = bumodel.Model(os.path.join(self._Directory.name, 'PyBakUP.xml'))
+    self.Model.AddBackUpItem(self.Source, 'folder', 'item')
+    self._Unsupported = set(copier._unsupported)
+    copier._unsupported.add('reflink') #a clone moves no bytes to charge
+
+  def tearDown(self):
+    copier._unsupported.clear()
+    copier._unsupported.update(self._Unsupported)
+    self._Directory.cleanup()
+    _ClockTest.tearDown(self)
+
+  def _Run(self, compression='none'):
+    self.Model.ModifyItem(self.Source, 'compression', compression)
+    backups = runner.BackupRunner(self.Model, os.path.join(self._Directory.name, compression), workers=1,
+                                  compressor=compress.ParallelCompressor(0, blockSize=MB),
+                                  limit=throttle.Limit(bytes=MB))
+    return backups.Run([('item', self.Model.GetBackUpItem(self.Source))])
+
+  def test_bytes_are_charged_per_block(self):
+    for compression in ('none', 'gzip'):
+      del self.Clock.Slept[:]
+      result = self._Run(compression)
+      self.assertEqual(result['succeeded'], ['item'])
+      #the first megabyte is in the bucket, the rest is paid as it is copied instead of all up front
+      self.assertEqual(self.Clock.Slept, [1.0, 1.0, 0.5], compression)
+      self.assertEqual(result['limits']['destination']['waited'], 2.5)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bumodel
+import sqlmodel
+import watcher
+
+## @package test_watcher
+#  Tests of the inotify watcher and its change journal
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+try:
+  watcher.Inotify().Close()
+  _INOTIFY = True
+except OSError:
+  _INOTIFY = False
+
+@unittest.skipUnless(_INOTIFY, 'inotify is not available')
+class WatcherTest(unittest.TestCase):
+
+  def setUp(self):
+    self._Directory = tempfile.TemporaryDirectory()
+    self.Source = os.path.join(self._Directory.name, 'source')
+    os.makedirs(os.path.join(self.Source, 'sub'))
+    self.CatalogName = os.path.join(self._Directory.name, 'PyBakUP.xml')
+    self.Model = bumodel.Model(self.CatalogName)
+    self.Model.AddBackUpItem(self.Source, 'folder', 'item')
+    self.Model.Save()
+    self.Journal = watcher.ChangeJournal(os.path.join(self._Directory.name, 'watch.db'))
+    self.Watcher = watcher.Watcher(self.Model, self.Journal)
+    self.Watcher.Refresh()
+    self.Started = time.time()
+
+  def tearDown(self):
+    self.Watcher.Close()
+    self.Journal.Close()
+    self._Directory.cleanup()
+
+  def _Poll(self):
+    for _ in range(20):
+      if self.Watcher.Poll(0.1):
+        return
+
+  def test_changes_are_recorded(self):
+    self.assertTrue(self.Journal.IsTracked(self.Source, self.Started))
+    self.assertFalse(self.Journal.IsDirty(self.Source, self.Started))
+    with open(os.path.join(self.Source, 'sub', 'file'), 'w') as file:
+      file.write('data')
+    self._Poll()
+    self.assertTrue(self.Journal.IsDirty(self.Source, self.Started))
+    self.assertIn(os.path.join('sub', 'file'), self.Journal.DirtyPaths(self.Source, self.Started))
+    self.Journal.Clear(self.Source, time.time() + 1)
+    self.assertFalse(self.Journal.IsDirty(self.Source, self.Started))
+
+  def test_new_directories_are_watched(self):
+    os.makedirs(os.path.join(self.Source, 'new'))
+    self._Poll()
+    since = time.time()
+    with open(os.path.join(self.Source, 'new', 'file'), 'w') as file:
+      file.write('data')
+    self._Poll()
+    self.assertIn(os.path.join('new', 'file'), self.Journal.DirtyPaths(self.Source, since))
+
+  def test_items_saved_by_another_process(self):
+    other = os.path.join(self._Directory.name, 'other')
+    os.makedirs(other)
+    cli = bumodel.Model(self.CatalogName) #the catalog as the CLI opens it
+    cli.AddBackUpItem(other, 'folder', 'other')
+    cli.RemoveBackUpItem(self.Source)
+    cli.Save()
+    self.Watcher.Refresh()
+    self.assertTrue(self.Journal.IsTracked(other, time.time()))
+    self.assertFalse(self.Journal.IsTracked(self.Source, time.time()))
+
+  def test_unwatchable_items_are_retried(self):
+    scandir = os.scandir
+    def failing(path):
+      if path == self.Source:
+        raise PermissionError(13, 'Permission denied', path)
+      return scandir(path)
+    self.Watcher.Model.RemoveBackUpItem(self.Source)
+    self.Watcher.Model.Save()
+    self.Watcher.Refresh()
+    self.Watcher.Model.AddBackUpItem(self.Source, 'folder', 'item')
+    self.Watcher.Model.Save()
+    os.scandir = failing
+    try:
+      self.Watcher.Refresh()
+    finally:
+      os.scandir = scandir
+    self.assertFalse(self.Journal.IsTracked(self.Source, time.time()))
+    self.Watcher.Refresh()
+    self.assertTrue(self.Journal.IsTracked(self.Source, time.time()))
+
+  def test_stopped_watcher_is_not_trusted(self):
+    self.Journal.Beat(0)
+    self.assertFalse(self.Journal.IsTracked(self.Source, time.time()))
+
+@unittest.skipUnless(_INOTIFY, 'inotify is not available')
+class SqliteWatcherTest(unittest.TestCase):
+
+  def test_items_saved_by_another_process(self):
+    with tempfile.TemporaryDirectory() as directory:
+      fileName = os.path.join(directory, 'PyBakUP.db')
+      model = sqlmodel.SqliteModel(fileName)
+      journal = watcher.ChangeJournal(os.path.join(directory, 'watch.db'))
+      watching = watcher.Watcher(model, journal)
+      try:
+        watching.Refresh()
+        cli = sqlmodel.SqliteModel(fileName)
+        cli.AddBackUpItem(directory, 'folder', 'item')
+        cli.Close()
+        watching.Refresh()
+        self.assertTrue(journal.IsTracked(directory, time.time()))
+      finally:
+        watching.Close()
+        journal.Close()
+        model.Close()
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,293 @@
+import threading
+import time
+
+## @package throttle
+#  This contains the concurrency and rate limits of the backup runner
+#
+#  AdaptiveConcurrency decides how many files are copied at once. It is an AIMD
+#  controller: every INTERVAL it compares the throughput and the latency of the
+#  last window with what it has seen before. The latency is the time the files
+#  took per byte they moved, each file also counting as FILE_COST bytes for its
+#  open, stat and close, so a window of large files isn't mistaken for a slow
+#  disk and a window of empty files still has a latency. While the latency stays
+#  near its baseline and more concurrency still buys throughput it adds a slot,
+#  once the latency climbs past LATENCY_FACTOR times the baseline, the sign of a
+#  saturated disk or of a busy host, it halves the slots. Fast storage ends up
+#  with many files in flight and a spinning disk with few.
+#
+#  Limit describes a byte and an operation budget, optionally only during some
+#  hours of the day, and Throttle enforces one Limit for the destination and one
+#  per item group with token buckets.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var INTERVAL
+#  Seconds between adjustments of the concurrency
+INTERVAL = 0.5
+
+## @var LATENCY_FACTOR
+#  The concurrency is halved once the latency exceeds its baseline by this factor
+LATENCY_FACTOR = 1.5
+
+## @var FILE_COST
+#  The bytes every file counts as on top of its size when measuring the latency,
+#  roughly what a disk reads in the time it spends opening a file
+FILE_COST = 64 * 1024
+
+## @var INITIAL
+#  The concurrency a run starts with, it climbs from there one slot per window
+INITIAL = 4
+
+## @var GAIN
+#  The concurrency only grows while the throughput of a window beats the best one
+#  by this factor
+GAIN = 1.05
+
+## A token bucket
+#  This class spreads amounts taken from it out to a rate. An amount larger
+#  than the bucket holds is allowed and paid back by waiting, so the rate is kept
+#  on average whatever the sizes of the amounts. It can be used from several
+#  threads at once.
+class TokenBucket(object):
+
+  ## Constructor
+  #  @param self The current object being constructed
+  #  @param rate The amount refilled per second
+  #  @param burst (Optional)The most the bucket holds, by default one second of rate
+  def __init__(self, rate, burst=None):
+    self.Rate = float(rate)
+    self.Burst = float(burst or rate)
+    ## @var Waited
+    #  The seconds callers spent waiting on the bucket
+    self.Waited = 0.0
+    ## @var Throttled
+    #  How many takes had to wait
+    self.Throttled = 0
+    self._Tokens = self.Burst
+    self._Time = time.monotonic()
+    self._Lock = threading.Lock()
+
+  ## Take an amount
+  #  @pre  None
+  #  @post The amount is paid, waiting first if the bucket is in debt
+  #  @param self The current instance
+  #  @param amount The amount taken
+  #  @retval float The seconds waited
+  def Take(self, amount):
+    with self._Lock:
+      now = time.monotonic()
+      self._Tokens = min(self.Burst, self._Tokens + (now - self._Time) * self.Rate)
+      self._Time = now
+      self._Tokens -= amount
+      wait = -self._Tokens / self.Rate if self._Tokens < 0 else 0.0
+      if wait:
+        self.Waited += wait
+        self.Throttled += 1
+    if wait: #the debt is reserved, so other callers queue up behind it while this one sleeps
+      time.sleep(wait)
+    return wait
+
+## A byte and operation budget
+#  This class holds the rates a Throttle enforces.
+class Limit(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param bytes (Optional)Bytes per second, None for no limit
+  #  @param iops (Optional)Files per second, None for no limit
+  #  @param hours (Optional)A (start, end) pair of local hours the limit applies
+  #         in, (9, 18) for business hours or (22, 6) across midnight. By default
+  #         it always applies.
+  #  @exception ValueError An hour is out of range
+  def __init__(self, bytes=None, iops=None, hours=None):
+    if hours is not None and not all(0 <= hour <= 24 for hour in hours):
+      raise ValueError("hours must be between 0 and 24")
+    self.Bytes = bytes
+    self.Iops = iops
+    self.Hours = tuple(hours) if hours is not None else None
+
+  ## Check whether the limit applies
+  #  @param self The current instance
+  #  @param now (Optional)The time as a timestamp, by default the current time
+  #  @retval bool True if the limit applies at that time
+  def Active(self, now=None):
+    if self.Hours is None:
+      return True
+    moment = time.localtime(now)
+    hour = moment.tm_hour + moment.tm_min / 60.0
+    start, end = self.Hours
+    if start <= end:
+      return start <= hour < end
+    return hour >= start or hour < end
+
+  ## Describe the limit
+  #  @param self The current instance
+  #  @retval dictionary The bytes, iops and hours of the limit
+  def Report(self):
+    return {'bytes': self.Bytes, 'iops': self.Iops, 'hours': list(self.Hours) if self.Hours else None}
+
+## The rate limits of a run
+#  This class enforces a Limit for the whole destination and one per item group.
+#  It can be used from several threads at once.
+class Throttle(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param limit (Optional)The Limit of the destination
+  #  @param groups (Optional)A dictionary mapping item groups to their Limit
+  def __init__(self, limit=None, groups=None):
+    self.Limit = limit
+    self.Groups = dict(groups or {})
+    self._Buckets = {}
+    self._Lock = threading.Lock()
+
+  ## Check for limits
+  #  @param self The current instance
+  #  @retval bool True if there is any limit to enforce
+  def __bool__(self):
+    return self.Limit is not None or bool(self.Groups)
+
+  ## Pay for an operation
+  #  @pre  None
+  #  @post The operation fits the destination's and the group's budgets that
+  #        apply now, waiting first if it didn't
+  #  @param self The current instance
+  #  @param group The group of the item
+  #  @param bytes The bytes the operation reads
+  #  @param operations (Optional)The number of file operations
+  #  @retval float The seconds waited
+  #  @note A file is charged its operation before it is opened, with 0 bytes, and
+  #        then its bytes block by block with 0 operations. A zero amount doesn't
+  #        touch its bucket, so a block never waits on the operation budget.
+  def Charge(self, group, bytes, operations=1):
+    waited = 0.0
+    now = time.time()
+    for key, limit in ((None, self.Limit), (group, self.Groups.get(group))):
+      if limit is None or not limit.Active(now):
+        continue
+      byteBucket, operationBucket = self._BucketsOf(key, limit)
+      if byteBucket is not None and bytes:
+        waited += byteBucket.Take(bytes)
+      if operationBucket is not None and operations:
+        waited += operationBucket.Take(operations)
+    return waited
+
+  ## Describe the limits
+  #  @param self The current instance
+  #  @retval dictionary The 'destination' limit and the limit of every group in
+  #          'groups', each with whether it applies now, the seconds spent waiting
+  #          on it and how many operations it held back
+  def Report(self):
+    now = time.time()
+    def describe(key, limit):
+      report = limit.Report()
+      report['active'] = limit.Active(now)
+      buckets = self._Buckets.get(key, (None, None))
+      report['waited'] = sum(bucket.Waited for bucket in buckets if bucket is not None)
+      report['throttled'] = sum(bucket.Throttled for bucket in buckets if bucket is not None)
+      return report
+    with self._Lock:
+      return {'destination': describe(None, self.Limit) if self.Limit is not None else None,
+              'groups': dict((group, describe(group, limit)) for group, limit in self.Groups.items())}
+
+  def _BucketsOf(self, key, limit):
+    with self._Lock:
+      buckets = self._Buckets.get(key)
+      if buckets is None:
+        buckets = self._Buckets[key] = (TokenBucket(limit.Bytes) if limit.Bytes else None,
+                                        TokenBucket(limit.Iops) if limit.Iops else None)
+      return buckets
+
+## An AIMD concurrency limit
+#  This class is a gate the workers pass through around every file. It can be
+#  used from several threads at once.
+class AdaptiveConcurrency(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None
+  #  @param self The current object being constructed
+  #  @param maximum The most files in flight, the number of workers
+  #  @param initial (Optional)The starting limit, by default INITIAL
+  #  @param minimum (Optional)The fewest files in flight
+  #  @param adaptive (Optional)Set to False to keep the limit at maximum
+  def __init__(self, maximum, initial=None, minimum=1, adaptive=True):
+    self.Maximum = maximum
+    self.Minimum = min(minimum, maximum)
+    self.Adaptive = adaptive
+    ## @var Limit
+    #  The current number of files allowed in flight
+    self.Limit = maximum if not adaptive else max(self.Minimum, min(maximum, initial or INITIAL))
+    self._Initial = self.Limit
+    self._Lowest = self._Highest = self.Limit
+    self._Active = 0
+    self._Condition = threading.Condition()
+    self._WindowStart = time.monotonic()
+    self._WindowBytes = 0
+    self._WindowFiles = 0
+    self._WindowSeconds = 0.0
+    self._Baseline = None
+    self._Best = 0.0
+    self._Increases = self._Decreases = 0
+
+  ## Wait for a slot
+  #  @param self The current instance
+  def Enter(self):
+    with self._Condition:
+      while self._Active >= self.Limit:
+        self._Condition.wait()
+      self._Active += 1
+
+  ## Give a slot back
+  #  @pre  Enter() was called
+  #  @post The file is counted in the current window, which may adjust the limit
+  #  @param self The current instance
+  #  @param bytes The bytes the file moved
+  #  @param seconds The time the file took
+  def Leave(self, bytes, seconds):
+    with self._Condition:
+      self._Active -= 1
+      self._WindowBytes += bytes
+      self._WindowFiles += 1
+      self._WindowSeconds += seconds
+      now = time.monotonic()
+      if self.Adaptive and now - self._WindowStart >= INTERVAL:
+        self._Adjust(now)
+      self._Condition.notify_all()
+
+  ## Describe the limit
+  #  @param self The current instance
+  #  @retval dictionary The initial, current, lowest and highest limits, the bounds
+  #          and how often the limit went up and down
+  def Report(self):
+    with self._Condition:
+      return {'initial': self._Initial, 'limit': self.Limit, 'lowest': self._Lowest, 'highest': self._Highest,
+              'minimum': self.Minimum, 'maximum': self.Maximum, 'adaptive': self.Adaptive,
+              'increases': self._Increases, 'decreases': self._Decreases}
+
+  ## End a window and adjust the limit
+  #  @pre  The condition is held
+  #  @param self The current instance
+  #  @param now The monotonic time
+  def _Adjust(self, now):
+    throughput = self._WindowBytes / (now - self._WindowStart)
+    latency = self._WindowSeconds / (self._WindowBytes + self._WindowFiles * FILE_COST)
+    #the baseline follows the best latency seen and slowly forgets it, as the mix of files changes
+    self._Baseline = latency if self._Baseline is None else min(latency, self._Baseline * 1.1)
+    if latency > LATENCY_FACTOR * self._Baseline:
+      self.Limit = max(self.Minimum, self.Limit // 2)
+      self._Decreases += 1
+      self._Best = throughput
+    elif throughput >= self._Best * GAIN and self.Limit < self.Maximum and self._Active + 1 >= self.Limit:
+      self.Limit += 1 #only grows while the slots are in use and paying off
+      self._Increases += 1
+    self._Best = max(self._Best * 0.95, throughput) #decays so a plateau is probed again now and then
+    self._Lowest = min(self._Lowest, self.Limit)
+    self._Highest = max(self._Highest, self.Limit)
+    self._WindowStart = now
+    self._WindowBytes = self._WindowFiles = 0
+    self._WindowSeconds = 0.0
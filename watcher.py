@@ -0,0 +1,480 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import sqlite3
+import struct
+import sys
+import time
+
+## @package watcher
+#  This contains the inotify watcher that keeps a journal of changed paths
+#
+#  Checking whether a folder item changed, or finding what changed in it, means
+#  walking the whole tree. On linux the watcher can keep an inotify watch on every
+#  directory of the folder items instead and record each path that changes in a
+#  persistent change journal. change_index answers Modified from the journal and
+#  incremental runs only diff the paths it lists, so neither walks the tree.
+#
+#  The journal is only trusted for an item while the watcher is running (it
+#  writes a heartbeat) and has been watching the item without interruption since
+#  the point the question is asked about. If inotify runs out of watches or drops
+#  events the affected items stop being trusted, which is logged, and they are
+#  scanned as before until they have been backed up again under a working watch.
+#  The same goes for an item with a directory that can't be watched or listed.
+#
+#  Folder items added to or removed from the model are picked up every refresh
+#  interval, when items that couldn't be watched are also tried again. The items
+#  are read as saved, so the changes other processes (the CLI or the GUI) make to
+#  the catalog are picked up as well.
+#
+#  Events reach the journal within a poll interval of happening, so a change made
+#  just before a check may only be seen by the next one.
+#  @author Barrett Hostetter-Lewis
+#  @date 10/18/2026
+
+## @var _SCHEMA
+#  The statements that create the journal. They are safe to run on an existing one.
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS items (
+  item  TEXT PRIMARY KEY,
+  since REAL
+);
+CREATE TABLE IF NOT EXISTS dirty (
+  item TEXT NOT NULL,
+  path TEXT NOT NULL,
+  time REAL NOT NULL,
+  PRIMARY KEY (item, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS session (
+  id        INTEGER PRIMARY KEY CHECK (id = 0),
+  pid       INTEGER NOT NULL,
+  heartbeat REAL NOT NULL
+);
+'''
+
+## @var HEARTBEAT
+#  Seconds between the watcher's heartbeats. It also bounds how long events wait
+#  before they are written to the journal.
+HEARTBEAT = 5
+
+## @var STALE
+#  A heartbeat older than this means the watcher is gone
+STALE = 3 * HEARTBEAT
+
+## @var REFRESH
+#  The default seconds between the times the watcher rereads the folder items of
+#  the model
+REFRESH = 60
+
+#inotify flags, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+## @var WATCH_MASK
+#  The events watched on every directory
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+## @var _EVENT
+#  The fixed part of struct inotify_event: wd, mask, cookie and the name length
+_EVENT = struct.Struct('iIII')
+
+## The persistent change journal
+#  This class stores the paths the watcher saw change, per folder item, and tells
+#  the readers when they can rely on it.
+class ChangeJournal(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post The journal database exists with the current schema
+  #  @param self The current object being constructed
+  #  @param fileName (Optional)The path of the journal database
+  def __init__(self, fileName='PyBakUP.watch.db'):
+    #the watcher and the runner's worker threads take turns on the connection
+    self._Connection = sqlite3.connect(fileName, timeout=30, check_same_thread=False)
+    self._Connection.execute('PRAGMA journal_mode=WAL')
+    self._Connection.execute('PRAGMA synchronous=NORMAL')
+    self._Connection.executescript(_SCHEMA)
+
+  ## Close the journal
+  #  @param self The current instance
+  def Close(self):
+    self._Connection.close()
+
+  ## Check if the journal covers an item
+  #  @pre  None
+  #  @post None
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  #  @param since The timestamp the caller wants the changes since
+  #  @retval bool True if a live watcher has watched the whole item since then
+  def IsTracked(self, source, since):
+    if since is None:
+      return False
+    row = self._Connection.execute('SELECT heartbeat FROM session WHERE id = 0').fetchone()
+    if row is None or row[0] < time.time() - STALE:
+      return False
+    row = self._Connection.execute('SELECT since FROM items WHERE item = ?', (source,)).fetchone()
+    return row is not None and row[0] is not None and row[0] <= since
+
+  ## Check if an item changed
+  #  @pre  IsTracked(source, since)
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  #  @param since A timestamp
+  #  @retval bool True if any path of the item changed since then
+  def IsDirty(self, source, since):
+    return self._Connection.execute('SELECT 1 FROM dirty WHERE item = ? AND time >= ? LIMIT 1',
+                                    (source, since)).fetchone() is not None
+
+  ## Get the changed paths of an item
+  #  @pre  IsTracked(source, since)
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  #  @param since A timestamp
+  #  @retval list The paths relative to source that changed since then. A
+  #          directory stands for everything below it, '' for the whole item.
+  def DirtyPaths(self, source, since):
+    return [path for path, in self._Connection.execute(
+      'SELECT path FROM dirty WHERE item = ? AND time >= ?', (source, since))]
+
+  ## Drop old changes
+  #  @pre  The item has been backed up by a run that started at before
+  #  @post Changes from before then are forgotten
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  #  @param before A timestamp
+  def Clear(self, source, before):
+    with self._Connection:
+      self._Connection.execute('DELETE FROM dirty WHERE item = ? AND time < ?', (source, before))
+
+  ## Start tracking an item
+  #  @pre  Every directory of the item is watched
+  #  @post The journal covers the item from now on
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  #  @param now The current time as a timestamp
+  def Track(self, source, now):
+    with self._Connection:
+      self._Connection.execute('INSERT OR REPLACE INTO items (item, since) VALUES (?, ?)', (source, now))
+
+  ## Stop tracking an item
+  #  @pre  None
+  #  @post The journal no longer covers the item and it is scanned instead
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  def Untrack(self, source):
+    with self._Connection:
+      self._Connection.execute('DELETE FROM items WHERE item = ?', (source,))
+      self._Connection.execute('DELETE FROM dirty WHERE item = ?', (source,))
+
+  ## Record changed paths
+  #  @param self The current instance
+  #  @param changes (item, path, time) tuples
+  def MarkDirty(self, changes):
+    with self._Connection:
+      self._Connection.executemany(
+        'INSERT INTO dirty (item, path, time) VALUES (?, ?, ?) '
+        'ON CONFLICT (item, path) DO UPDATE SET time = max(time, excluded.time)', changes)
+
+  ## Write the watcher's heartbeat
+  #  @param self The current instance
+  #  @param now The current time as a timestamp, 0 when the watcher stops
+  def Beat(self, now):
+    with self._Connection:
+      self._Connection.execute('INSERT OR REPLACE INTO session (id, pid, heartbeat) VALUES (0, ?, ?)',
+                               (os.getpid(), now))
+
+## A minimal inotify binding
+#  This class wraps an inotify instance through ctypes.
+class Inotify(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post A non blocking inotify instance is open
+  #  @param self The current object being constructed
+  #  @exception OSError inotify isn't available on this platform
+  def __init__(self):
+    if not sys.platform.startswith('linux'):
+      raise OSError(errno.ENOSYS, 'inotify is only available on linux')
+    self._Libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+    self.FileDescriptor = self._Check(self._Libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+
+  ## Close the instance, dropping its watches
+  #  @param self The current instance
+  def Close(self):
+    if self.FileDescriptor >= 0:
+      os.close(self.FileDescriptor)
+      self.FileDescriptor = -1
+
+  ## Watch a directory
+  #  @param self The current instance
+  #  @param path The path of the directory
+  #  @param mask (Optional)The events to watch
+  #  @retval int The watch descriptor, shared by every path of the same directory
+  #  @exception OSError The watch couldn't be added, ENOSPC when the limit is reached
+  def AddWatch(self, path, mask=WATCH_MASK):
+    return self._Check(self._Libc.inotify_add_watch(self.FileDescriptor, os.fsencode(path), mask))
+
+  ## Remove a watch
+  #  @param self The current instance
+  #  @param watch A watch descriptor
+  def RemoveWatch(self, watch):
+    self._Libc.inotify_rm_watch(self.FileDescriptor, watch)
+
+  ## Read the pending events
+  #  @param self The current instance
+  #  @param timeout (Optional)Seconds to wait for an event, None waits forever
+  #  @retval list (watch, mask, cookie, name) tuples, empty if the wait timed out
+  def Read(self, timeout=None):
+    if not select.select([self.FileDescriptor], [], [], timeout)[0]:
+      return []
+    try:
+      data = os.read(self.FileDescriptor, 1 << 16)
+    except BlockingIOError:
+      return []
+    events = []
+    offset = 0
+    while offset < len(data):
+      watch, mask, cookie, length = _EVENT.unpack_from(data, offset)
+      offset += _EVENT.size
+      name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+      offset += length
+      events.append((watch, mask, cookie, name))
+    return events
+
+  def _Check(self, result):
+    if result < 0:
+      code = ctypes.get_errno()
+      raise OSError(code, os.strerror(code))
+    return result
+
+## The watcher
+#  This class watches the folder items of a model and fills a ChangeJournal.
+class Watcher(object):
+
+  ## Constructor
+  #  @pre  None
+  #  @post None, call Refresh() or Run() to start watching
+  #  @param self The current object being constructed
+  #  @param model A bumodel.Model or sqlmodel.SqliteModel
+  #  @param journal The ChangeJournal changes are recorded in
+  #  @param refresh (Optional)Seconds between the times Run() calls Refresh()
+  #  @exception OSError inotify isn't available
+  def __init__(self, model, journal, refresh=REFRESH):
+    self.Model = model
+    self.Journal = journal
+    self.RefreshInterval = refresh
+    self._Inotify = Inotify()
+    self._Paths = {} #watch -> {item: relative path}
+    self._Items = {} #item -> {relative path: watch}
+    self._Full = False
+    self._Stopping = False
+
+  ## Close the watcher
+  #  @pre  Run() has returned
+  #  @post Every watch is dropped and the journal no longer trusted
+  #  @param self The current instance
+  def Close(self):
+    self.Journal.Beat(0)
+    self._Inotify.Close()
+
+  ## Watch the current folder items
+  #  @pre  None
+  #  @post Every folder item saved in the model's database is watched and
+  #        tracked, unless the watch limit was reached or a directory of it
+  #        couldn't be watched. Removed items are dropped.
+  #  @param self The current instance
+  def Refresh(self):
+    self.Journal.Beat(time.time())
+    sources = set(itemData['source'] for title, itemData in self.Model.IterSavedBackUpData()
+                  if itemData['type'] == 'folder')
+    for source in list(self._Items):
+      if source not in sources:
+        self._Drop(source)
+    for source in sources:
+      if source not in self._Items:
+        self._Add(source)
+      elif not self._Items[source] and not self._Full: #it failed to be watched last time
+        self._Add(source)
+
+  ## Run the watcher
+  #  @pre  None
+  #  @post Changes are recorded until Stop() is called
+  #  @param self The current instance
+  def Run(self):
+    self.Refresh()
+    beat = refreshed = time.time()
+    while not self._Stopping:
+      self.Poll(HEARTBEAT)
+      now = time.time()
+      if self.RefreshInterval is not None and now - refreshed >= self.RefreshInterval:
+        self.Refresh() #beats too
+        beat = refreshed = now
+      elif now - beat >= HEARTBEAT:
+        self.Journal.Beat(now)
+        beat = now
+
+  ## Stop the watcher
+  #  @param self The current instance
+  #  @note Run() returns within a heartbeat
+  def Stop(self):
+    self._Stopping = True
+
+  ## Record the pending events
+  #  @param self The current instance
+  #  @param timeout (Optional)Seconds to wait for events
+  #  @retval int The number of changed paths recorded
+  def Poll(self, timeout=0):
+    changes = {}
+    events = self._Inotify.Read(timeout)
+    now = time.time()
+    for watch, mask, cookie, name in events:
+      if mask & IN_Q_OVERFLOW:
+        self._Overflow(now)
+        continue
+      if mask & IN_IGNORED:
+        self._Forget(watch)
+        continue
+      for source, relative in list(self._Paths.get(watch, {}).items()):
+        path = os.path.join(relative, name) if name else relative
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+          if not relative: #the item itself went away, its watches no longer match its path
+            _Log("%s was moved or deleted, falling back to scanning" % source)
+            self._Drop(source)
+            changes[(source, '')] = now
+          continue
+        if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+          self._Unwatch(source, path)
+        elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+          #anything created in it before its watch was added is covered by marking it
+          self._Watch(source, path)
+        changes[(source, path)] = now
+    if changes:
+      self.Journal.MarkDirty([key + (when,) for key, when in changes.items()])
+    return len(changes)
+
+  ## Start watching an item
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  def _Add(self, source):
+    self._Items[source] = {}
+    if self._Full:
+      _Log("inotify watch limit reached, falling back to scanning %s" % source)
+      return
+    started = time.time()
+    if self._Watch(source, ''):
+      self.Journal.Track(source, started)
+
+  ## Stop watching an item
+  #  @param self The current instance
+  #  @param source The source of a folder item
+  def _Drop(self, source):
+    for watch in self._Items.pop(source, {}).values():
+      self._Release(watch, source)
+    self.Journal.Untrack(source)
+
+  ## Watch a directory and everything below it
+  #  @param self The current instance
+  #  @param source The source of the folder item
+  #  @param relative The path of the directory relative to source
+  #  @retval bool False if a directory couldn't be watched or listed, the item is
+  #          then untracked until a later Refresh() watches it completely
+  def _Watch(self, source, relative):
+    pending = [relative]
+    while pending:
+      relative = pending.pop()
+      path = os.path.join(source, relative) if relative else source
+      try:
+        watch = self._Inotify.AddWatch(path)
+        self._Paths.setdefault(watch, {})[source] = relative
+        self._Items[source][relative] = watch
+        with os.scandir(path) as entries:
+          for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+              pending.append(os.path.join(relative, entry.name))
+      except OSError as error:
+        if relative and error.errno in (errno.ENOENT, errno.ENOTDIR):
+          continue #it vanished since its parent was listed, the parent's events cover it
+        if error.errno == errno.ENOSPC:
+          self._Full = True
+          _Log("inotify watch limit reached at %s, falling back to scanning %s "
+               "(raise fs.inotify.max_user_watches)" % (path, source))
+        else: #changes below it would go unseen
+          _Log("unable to watch %s (%s), falling back to scanning %s" % (path, error, source))
+        self._Drop(source)
+        self._Items[source] = {}
+        return False
+    return True
+
+  ## Stop watching a directory and everything below it
+  #  @param self The current instance
+  #  @param source The source of the folder item
+  #  @param relative The path of the directory relative to source
+  def _Unwatch(self, source, relative):
+    watches = self._Items.get(source, {})
+    prefix = relative + os.sep
+    for path in [path for path in watches if path == relative or path.startswith(prefix)]:
+      self._Release(watches.pop(path), source)
+
+  def _Release(self, watch, source):
+    users = self._Paths.get(watch, {})
+    users.pop(source, None)
+    if not users:
+      self._Paths.pop(watch, None)
+      self._Inotify.RemoveWatch(watch)
+
+  def _Forget(self, watch):
+    for source, relative in self._Paths.pop(watch, {}).items():
+      if self._Items.get(source, {}).get(relative) == watch:
+        del self._Items[source][relative]
+
+  ## Handle lost events
+  #  @param self The current instance
+  #  @param now The current time as a timestamp
+  def _Overflow(self, now):
+    _Log("inotify event queue overflowed, scanning folder items until their next backup")
+    #the watches are intact, only what happened before now is unknown
+    for source in self._Items:
+      if self._Items[source]:
+        self.Journal.Track(source, now)
+
+def _Log(message):
+  print("watcher: " + message, file=sys.stderr)
+
+# python watcher.py [database]
+if __name__ == "__main__":
+  import bumodel
+  if len(sys.argv) > 2:
+    print("usage: watcher.py [database]")
+    sys.exit(2)
+  model = bumodel.OpenModel(*sys.argv[1:])
+  journal = ChangeJournal()
+  try:
+    watcher = Watcher(model, journal)
+  except OSError as error:
+    print("unable to watch for changes (%s), items will be scanned" % error)
+    sys.exit(1)
+  try:
+    watcher.Run()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    watcher.Close()
+    journal.Close()